@@ -0,0 +1,395 @@
+import json
+import logging
+import os
+import re
+import threading
+import uuid
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+
+from ai.compression import EmbeddingCompressor
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# On-disk layout of a saved index: each save writes its arrays as
+# ``<stem>.<generation><ext>`` and index.json names the current generation
+VECTORS_FILE = "vectors.npy"
+ASSIGNMENTS_FILE = "assignments.npy"
+CENTROIDS_FILE = "centroids.npy"
+COMPRESSOR_FILE = "compressor.npz"
+METADATA_FILE = "index.json"
+
+# Files written by some save generation (or a save's metadata left by a crash)
+GENERATION_FILE_PATTERN = re.compile(
+    r"^(?:(?:vectors|assignments|centroids)\.(?P<array>[0-9a-f]{32})\.npy"
+    r"|compressor\.(?P<compressor>[0-9a-f]{32})\.npz"
+    r"|\.index\.json\.(?P<metadata>[0-9a-f]{32})\.tmp)$"
+)
+
+# Bump when the on-disk layout changes
+INDEX_FORMAT_VERSION = 3
+
+
+def _generation_file(name: str, generation: str) -> str:
+    stem, extension = os.path.splitext(name)
+    return f"{stem}.{generation}{extension}"
+
+
+def _fsync(path: str) -> None:
+    with open(path, "rb") as saved_file:
+        os.fsync(saved_file.fileno())
+
+
+def _saved_generation(path: str) -> Optional[str]:
+    """
+    Generation named by the index.json in ``path``, if any
+    """
+    try:
+        with open(os.path.join(path, METADATA_FILE)) as metadata_file:
+            return json.load(metadata_file).get("generation")
+    except (OSError, ValueError):
+        return None
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class IVFIndex:
+    def __init__(
+        self,
+        dim: int = 768,
+        n_lists: int = 256,
+        n_probe: int = 8,
+        train_factor: int = 16,
+        compressor: Optional[EmbeddingCompressor] = None
+    ):
+        """
+        Initialize an inverted-file (IVF) index for cosine nearest neighbours
+
+        Vectors are L2-normalized so inner product equals cosine similarity.
+        Until ``n_lists * train_factor`` vectors have been added, searches
+        scan everything exactly. After that, a coarse k-means quantizer is
+        trained and each query only scans the ``n_probe`` closest lists.
+        Later inserts are assigned to their nearest list as they arrive.
+        With a fitted ``compressor`` vectors are stored compressed (float16
+        PCA projections or PQ codes); lists and scores are then computed in
+        the projected space, and similarities are approximate cosines.
+        """
+        if compressor is not None and not compressor.is_fitted:
+            raise ValueError("The index compressor must be fitted before use")
+        self.dim = dim
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.train_factor = train_factor
+        self.compressor = compressor
+
+        self.ids: List[str] = []
+        self._row_by_id: Dict[str, int] = {}
+        width, dtype = compressor.code_shape if compressor is not None else (dim, np.float32)
+        self._vectors = np.zeros((0, width), dtype=dtype)
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._deleted = np.zeros(0, dtype=bool)
+        self._size = 0
+        self.centroids: Optional[np.ndarray] = None
+        self._lists: List[List[int]] = []
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._row_by_id)
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def _grow(self, needed: int) -> None:
+        capacity = len(self._vectors)
+        if self._size + needed <= capacity:
+            return
+        new_capacity = max(self._size + needed, 2 * capacity, 1024)
+        vectors = np.zeros((new_capacity, self._vectors.shape[1]), dtype=self._vectors.dtype)
+        vectors[:self._size] = self._vectors[:self._size]
+        assignments = np.full(new_capacity, -1, dtype=np.int32)
+        assignments[:self._size] = self._assignments[:self._size]
+        deleted = np.zeros(new_capacity, dtype=bool)
+        deleted[:self._size] = self._deleted[:self._size]
+        self._vectors, self._assignments, self._deleted = vectors, assignments, deleted
+
+    def add(self, ids: Sequence[str], vectors: np.ndarray) -> None:
+        """
+        Insert vectors; an ID that is already indexed gets its vector replaced
+        """
+        vectors = self._search_space(np.atleast_2d(vectors))
+        with self._lock:
+            self._grow(len(ids))
+            start = self._size
+            for offset, item_id in enumerate(ids):
+                item_id = str(item_id)
+                previous = self._row_by_id.get(item_id)
+                if previous is not None:
+                    self._deleted[previous] = True
+                self._row_by_id[item_id] = start + offset
+                self.ids.append(item_id)
+            self._vectors[start:start + len(ids)] = self._store(vectors)
+            self._size += len(ids)
+
+            if self.is_trained:
+                assignments = self._assign(vectors)
+                self._assignments[start:self._size] = assignments
+                for row, list_id in enumerate(assignments, start):
+                    self._lists[list_id].append(row)
+            elif self._size >= self.n_lists * self.train_factor:
+                self.train()
+
+    def _search_space(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Normalized vectors, projected when the index is compressed
+        """
+        vectors = _normalize(vectors)
+        return self.compressor.project(vectors, normalized=True) if self.compressor is not None else vectors
+
+    def _store(self, vectors: np.ndarray) -> np.ndarray:
+        return vectors if self.compressor is None else self.compressor.quantize(vectors)
+
+    def _decoded(self, rows: np.ndarray) -> np.ndarray:
+        if self.compressor is None:
+            return self._vectors[rows]
+        return self.compressor.decode(self._vectors[rows])
+
+    def _centroid_scores(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Higher is closer: cosine for plain vectors, negative squared distance when projected
+        """
+        if self.compressor is None:
+            return vectors @ self.centroids.T
+        return 2.0 * (vectors @ self.centroids.T) - np.sum(self.centroids ** 2, axis=1)
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        return np.argmax(self._centroid_scores(vectors), axis=1).astype(np.int32)
+
+    def _rebuild_lists(self) -> None:
+        self._lists = [[] for _ in range(self.n_lists)]
+        for row, list_id in enumerate(self._assignments[:self._size].tolist()):
+            if not self._deleted[row]:
+                self._lists[list_id].append(row)
+
+    def train(self, random_state: Optional[int] = 0) -> None:
+        """
+        Fit the coarse quantizer on the current vectors and assign every row
+        """
+        with self._lock:
+            vectors = self._decoded(np.nonzero(~self._deleted[:self._size])[0])
+            kmeans = MiniBatchKMeans(n_clusters=self.n_lists, random_state=random_state, n_init=3)
+            kmeans.fit(vectors)
+            if self.compressor is None:
+                self.centroids = _normalize(kmeans.cluster_centers_)
+            else:
+                self.centroids = kmeans.cluster_centers_.astype(np.float32)
+            self._assignments[:self._size] = self._assign(self._decoded(np.arange(self._size)))
+            self._rebuild_lists()
+            logger.info(f"IVF index trained with {self.n_lists} lists on {len(vectors)} vectors")
+
+    def compress(self, compressor: EmbeddingCompressor) -> "IVFIndex":
+        """
+        Copy this float32 index into a new index that stores compressed vectors
+
+        An unfitted compressor is fitted on the live vectors first. The new
+        index is retrained when it has enough vectors.
+        """
+        if self.compressor is not None:
+            raise ValueError("Index is already compressed")
+        with self._lock:
+            live = np.nonzero(~self._deleted[:self._size])[0]
+            ids = [self.ids[row] for row in live.tolist()]
+            vectors = self._vectors[live]
+        if not compressor.is_fitted:
+            compressor.fit(vectors)
+        index = IVFIndex(
+            dim=self.dim, n_lists=self.n_lists, n_probe=self.n_probe,
+            train_factor=self.train_factor, compressor=compressor
+        )
+        for start in range(0, len(ids), 65536):
+            index.add(ids[start:start + 65536], vectors[start:start + 65536])
+        logger.info(
+            f"Compressed IVF index: {len(ids)} vectors, {vectors.nbytes / 1e6:.1f} MB -> "
+            f"{len(ids) * compressor.bytes_per_vector / 1e6:.1f} MB"
+        )
+        return index
+
+    def search(
+        self,
+        vector: np.ndarray,
+        k: int = 10,
+        exclude: Optional[Sequence[str]] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Return up to k ``(id, cosine_similarity)`` pairs, most similar first
+        """
+        query = self._search_space(np.atleast_2d(vector))[0]
+        return self._search(query, k, {str(item_id) for item_id in exclude or []})
+
+    def search_by_id(self, item_id: str, k: int = 10) -> Optional[List[Tuple[str, float]]]:
+        """
+        Like ``search``, using the stored vector of an indexed item as the
+        query (the item itself is excluded); None when the ID is not indexed
+        """
+        item_id = str(item_id)
+        with self._lock:
+            row = self._row_by_id.get(item_id)
+            if row is None:
+                return None
+            query = self._decoded(np.array([row]))[0]
+            return self._search(query, k, {item_id})
+
+    def _search(self, query: np.ndarray, k: int, excluded: Set[str]) -> List[Tuple[str, float]]:
+        """
+        Search with a query that is already in the index's search space
+        """
+        with self._lock:
+            if self.is_trained:
+                probe = np.argsort(self._centroid_scores(query[None, :])[0])[-self.n_probe:]
+                candidates = np.array([row for i in probe for row in self._lists[i]], dtype=np.int64)
+                candidates = candidates[~self._deleted[candidates]]
+            else:
+                candidates = np.nonzero(~self._deleted[:self._size])[0]
+            if len(candidates) == 0:
+                return []
+
+            if self.compressor is None:
+                scores = self._vectors[candidates] @ query
+            else:
+                scores = self.compressor.similarities(query, self._vectors[candidates])
+            limit = min(k + len(excluded), len(candidates))
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            top = top[np.argsort(-scores[top])]
+
+            results = []
+            for position in top:
+                item_id = self.ids[candidates[position]]
+                if item_id in excluded:
+                    continue
+                results.append((item_id, float(scores[position])))
+                if len(results) == k:
+                    break
+            return results
+
+    def save(self, path: str) -> None:
+        """
+        Write the index to a directory (NumPy arrays plus JSON metadata)
+
+        The arrays go to new files named after this save's generation, and
+        index.json, which names them, is replaced atomically last. A crash
+        at any point leaves the previous save intact, never a mix of the
+        two. Older generations are then removed, except the one just
+        replaced, which a concurrent reader may still be loading.
+        """
+        os.makedirs(path, exist_ok=True)
+        previous = _saved_generation(path)
+        generation = uuid.uuid4().hex
+        # Copy the live rows under the lock and write them outside it, so searches are not held up
+        with self._lock:
+            live = ~self._deleted[:self._size]
+            arrays = {
+                "vectors": (VECTORS_FILE, self._vectors[:self._size][live]),
+                "assignments": (ASSIGNMENTS_FILE, self._assignments[:self._size][live])
+            }
+            if self.is_trained:
+                arrays["centroids"] = (CENTROIDS_FILE, self.centroids.copy())
+            compressor = self.compressor
+            ids = [item_id for item_id, keep in zip(self.ids, live) if keep]
+            trained = self.is_trained
+
+        files = {}
+        for key, (name, array) in arrays.items():
+            files[key] = _generation_file(name, generation)
+            np.save(os.path.join(path, files[key]), array)
+        if compressor is not None:
+            files["compressor"] = _generation_file(COMPRESSOR_FILE, generation)
+            compressor.save(os.path.join(path, files["compressor"]))
+        metadata = {
+            "format_version": INDEX_FORMAT_VERSION,
+            "generation": generation,
+            "files": files,
+            "dim": self.dim,
+            "n_lists": self.n_lists,
+            "n_probe": self.n_probe,
+            "train_factor": self.train_factor,
+            "trained": trained,
+            "compressed": compressor is not None,
+            "ids": ids
+        }
+        # The arrays must be on disk before index.json can point at them
+        for name in files.values():
+            _fsync(os.path.join(path, name))
+        tmp_path = os.path.join(path, f".{METADATA_FILE}.{generation}.tmp")
+        with open(tmp_path, "w") as metadata_file:
+            json.dump(metadata, metadata_file)
+            metadata_file.flush()
+            os.fsync(metadata_file.fileno())
+        os.replace(tmp_path, os.path.join(path, METADATA_FILE))
+        self._remove_generations(path, keep={generation, previous})
+
+    @staticmethod
+    def _remove_generations(path: str, keep: Set[Optional[str]]) -> None:
+        for name in os.listdir(path):
+            match = GENERATION_FILE_PATTERN.match(name)
+            if match is None:
+                continue
+            generation = match.group("array") or match.group("compressor") or match.group("metadata")
+            if generation not in keep:
+                try:
+                    os.remove(os.path.join(path, name))
+                except OSError as e:
+                    logger.warning(f"Could not remove stale index file {name}: {str(e)}")
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        """
+        Load an index saved with ``save``
+
+        Raises ValueError for an unsupported format version or when the
+        saved arrays and IDs disagree in length.
+        """
+        with open(os.path.join(path, METADATA_FILE)) as metadata_file:
+            metadata = json.load(metadata_file)
+        if metadata.get("format_version") != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported index format version: {metadata.get('format_version')}")
+        files = metadata["files"]
+
+        index = cls(
+            dim=metadata["dim"],
+            n_lists=metadata["n_lists"],
+            n_probe=metadata["n_probe"],
+            train_factor=metadata["train_factor"],
+            compressor=(
+                EmbeddingCompressor.load(os.path.join(path, files["compressor"])) if metadata["compressed"] else None
+            )
+        )
+        vectors = np.load(os.path.join(path, files["vectors"]))
+        assignments = np.load(os.path.join(path, files["assignments"]))
+        ids = list(metadata["ids"])
+        if not len(vectors) == len(assignments) == len(ids):
+            raise ValueError(
+                f"Saved index at {path} is inconsistent: {len(ids)} ids, "
+                f"{len(vectors)} vectors, {len(assignments)} assignments"
+            )
+        if len(vectors) and vectors.shape[1] != index._vectors.shape[1]:
+            raise ValueError(
+                f"Saved index at {path} has {vectors.shape[1]}-wide vectors, expected {index._vectors.shape[1]}"
+            )
+        index.ids = ids
+        index._row_by_id = {item_id: row for row, item_id in enumerate(index.ids)}
+        index._size = len(index.ids)
+        index._vectors = np.array(vectors, dtype=index._vectors.dtype)
+        index._assignments = assignments.astype(np.int32)
+        index._deleted = np.zeros(index._size, dtype=bool)
+        if metadata["trained"]:
+            index.centroids = np.load(os.path.join(path, files["centroids"]))
+            index._rebuild_lists()
+        return index
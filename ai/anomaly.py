@@ -0,0 +1,278 @@
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sklearn.ensemble import IsolationForest
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class RunningScaler:
+    def __init__(self):
+        """
+        Initialize a standard scaler whose mean and variance update incrementally
+        """
+        self.count = 0
+        self.mean: Optional[np.ndarray] = None
+        self.m2: Optional[np.ndarray] = None
+
+    def partial_fit(self, X: np.ndarray) -> "RunningScaler":
+        """
+        Merge a batch into the running statistics (Chan et al. parallel update)
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if len(X) == 0:
+            return self
+
+        batch_count = len(X)
+        batch_mean = X.mean(axis=0)
+        batch_m2 = ((X - batch_mean) ** 2).sum(axis=0)
+
+        if self.count == 0:
+            self.count, self.mean, self.m2 = batch_count, batch_mean, batch_m2
+            return self
+
+        total = self.count + batch_count
+        delta = batch_mean - self.mean
+        self.mean = self.mean + delta * batch_count / total
+        self.m2 = self.m2 + batch_m2 + delta ** 2 * self.count * batch_count / total
+        self.count = total
+        return self
+
+    def fit(self, X: np.ndarray) -> "RunningScaler":
+        """
+        Reset the statistics and fit them on X
+        """
+        self.count, self.mean, self.m2 = 0, None, None
+        return self.partial_fit(X)
+
+    @property
+    def scale(self) -> np.ndarray:
+        """
+        Current standard deviation, with constant features scaled by 1
+        """
+        std = np.sqrt(self.m2 / max(self.count, 1))
+        return np.where(std > 0, std, 1.0)
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        """
+        Standardize X with the current statistics
+        """
+        return (np.asarray(X, dtype=np.float64) - self.mean) / self.scale
+
+
+class ReservoirSample:
+    def __init__(self, capacity: int, random_state: Optional[int] = None):
+        """
+        Initialize a fixed-size sample biased toward recent rows
+
+        Until the reservoir is full every row is kept. After that each new
+        row replaces a random slot, so a row's survival decays exponentially
+        with age and the sample tracks recent behaviour.
+        """
+        self.capacity = capacity
+        self.rng = np.random.default_rng(random_state)
+        self.data: Optional[np.ndarray] = None
+        self.size = 0
+        self.seen = 0
+
+    def add(self, X: np.ndarray) -> None:
+        """
+        Add a batch of rows to the reservoir
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if len(X) == 0:
+            return
+        if self.data is None:
+            self.data = np.empty((self.capacity, X.shape[1]), dtype=np.float64)
+
+        self.seen += len(X)
+        fill = min(self.capacity - self.size, len(X))
+        if fill > 0:
+            self.data[self.size:self.size + fill] = X[:fill]
+            self.size += fill
+        if fill < len(X):
+            slots = self.rng.integers(0, self.capacity, size=len(X) - fill)
+            self.data[slots] = X[fill:]
+
+    def snapshot(self) -> np.ndarray:
+        """
+        Copy of the rows currently held
+        """
+        if self.data is None:
+            return np.empty((0, 0))
+        return self.data[:self.size].copy()
+
+
+class AnomalyModel:
+    def __init__(
+        self,
+        contamination: float = 0.1,
+        reservoir_size: int = 10000,
+        refit_every: int = 5000,
+        random_state: Optional[int] = None
+    ):
+        """
+        Initialize a persistent anomaly model for sensor readings
+
+        ``fit_baseline`` trains an IsolationForest on a baseline set. After
+        that, ``score`` only runs inference. Scored rows update a running
+        scaler and a reservoir sample. Once ``refit_every`` new rows have
+        arrived, the forest is refit on the reservoir in a background thread
+        and swapped in atomically together with the scaler statistics it was
+        trained with.
+        """
+        self.contamination = contamination
+        self.refit_every = refit_every
+        self.random_state = random_state
+        self.feature_names: Optional[List[str]] = None
+        self.scaler = RunningScaler()
+        self.reservoir = ReservoirSample(reservoir_size, random_state)
+
+        # (forest, mean, scale) used for scoring; replaced as one tuple
+        self._fitted: Optional[Tuple[IsolationForest, np.ndarray, np.ndarray]] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._refit_thread: Optional[threading.Thread] = None
+
+    @property
+    def is_fitted(self) -> bool:
+        return self._fitted is not None
+
+    @property
+    def isolation_forest(self) -> Optional[IsolationForest]:
+        return self._fitted[0] if self._fitted is not None else None
+
+    def get_state(self) -> Dict[str, Any]:
+        """
+        Export the fitted state for saving as an artifact
+        """
+        if self._fitted is None:
+            raise RuntimeError("Anomaly model has no baseline to export")
+        with self._lock:
+            forest, mean, scale = self._fitted
+            return {
+                "feature_names": list(self.feature_names or []),
+                "contamination": self.contamination,
+                "refit_every": self.refit_every,
+                "scaler_count": int(self.scaler.count),
+                "scaler_mean": self.scaler.mean,
+                "scaler_m2": self.scaler.m2,
+                "reservoir": self.reservoir.snapshot(),
+                "reservoir_capacity": self.reservoir.capacity,
+                "reservoir_seen": int(self.reservoir.seen),
+                "forest": forest,
+                "forest_mean": mean,
+                "forest_scale": scale
+            }
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        """
+        Restore a state produced by ``get_state``
+
+        Arrays may be read-only memory maps. They are never written in place,
+        except for the reservoir, which should be mapped copy-on-write.
+        """
+        with self._lock:
+            self.feature_names = list(state["feature_names"]) or None
+            self.contamination = state["contamination"]
+            self.refit_every = state["refit_every"]
+            self.scaler.count = state["scaler_count"]
+            self.scaler.mean = state["scaler_mean"]
+            self.scaler.m2 = state["scaler_m2"]
+
+            reservoir = ReservoirSample(state["reservoir_capacity"], self.random_state)
+            rows = state["reservoir"]
+            if len(rows) == reservoir.capacity:
+                reservoir.data = rows
+            else:
+                reservoir.data = np.empty((reservoir.capacity, rows.shape[1]), dtype=np.float64)
+                reservoir.data[:len(rows)] = rows
+            reservoir.size = len(rows)
+            reservoir.seen = state["reservoir_seen"]
+            self.reservoir = reservoir
+
+            self._fitted = (state["forest"], state["forest_mean"], state["forest_scale"])
+            self._pending = 0
+
+    def fit_baseline(self, X: np.ndarray, feature_names: Optional[List[str]] = None) -> "AnomalyModel":
+        """
+        Fit the scaler, reservoir and forest from scratch on baseline data
+        """
+        X = np.asarray(X, dtype=np.float64)
+        with self._lock:
+            self.feature_names = list(feature_names) if feature_names is not None else None
+            self.scaler.fit(X)
+            self.reservoir = ReservoirSample(self.reservoir.capacity, self.random_state)
+            self.reservoir.add(X)
+            self._pending = 0
+        self.refit()
+        logger.info(f"Anomaly baseline fitted on {len(X)} rows")
+        return self
+
+    def refit(self) -> None:
+        """
+        Refit the forest on the reservoir with the current scaler statistics
+        """
+        with self._lock:
+            sample = self.reservoir.snapshot()
+            mean, scale = self.scaler.mean.copy(), self.scaler.scale.copy()
+
+        forest = IsolationForest(contamination=self.contamination, random_state=self.random_state)
+        forest.fit((sample - mean) / scale)
+        self._fitted = (forest, mean, scale)
+
+    def _refit_in_background(self) -> None:
+        try:
+            self.refit()
+            logger.info("Anomaly model refit on reservoir sample")
+        except Exception as e:
+            logger.error(f"Error refitting anomaly model: {str(e)}")
+
+    def update(self, X: np.ndarray) -> None:
+        """
+        Fold new rows into the running statistics and schedule a refit if due
+        """
+        with self._lock:
+            self.scaler.partial_fit(X)
+            self.reservoir.add(X)
+            self._pending += len(X)
+            if self._pending < self.refit_every:
+                return
+            if self._refit_thread is not None and self._refit_thread.is_alive():
+                return
+            self._pending = 0
+            self._refit_thread = threading.Thread(target=self._refit_in_background, daemon=True)
+            self._refit_thread.start()
+
+    def wait_for_refit(self, timeout: Optional[float] = None) -> None:
+        """
+        Block until any background refit has finished
+        """
+        thread = self._refit_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def score(self, X: np.ndarray, update: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score rows against the fitted baseline
+
+        Returns ``(predictions, scores)`` as IsolationForest reports them:
+        -1 marks an anomaly and lower scores are more anomalous.
+        """
+        if self._fitted is None:
+            raise RuntimeError("Anomaly model has no baseline; call fit_baseline first")
+
+        X = np.asarray(X, dtype=np.float64)
+        forest, mean, scale = self._fitted
+        scaled = (X - mean) / scale
+        # Same rule as IsolationForest.predict, without scoring the trees twice
+        scores = forest.decision_function(scaled)
+        predictions = np.where(scores < 0, -1, 1)
+
+        if update:
+            self.update(X)
+        return predictions, scores
@@ -0,0 +1,296 @@
+import json
+import logging
+import os
+import shutil
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import joblib
+import numpy as np
+import sklearn
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Manifest describing a saved artifact directory
+MANIFEST_FILE = "manifest.json"
+
+# Bump when the on-disk layout changes; only the current version is read
+ARTIFACT_FORMAT_VERSION = 2
+
+# Saved versions kept next to the current one, for readers still loading an older save
+ARTIFACT_KEEP_VERSIONS = 2
+
+# Components saved from a ThreatDetector; each is a subdirectory of the artifact
+ANOMALY_COMPONENT = "anomaly"
+PATTERN_MINER_COMPONENT = "pattern_miner"
+BATCH_PATTERNS_COMPONENT = "batch_patterns"
+
+# State entries updated in place after loading (the reservoir and the
+# partial_fit k-means centres); these are mapped copy-on-write
+COPY_ON_WRITE = {"reservoir", "kmeans"}
+
+
+class ArtifactError(Exception):
+    """Raised when saved artifacts are missing, incompatible or do not match the detector."""
+
+
+def _save_component(path: str, state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Write one component's state: arrays as .npy, estimators with joblib and
+    plain values inline in the manifest entry
+    """
+    os.makedirs(path, exist_ok=True)
+    entry: Dict[str, Any] = {"arrays": [], "objects": [], "values": {}}
+    for name, value in state.items():
+        if isinstance(value, np.ndarray):
+            np.save(os.path.join(path, f"{name}.npy"), value)
+            entry["arrays"].append(name)
+        elif value is None or isinstance(value, (bool, int, float, str, list, dict)):
+            entry["values"][name] = value
+        else:
+            # Uncompressed so the estimators' arrays can be memory-mapped on load
+            joblib.dump(value, os.path.join(path, f"{name}.joblib"), compress=0)
+            entry["objects"].append(name)
+    return entry
+
+
+def _load_component(path: str, entry: Dict[str, Any], mmap: bool) -> Dict[str, Any]:
+    """
+    Read one component's state written by ``_save_component``
+    """
+    def mmap_mode(name: str) -> Optional[str]:
+        if not mmap:
+            return None
+        return "c" if name in COPY_ON_WRITE else "r"
+
+    state: Dict[str, Any] = dict(entry["values"])
+    for name in entry["arrays"]:
+        state[name] = np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode(name))
+    for name in entry["objects"]:
+        state[name] = joblib.load(os.path.join(path, f"{name}.joblib"), mmap_mode=mmap_mode(name))
+    return state
+
+
+def _batch_pattern_state(detector) -> Optional[Dict[str, Any]]:
+    if not hasattr(detector.tfidf, "vocabulary_") or not hasattr(detector.kmeans, "cluster_centers_"):
+        return None
+    return {"tfidf": detector.tfidf, "kmeans": detector.kmeans}
+
+
+def _rolling_windows(detector) -> Optional[List[int]]:
+    return list(detector.feature_extractor.windows) if detector.feature_extractor is not None else None
+
+
+def _feature_schema(detector, components: Dict[str, Any]) -> Dict[str, Any]:
+    anomaly = components.get(ANOMALY_COMPONENT)
+    return {
+        "embedding_model": detector.model_name,
+        "anomaly_features": anomaly["values"]["feature_names"] if anomaly else None,
+        "rolling_windows": _rolling_windows(detector),
+        "pattern_n_features": detector.pattern_miner.n_features,
+        "pattern_n_clusters": detector.pattern_miner.n_clusters
+    }
+
+
+def _versions_dir(path: str) -> str:
+    return os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.versions")
+
+
+def _publish(path: str, version_path: str) -> None:
+    """
+    Point ``path`` at a complete version directory in one atomic step
+
+    ``path`` is a symlink; a new link is created beside it and renamed over
+    it, so readers see either the previous version or the new one.
+    """
+    link = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.link-{uuid.uuid4().hex}")
+    os.symlink(os.path.relpath(version_path, os.path.dirname(path)), link)
+    try:
+        os.replace(link, path)
+    except Exception:
+        os.unlink(link)
+        raise
+
+
+def _prune_versions(path: str, keep: int) -> None:
+    """
+    Remove all but the current and the ``keep`` newest previous versions
+    """
+    versions = _versions_dir(path)
+    current = os.path.realpath(path)
+    previous = [
+        os.path.join(versions, name) for name in os.listdir(versions)
+        if not name.startswith(".") and os.path.realpath(os.path.join(versions, name)) != current
+    ]
+    previous.sort(key=os.path.getmtime, reverse=True)
+    for stale in previous[keep:]:
+        shutil.rmtree(stale, ignore_errors=True)
+
+
+def save_detector_artifacts(detector, path: str) -> Dict[str, Any]:
+    """
+    Save a ThreatDetector's fitted models to a versioned artifact directory
+
+    The anomaly model is saved only once it has a baseline, and the batch
+    TF-IDF/KMeans models only once ``detect_patterns`` has fitted them.
+    Each save writes a new version directory beside ``path`` and then
+    atomically repoints the ``path`` symlink at it, so readers never see a
+    half-written artifact and a crash at any point leaves the previous
+    version in place. Returns the manifest.
+    """
+    path = os.path.abspath(path)
+    versions = _versions_dir(path)
+    os.makedirs(versions, exist_ok=True)
+    version = f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+    tmp_path = os.path.join(versions, f".{version}.tmp")
+    version_path = os.path.join(versions, version)
+
+    try:
+        components: Dict[str, Any] = {}
+        if detector.anomaly_model.is_fitted:
+            components[ANOMALY_COMPONENT] = _save_component(
+                os.path.join(tmp_path, ANOMALY_COMPONENT), detector.anomaly_model.get_state()
+            )
+        components[PATTERN_MINER_COMPONENT] = _save_component(
+            os.path.join(tmp_path, PATTERN_MINER_COMPONENT), detector.pattern_miner.get_state()
+        )
+        batch_state = _batch_pattern_state(detector)
+        if batch_state is not None:
+            components[BATCH_PATTERNS_COMPONENT] = _save_component(
+                os.path.join(tmp_path, BATCH_PATTERNS_COMPONENT), batch_state
+            )
+
+        manifest = {
+            "format_version": ARTIFACT_FORMAT_VERSION,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "sklearn_version": sklearn.__version__,
+            "numpy_version": np.__version__,
+            "feature_schema": _feature_schema(detector, components),
+            "components": components
+        }
+        with open(os.path.join(tmp_path, MANIFEST_FILE), "w") as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+
+        os.replace(tmp_path, version_path)
+    except Exception:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+    _publish(path, version_path)
+    _prune_versions(path, ARTIFACT_KEEP_VERSIONS)
+
+    logger.info(f"Saved detector artifacts ({', '.join(components)}) to {path} (version {version})")
+    return manifest
+
+
+def read_manifest(path: str) -> Dict[str, Any]:
+    """
+    Read and validate the manifest of an artifact directory
+    """
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        raise ArtifactError(f"No detector artifacts found at {path}")
+    with open(manifest_path) as manifest_file:
+        manifest = json.load(manifest_file)
+
+    if manifest.get("format_version") != ARTIFACT_FORMAT_VERSION:
+        raise ArtifactError(f"Unsupported artifact format version: {manifest.get('format_version')}")
+    if manifest.get("sklearn_version") != sklearn.__version__:
+        # Pickled estimators are only guaranteed to load in the version that wrote them
+        raise ArtifactError(
+            f"Artifacts were saved with scikit-learn {manifest.get('sklearn_version')}, "
+            f"running {sklearn.__version__}; retrain and save them again"
+        )
+    return manifest
+
+
+def _check_feature_schema(detector, schema: Dict[str, Any], expected_features: Optional[List[str]]) -> None:
+    """
+    Compare the saved feature schema with the loading detector's configuration
+
+    The rolling-window configuration decides which derived columns the
+    detector builds, so it must always match. A detector that already has
+    a baseline must have the same anomaly features, as must
+    ``expected_features`` when given. The pattern miner's hash size and
+    cluster count must match too, since loading its state would otherwise
+    silently change the detector's configuration.
+    """
+    saved_features = schema["anomaly_features"]
+    saved_windows = schema["rolling_windows"]
+    if saved_features is not None and saved_windows != _rolling_windows(detector):
+        raise ArtifactError(
+            f"Saved anomaly features use rolling windows {saved_windows}, "
+            f"detector is configured for {_rolling_windows(detector)}"
+        )
+    if saved_features is not None and detector.anomaly_model.is_fitted and \
+            list(detector.anomaly_model.feature_names) != saved_features:
+        raise ArtifactError(
+            f"Saved anomaly features {saved_features} do not match the detector's "
+            f"{list(detector.anomaly_model.feature_names)}"
+        )
+    if expected_features is not None and saved_features != list(expected_features):
+        raise ArtifactError(
+            f"Saved anomaly features {saved_features} do not match expected {list(expected_features)}"
+        )
+    if schema["pattern_n_features"] != detector.pattern_miner.n_features:
+        raise ArtifactError(
+            f"Saved pattern miner uses {schema['pattern_n_features']} hash features, "
+            f"detector is configured for {detector.pattern_miner.n_features}"
+        )
+    if schema["pattern_n_clusters"] != detector.pattern_miner.n_clusters:
+        raise ArtifactError(
+            f"Saved pattern miner uses {schema['pattern_n_clusters']} clusters, "
+            f"detector is configured for {detector.pattern_miner.n_clusters}"
+        )
+
+
+def load_detector_artifacts(
+    detector,
+    path: str,
+    mmap: bool = True,
+    expected_features: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Load artifacts written by ``save_detector_artifacts`` into a ThreatDetector
+
+    ``path`` is resolved once, so a save that lands during the load cannot
+    mix files from two versions. With ``mmap`` the ``.npy`` arrays and the
+    k-means models are memory-mapped instead of copied, so worker
+    processes that load the same version share those pages through the OS
+    page cache. The IsolationForest is the exception: unpickling its trees
+    copies their node arrays, so every process holds its own copy.
+
+    Raises ArtifactError if the artifact format or scikit-learn version
+    differs, or if the saved feature schema does not match the detector's
+    configuration (see ``_check_feature_schema``). Returns the manifest.
+    """
+    path = os.path.realpath(path)
+    manifest = read_manifest(path)
+    schema = manifest["feature_schema"]
+    components = manifest["components"]
+
+    _check_feature_schema(detector, schema, expected_features)
+    if schema["embedding_model"] != detector.model_name:
+        logger.warning(
+            f"Artifacts were saved by a detector using {schema['embedding_model']}, loading into {detector.model_name}"
+        )
+
+    if ANOMALY_COMPONENT in components:
+        detector.anomaly_model.set_state(
+            _load_component(os.path.join(path, ANOMALY_COMPONENT), components[ANOMALY_COMPONENT], mmap)
+        )
+    detector.pattern_miner.set_state(
+        _load_component(os.path.join(path, PATTERN_MINER_COMPONENT), components[PATTERN_MINER_COMPONENT], mmap)
+    )
+    if BATCH_PATTERNS_COMPONENT in components:
+        batch_state = _load_component(
+            os.path.join(path, BATCH_PATTERNS_COMPONENT), components[BATCH_PATTERNS_COMPONENT], mmap
+        )
+        detector.tfidf = batch_state["tfidf"]
+        detector.kmeans = batch_state["kmeans"]
+
+    logger.info(f"Loaded detector artifacts ({', '.join(components)}) from {path}")
+    return manifest
@@ -0,0 +1,142 @@
+import argparse
+import json
+import random
+import time
+from typing import Any, Dict, List, Tuple
+
+from ai.benchmarks.suite import register_tiny_encoder
+from ai.cascade import HIGH_SEVERITY_SCORE, ThreatCascade
+from ai.keyword_matcher import get_threat_matcher
+from ai.threat_detection import ThreatDetector
+
+# Everyday vocabulary of harmless posts
+HARMLESS_WORDS = (
+    "coffee lunch weekend game team score music concert traffic road train bus "
+    "weather sunny rain park dog walk city downtown market festival movie school "
+    "power outage crowd station late again love great today tomorrow friends"
+).split()
+
+# Threat keywords used in a harmless sense
+HARMLESS_KEYWORD_PHRASES = [
+    "emergency exit drill at school",
+    "that concert was a total attack on my ears",
+    "danger zone on the radio",
+    "bath bomb sale at the market",
+    "emergency vet visit for the dog",
+    "new game mode has bomb attack and danger zone maps"
+]
+
+# Threatening phrases; some carry no lexicon keyword at all
+THREAT_PHRASES = [
+    "bomb threat reported at the station",
+    "armed attack planned downtown",
+    "stay away from city hall there is danger",
+    "suspicious package left on the train",
+    "gunman seen near the school evacuate now",
+    "they will hurt people at the festival tonight",
+    "explosion heard near the market violence erupting",
+    "bomb attack threat at the station emergency"
+]
+
+
+def labelled_posts(count: int, threat_rate: float = 0.1, seed: int = 0) -> Tuple[List[Dict[str, Any]], List[int]]:
+    """
+    Generate labelled posts: mostly harmless chatter, a few threats
+
+    Some harmless posts use threat keywords in a harmless sense, and some
+    threats use no keyword, so neither stage alone is exact. A few posts
+    of both kinds match enough keywords to be high severity.
+    """
+    rng = random.Random(seed)
+    posts, labels = [], []
+    for i in range(count):
+        words = [rng.choice(HARMLESS_WORDS) for _ in range(rng.randint(3, 25))]
+        is_threat = rng.random() < threat_rate
+        if is_threat:
+            words.insert(rng.randint(0, len(words)), rng.choice(THREAT_PHRASES))
+        elif rng.random() < 0.1:
+            words.insert(rng.randint(0, len(words)), rng.choice(HARMLESS_KEYWORD_PHRASES))
+        posts.append({"post_id": f"post-{i}", "platform": "synthetic", "content": " ".join(words)})
+        labels.append(int(is_threat))
+    return posts, labels
+
+
+def _flagged(results: List[Dict[str, Any]]) -> set:
+    return {result["post_id"] for result in results}
+
+
+def compare_cascade(
+    model_name: str,
+    train: Tuple[List[Dict[str, Any]], List[int]],
+    test: Tuple[List[Dict[str, Any]], List[int]],
+    negative_threshold: float,
+    positive_threshold: float
+) -> Dict[str, Any]:
+    """
+    Run the keyword-only path and the cascade on the same posts
+
+    Reports encoder calls, time, recall against the labels and whether any
+    high-severity post reported by the keyword-only path was missed.
+    """
+    posts, labels = test
+    threats = {post["post_id"] for post, label in zip(posts, labels) if label}
+    matcher = get_threat_matcher()
+    high_severity = {
+        post["post_id"] for post in posts if matcher.score(post["content"]) > HIGH_SEVERITY_SCORE
+    }
+
+    baseline = ThreatDetector(model_name=model_name)
+    baseline.embed_texts(["warmup"])
+    start = time.perf_counter()
+    baseline_flagged = _flagged(baseline.analyze_social_media(posts, collapse_duplicates=False))
+    baseline_seconds = time.perf_counter() - start
+
+    cascade = ThreatCascade(negative_threshold=negative_threshold, positive_threshold=positive_threshold)
+    detector = ThreatDetector(model_name=model_name, cascade=cascade)
+    detector.fit_cascade(*train)
+    cascade.reset_stats()
+    start = time.perf_counter()
+    cascade_flagged = _flagged(detector.analyze_social_media(posts, collapse_duplicates=False))
+    cascade_seconds = time.perf_counter() - start
+    stats = cascade.stats()
+
+    return {
+        "posts": len(posts),
+        "threats": len(threats),
+        "high_severity_posts": len(high_severity),
+        "keyword_only": {
+            "encoder_calls": len(posts),
+            "seconds": baseline_seconds,
+            "recall": len(baseline_flagged & threats) / max(len(threats), 1),
+            "flagged": len(baseline_flagged)
+        },
+        "cascade": {
+            "encoder_calls": stats["stages"]["encoder"]["settled"],
+            "seconds": cascade_seconds,
+            "recall": len(cascade_flagged & threats) / max(len(threats), 1),
+            "flagged": len(cascade_flagged),
+            "missed_high_severity": len(high_severity - cascade_flagged),
+            "stages": stats["stages"]
+        },
+        "encoder_call_reduction": stats["encoder_call_reduction"],
+        "speedup": baseline_seconds / cascade_seconds
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare encoder calls with and without the threat cascade")
+    parser.add_argument("--train", type=int, default=5000)
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--negative-threshold", type=float, default=0.1)
+    parser.add_argument("--positive-threshold", type=float, default=0.9)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    model_name = register_tiny_encoder(seed=args.seed)
+    print(json.dumps(compare_cascade(
+        model_name,
+        labelled_posts(args.train, seed=args.seed),
+        labelled_posts(args.posts, seed=args.seed + 1),
+        args.negative_threshold,
+        args.positive_threshold
+    ), indent=2))
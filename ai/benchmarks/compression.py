@@ -0,0 +1,76 @@
+import argparse
+import json
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from ai.ann_index import IVFIndex
+from ai.compression import EmbeddingCompressor, evaluate_compression
+
+
+def synthetic_embeddings(count: int, dim: int = 768, topics: int = 50, seed: int = 0) -> np.ndarray:
+    """
+    Topic-clustered embeddings whose variance decays across directions
+
+    Sentence embeddings concentrate most of their variance in a few
+    directions. Here each vector is a topic centre plus noise with a
+    power-law spectrum, so PCA has realistic structure to find.
+    """
+    rng = np.random.default_rng(seed)
+    spectrum = 1.0 / np.arange(1, dim + 1) ** 0.8
+    basis = np.linalg.qr(rng.normal(size=(dim, dim)))[0]
+    centres = rng.normal(size=(topics, dim)) * spectrum * 3.0
+    noise = rng.normal(size=(count, dim)) * spectrum
+    vectors = centres[rng.integers(0, topics, size=count)] + noise
+    return (vectors @ basis.T).astype(np.float32)
+
+
+def index_recall(vectors: np.ndarray, queries: np.ndarray, compressor: EmbeddingCompressor, k: int) -> Dict[str, Any]:
+    """
+    recall@k and query time of a compressed IVF index against the float32 one
+    """
+    ids = [str(i) for i in range(len(vectors))]
+    plain = IVFIndex(dim=vectors.shape[1])
+    plain.add(ids, vectors)
+    compressed = plain.compress(compressor)
+
+    results = {}
+    for name, index in (("float32", plain), (compressor.storage, compressed)):
+        start = time.perf_counter()
+        found = [[item_id for item_id, _ in index.search(query, k=k)] for query in queries]
+        results[name] = {"found": found, "ms_per_query": 1000 * (time.perf_counter() - start) / len(queries)}
+
+    # Ground truth: exact float32 cosine neighbours
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    exact = np.argsort(-(queries @ normalized.T), axis=1)[:, :k]
+    report = {}
+    for name, result in results.items():
+        hits = sum(len(set(found) & {str(i) for i in truth}) for found, truth in zip(result["found"], exact))
+        report[name] = {"recall_at_k": hits / exact.size, "ms_per_query": result["ms_per_query"]}
+    return report
+
+
+def run(count: int, queries: int, dims: List[int], k: int, seed: int) -> List[Dict[str, Any]]:
+    vectors = synthetic_embeddings(count + queries, seed=seed)
+    corpus, query_vectors = vectors[:count], vectors[count:]
+    reports = []
+    for dim in dims:
+        for storage in ("float16", "pq"):
+            compressor = EmbeddingCompressor(dim=dim, storage=storage).fit(corpus)
+            report = evaluate_compression(compressor, corpus, query_vectors, k=k)
+            report["ivf_index"] = index_recall(corpus, query_vectors, compressor, k)
+            reports.append(report)
+    return reports
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure memory and recall of compressed embeddings")
+    parser.add_argument("--vectors", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dims", type=int, nargs="+", default=[128])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.vectors, args.queries, args.dims, args.k, args.seed), indent=2))
@@ -0,0 +1,69 @@
+import argparse
+import json
+import random
+import time
+from typing import Dict, Any, List
+
+import numpy as np
+
+from ai.threat_detection import ThreatDetector
+
+# Vocabulary used to build synthetic social media posts
+WORDS = (
+    "attack bomb threat danger emergency violence city hall downtown careful "
+    "today stay away network traffic unusual access facility secure breach "
+    "sensor fire flood power outage police crowd protest road closed help "
+    "please report suspicious package station train bus alert"
+).split()
+
+
+def synthetic_posts(count: int, seed: int = 0) -> List[str]:
+    """
+    Generate posts of mixed length (3-60 words) from a fixed seed
+    """
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 60)))
+        for _ in range(count)
+    ]
+
+
+def compare_embedding_paths(detector: ThreatDetector, texts: List[str], batch_size: int) -> Dict[str, Any]:
+    """
+    Time the per-text path against the batched path on the same texts
+    """
+    start = time.perf_counter()
+    per_text = np.array([detector.process_text(text) for text in texts])
+    per_text_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = detector.embed_texts(texts, batch_size=batch_size)
+    batched_seconds = time.perf_counter() - start
+
+    return {
+        "texts": len(texts),
+        "batch_size": batch_size,
+        "per_text_seconds": per_text_seconds,
+        "batched_seconds": batched_seconds,
+        "per_text_texts_per_second": len(texts) / per_text_seconds,
+        "batched_texts_per_second": len(texts) / batched_seconds,
+        "speedup": per_text_seconds / batched_seconds,
+        "max_abs_difference": float(np.abs(per_text - batched).max())
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare per-text and batched BERT embedding")
+    parser.add_argument("--texts", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    detector = ThreatDetector()
+    posts = synthetic_posts(args.texts, seed=args.seed)
+
+    # Warm up both paths so one-off allocation costs are not measured
+    detector.embed_texts(posts[:8], batch_size=args.batch_size)
+    detector.process_text(posts[0])
+
+    print(json.dumps(compare_embedding_paths(detector, posts, args.batch_size), indent=2))
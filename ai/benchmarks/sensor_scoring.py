@@ -0,0 +1,94 @@
+import argparse
+import json
+import os
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from ai.sensor_scoring import SensorAnomalyScorer
+
+
+def synthetic_sensor_readings(
+    count: int,
+    sensors: int,
+    seed: int = 0,
+    anomaly_rate: float = 0.01
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Readings from sensors with different operating points, plus outliers
+
+    Each sensor has its own mean, so a reading that is normal for one
+    sensor can be an outlier for another. Returns ``(sensor_ids, X, is_outlier)``.
+    """
+    rng = np.random.default_rng(seed)
+    sensor_ids = np.array([f"sensor-{i}" for i in rng.integers(0, sensors, size=count)], dtype=object)
+    codes = np.array([int(sensor_id.split("-")[1]) for sensor_id in sensor_ids])
+    centers = rng.normal(loc=[25.0, 60.0, 1013.0], scale=[8.0, 15.0, 10.0], size=(sensors, 3))
+    X = centers[codes] + rng.normal(scale=[0.5, 2.0, 1.0], size=(count, 3))
+    is_outlier = rng.random(count) < anomaly_rate
+    X[is_outlier] += rng.choice([-1, 1], size=(int(is_outlier.sum()), 3)) * [4.0, 12.0, 6.0]
+    return sensor_ids, X, is_outlier
+
+
+def measure_scaling(
+    sensor_ids: np.ndarray,
+    X: np.ndarray,
+    worker_counts: List[int],
+    repeats: int = 3
+) -> List[Dict[str, Any]]:
+    """
+    Time per-sensor fit and score for each worker count
+
+    Efficiency is T(1) / (workers * T(workers)); 1.0 is perfect scaling.
+    Scores must be identical for every worker count.
+    """
+    results = []
+    reference = None
+    for workers in worker_counts:
+        scorer = SensorAnomalyScorer(workers=workers, random_state=0)
+        start = time.perf_counter()
+        scorer.fit(sensor_ids, X)
+        fit_seconds = time.perf_counter() - start
+
+        scorer.score(sensor_ids[:1000], X[:1000])  # warm up the pool
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            _, scores = scorer.score(sensor_ids, X)
+            timings.append(time.perf_counter() - start)
+        scorer.close()
+
+        if reference is None:
+            reference = scores
+        results.append({
+            "workers": workers,
+            "fit_seconds": fit_seconds,
+            "score_seconds": min(timings),
+            "readings_per_second": len(X) / min(timings),
+            "matches_single_worker": bool(np.allclose(scores, reference))
+        })
+
+    base = results[0]
+    for result in results:
+        result["fit_efficiency"] = base["fit_seconds"] / (result["workers"] * result["fit_seconds"])
+        result["score_efficiency"] = base["score_seconds"] / (result["workers"] * result["score_seconds"])
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure per-sensor anomaly scoring scaling across cores")
+    parser.add_argument("--readings", type=int, default=1000000)
+    parser.add_argument("--sensors", type=int, default=200)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    sensor_ids, X, _ = synthetic_sensor_readings(args.readings, args.sensors, seed=args.seed)
+    worker_counts = sorted({1, 2, 4, 8, 16, args.max_workers} & set(range(1, args.max_workers + 1)))
+    print(json.dumps({
+        "readings": args.readings,
+        "sensors": args.sensors,
+        "cpu_count": os.cpu_count(),
+        "results": measure_scaling(sensor_ids, X, worker_counts)
+    }, indent=2))
@@ -0,0 +1,102 @@
+import argparse
+import json
+import random
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+from sklearn.cluster import KMeans
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from ai.threat_detection import ThreatDetector
+
+# Topic vocabularies used to build synthetic threat descriptions
+TOPICS = [
+    "network intrusion firewall malware phishing server breach credentials ransomware",
+    "bomb explosive package station device evacuation suspicious unattended",
+    "flood river water levee rainfall dam overflow evacuation",
+    "fire smoke building alarm wildfire arson blaze hazard",
+    "protest crowd march police riot gathering unrest barricade",
+    "outage power grid substation blackout transformer failure",
+    "drone airspace surveillance aircraft perimeter restricted",
+    "chemical spill toxic leak hazardous plume contamination"
+]
+
+
+def synthetic_threats(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Generate seeded threat records drawn from a few topics plus noise words
+    """
+    rng = random.Random(seed)
+    topics = [topic.split() for topic in TOPICS]
+    noise = [f"term{i}" for i in range(5000)]
+    threats = []
+    for _ in range(count):
+        words = rng.choice(topics)
+        threats.append({
+            "title": " ".join(rng.choice(words) for _ in range(4)),
+            "description": " ".join(
+                rng.choice(words) if rng.random() < 0.6 else rng.choice(noise) for _ in range(30)
+            )
+        })
+    return threats
+
+
+def dense_patterns(threat_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Previous detect_patterns implementation: dense clustering and a second
+    TF-IDF transform per cluster for top terms
+    """
+    tfidf = TfidfVectorizer(max_features=1000, stop_words="english")
+    kmeans = KMeans(n_clusters=5)
+    texts = [data.get("description", "") + " " + data.get("title", "") for data in threat_data]
+    tfidf_matrix = tfidf.fit_transform(texts)
+    clusters = kmeans.fit_predict(tfidf_matrix.toarray())
+
+    patterns = []
+    for cluster_id in range(kmeans.n_clusters):
+        cluster_indices = np.where(clusters == cluster_id)[0]
+        if len(cluster_indices) > 1:
+            cluster_tfidf = tfidf.transform([texts[i] for i in cluster_indices])
+            feature_names = tfidf.get_feature_names_out()
+            mean_tfidf = cluster_tfidf.mean(axis=0).A1
+            top_terms_idx = mean_tfidf.argsort()[-5:][::-1]
+            patterns.append({
+                "cluster_id": int(cluster_id),
+                "count": len(cluster_indices),
+                "common_terms": [feature_names[idx] for idx in top_terms_idx if mean_tfidf[idx] > 0]
+            })
+    return patterns
+
+
+def measure(function: Callable[[], Any]) -> Dict[str, float]:
+    """
+    Run function once and report wall time and peak traced allocation
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    function()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": seconds, "peak_mb": peak / 2 ** 20}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare dense and sparse detect_patterns")
+    parser.add_argument("--threats", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    threats = synthetic_threats(args.threats, seed=args.seed)
+    detector = ThreatDetector()
+
+    results = {
+        "threats": args.threats,
+        "dense": measure(lambda: dense_patterns(threats)),
+        "sparse": measure(lambda: detector.detect_patterns(threats))
+    }
+    results["speedup"] = results["dense"]["seconds"] / results["sparse"]["seconds"]
+    results["memory_ratio"] = results["sparse"]["peak_mb"] / results["dense"]["peak_mb"]
+    print(json.dumps(results, indent=2))
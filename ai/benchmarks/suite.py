@@ -0,0 +1,337 @@
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import sklearn
+import torch
+from transformers import BertConfig, BertModel, BertTokenizerFast
+
+from ai.benchmarks.embedding_batching import WORDS, synthetic_posts
+from ai.benchmarks.sparse_patterns import synthetic_threats
+from ai.model_registry import model_registry
+from ai.threat_detection import EMBEDDING_DIM, ThreatDetector
+
+# Registry key of the offline encoder; never resolved against the model hub
+TINY_MODEL_NAME = "benchmark-tiny-bert"
+
+# Sweeps per method: input sizes, and batch sizes where the method takes one
+FULL_SWEEP = {
+    "process_text": {"input_sizes": [16, 64, 256]},
+    "embed_texts": {"input_sizes": [256], "batch_sizes": [1, 8, 32, 64]},
+    "detect_anomalies": {"input_sizes": [1000, 10000, 100000]},
+    "analyze_social_media": {"input_sizes": [64, 256, 1024]},
+    "detect_patterns": {"input_sizes": [1000, 10000]},
+    "detect_patterns_incremental": {"input_sizes": [1000, 10000]},
+    "generate_threat_report": {"input_sizes": [1000, 10000, 100000]}
+}
+
+QUICK_SWEEP = {
+    "process_text": {"input_sizes": [16, 64]},
+    "embed_texts": {"input_sizes": [64], "batch_sizes": [1, 32]},
+    "detect_anomalies": {"input_sizes": [1000, 10000]},
+    "analyze_social_media": {"input_sizes": [64]},
+    "detect_patterns": {"input_sizes": [1000]},
+    "detect_patterns_incremental": {"input_sizes": [1000]},
+    "generate_threat_report": {"input_sizes": [1000, 10000]}
+}
+
+
+def register_tiny_encoder(seed: int = 0, num_layers: int = 2) -> str:
+    """
+    Register a small random-weight BERT under TINY_MODEL_NAME
+
+    The tokenizer vocabulary is generated from the synthetic word list
+    plus single characters, so no files are downloaded. Hidden size stays
+    at EMBEDDING_DIM so embeddings have the production shape.
+    """
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + sorted(set(WORDS))
+    vocab += list("abcdefghijklmnopqrstuvwxyz0123456789") + [f"##{c}" for c in "abcdefghijklmnopqrstuvwxyz0123456789"]
+    vocab += list(".,!?'-:")
+    vocab_dir = tempfile.mkdtemp(prefix="benchmark-vocab-")
+    vocab_path = os.path.join(vocab_dir, "vocab.txt")
+    with open(vocab_path, "w") as vocab_file:
+        vocab_file.write("\n".join(vocab))
+
+    torch.manual_seed(seed)
+    config = BertConfig(
+        vocab_size=len(vocab),
+        hidden_size=EMBEDDING_DIM,
+        num_hidden_layers=num_layers,
+        num_attention_heads=12,
+        intermediate_size=1024
+    )
+    model_registry.register(TINY_MODEL_NAME, {
+        "tokenizer": BertTokenizerFast(vocab_path, do_lower_case=True),
+        "model": BertModel(config).eval()
+    })
+    return TINY_MODEL_NAME
+
+
+def synthetic_text(words: int, rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def synthetic_readings(count: int, seed: int = 0, anomaly_rate: float = 0.01) -> List[Dict[str, Any]]:
+    """
+    Generate sensor readings with a small share of shifted outliers
+    """
+    rng = np.random.default_rng(seed)
+    values = rng.normal(loc=[25.0, 60.0, 1013.0], scale=[1.0, 5.0, 2.0], size=(count, 3))
+    outliers = rng.random(count) < anomaly_rate
+    values[outliers] += rng.normal(scale=[15.0, 30.0, 40.0], size=(int(outliers.sum()), 3))
+    return [
+        {"sensor_id": f"sensor-{i % 100}", "temperature": t, "humidity": h, "pressure": p}
+        for i, (t, h, p) in enumerate(values.tolist())
+    ]
+
+
+def synthetic_analysis(count: int, seed: int = 0) -> Dict[str, Any]:
+    """
+    Generate analysis results of the shape generate_threat_report consumes
+    """
+    rng = random.Random(seed)
+    severities = ["low", "medium", "high"]
+    return {
+        "threats": [{"title": f"threat {i}", "severity": rng.choice(severities)} for i in range(count)],
+        "anomalies": [{"data_id": str(i), "anomaly_score": -rng.random()} for i in range(count // 10)],
+        "social_media_threats": [{"post_id": str(i), "threat_score": rng.random()} for i in range(count // 10)],
+        "patterns": [{"cluster_id": i, "count": 2} for i in range(5)]
+    }
+
+
+def _current_rss_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+class PeakRssSampler:
+    def __init__(self, interval: float = 0.005):
+        """
+        Track peak resident set size while a block runs
+
+        RSS is sampled from /proc in a background thread. Where /proc is not
+        available, the process-lifetime peak from getrusage is reported.
+        """
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self) -> None:
+        while not self._stop.is_set():
+            rss = _current_rss_bytes()
+            if rss is not None:
+                self.peak = max(self.peak, rss)
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "PeakRssSampler":
+        self.peak = _current_rss_bytes() or 0
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+        rss = _current_rss_bytes()
+        if rss is None:
+            # ru_maxrss is in KiB on Linux and bytes on macOS
+            maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            self.peak = maxrss if platform.system() == "Darwin" else maxrss * 1024
+        else:
+            self.peak = max(self.peak, rss)
+
+
+# A benchmark case: calls to time, and the number of items each call processes
+Case = Tuple[List[Callable[[], Any]], int]
+
+
+def build_case(
+    method: str,
+    input_size: int,
+    batch_size: Optional[int],
+    repeats: int,
+    seed: int
+) -> Case:
+    """
+    Build fresh inputs and a detector for one point of the sweep
+    """
+    rng = random.Random(seed)
+
+    if method == "process_text":
+        detector = ThreatDetector(model_name=TINY_MODEL_NAME)
+        texts = [synthetic_text(input_size, rng) for _ in range(repeats * 10)]
+        return [lambda text=text: detector.process_text(text) for text in texts], 1
+
+    if method == "embed_texts":
+        detector = ThreatDetector(model_name=TINY_MODEL_NAME)
+        texts = synthetic_posts(input_size, seed=seed)
+        return [lambda: detector.embed_texts(texts, batch_size=batch_size)] * repeats, input_size
+
+    if method == "detect_anomalies":
+        detector = ThreatDetector(model_name=TINY_MODEL_NAME)
+        detector.anomaly_model.random_state = seed
+        detector.fit_baseline(synthetic_readings(20000, seed=seed))
+        # Keep background refits out of the measurement
+        detector.anomaly_model.refit_every = np.iinfo(np.int64).max
+        readings = synthetic_readings(input_size, seed=seed + 1)
+        return [lambda: detector.detect_anomalies(readings)] * repeats, input_size
+
+    if method == "analyze_social_media":
+        detector = ThreatDetector(model_name=TINY_MODEL_NAME)
+        posts = [
+            {"post_id": str(i), "content": text, "platform": "twitter"}
+            for i, text in enumerate(synthetic_posts(input_size, seed=seed))
+        ]
+        return [lambda: detector.analyze_social_media(posts)] * repeats, input_size
+
+    if method == "detect_patterns":
+        detector = ThreatDetector(model_name=TINY_MODEL_NAME)
+        threats = synthetic_threats(input_size, seed=seed)
+        return [lambda: detector.detect_patterns(threats)] * repeats, input_size
+
+    if method == "detect_patterns_incremental":
+        detector = ThreatDetector(model_name=TINY_MODEL_NAME)
+        batches = [synthetic_threats(input_size, seed=seed + i) for i in range(repeats + 1)]
+        return [lambda batch=batch: detector.detect_patterns(batch, incremental=True) for batch in batches], input_size
+
+    if method == "generate_threat_report":
+        detector = ThreatDetector(model_name=TINY_MODEL_NAME)
+        analysis = synthetic_analysis(input_size, seed=seed)
+        return [lambda: detector.generate_threat_report(analysis)] * repeats, input_size
+
+    raise ValueError(f"Unknown benchmark method: {method}")
+
+
+def run_case(calls: List[Callable[[], Any]], items_per_call: int) -> Dict[str, Any]:
+    """
+    Run the calls (the first one is a warm-up) and summarize timings
+    """
+    calls[0]()
+    latencies = []
+    with PeakRssSampler() as rss:
+        for call in calls[1:] or calls:
+            start = time.perf_counter()
+            call()
+            latencies.append(time.perf_counter() - start)
+
+    latencies = np.array(latencies)
+    items = items_per_call * len(latencies)
+    return {
+        "calls": len(latencies),
+        "items": items,
+        "total_seconds": float(latencies.sum()),
+        "throughput_items_per_second": float(items / latencies.sum()),
+        "latency_p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "latency_p99_ms": float(np.percentile(latencies, 99) * 1000),
+        "peak_rss_mb": rss.peak / 2 ** 20
+    }
+
+
+def run_suite(
+    sweep: Dict[str, Dict[str, List[int]]],
+    repeats: int = 5,
+    seed: int = 0,
+    methods: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Run every method over its sweep and return results with run metadata
+    """
+    register_tiny_encoder(seed=seed)
+    results = []
+    for method, points in sweep.items():
+        if methods and method not in methods:
+            continue
+        for input_size in points["input_sizes"]:
+            for batch_size in points.get("batch_sizes", [None]):
+                calls, items_per_call = build_case(method, input_size, batch_size, repeats, seed)
+                result = {"method": method, "input_size": input_size, "batch_size": batch_size}
+                result.update(run_case(calls, items_per_call))
+                results.append(result)
+                print(
+                    f"{method:30s} size={input_size:<7d} batch={str(batch_size):<5s} "
+                    f"{result['throughput_items_per_second']:12.1f} items/s  "
+                    f"p50={result['latency_p50_ms']:9.2f} ms  p99={result['latency_p99_ms']:9.2f} ms  "
+                    f"rss={result['peak_rss_mb']:7.1f} MB"
+                )
+
+    return {
+        "metadata": {
+            "created_at": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "torch_threads": torch.get_num_threads(),
+            "numpy": np.__version__,
+            "sklearn": sklearn.__version__,
+            "torch": torch.__version__,
+            "encoder": TINY_MODEL_NAME,
+            "repeats": repeats,
+            "seed": seed
+        },
+        "results": results
+    }
+
+
+def compare_results(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Throughput and p99 ratios (current / baseline) for cases present in both runs
+    """
+    def key(result: Dict[str, Any]) -> Tuple[str, int, Optional[int]]:
+        return result["method"], result["input_size"], result["batch_size"]
+
+    previous = {key(result): result for result in baseline["results"]}
+    comparison = []
+    for result in current["results"]:
+        before = previous.get(key(result))
+        if before is None:
+            continue
+        comparison.append({
+            "method": result["method"],
+            "input_size": result["input_size"],
+            "batch_size": result["batch_size"],
+            "throughput_ratio": result["throughput_items_per_second"] / before["throughput_items_per_second"],
+            "latency_p99_ratio": result["latency_p99_ms"] / before["latency_p99_ms"]
+        })
+    return comparison
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark ThreatDetector hot paths offline")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--quick", action="store_true", help="Run a smaller sweep")
+    parser.add_argument("--methods", nargs="*", help="Only run these methods")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    suite = run_suite(QUICK_SWEEP if args.quick else FULL_SWEEP, args.repeats, args.seed, args.methods)
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            suite["comparison"] = compare_results(suite, json.load(baseline_file))
+        for row in suite["comparison"]:
+            print(
+                f"{row['method']:30s} size={row['input_size']:<7d} batch={str(row['batch_size']):<5s} "
+                f"throughput x{row['throughput_ratio']:.2f}  p99 x{row['latency_p99_ratio']:.2f}"
+            )
+
+    with open(args.output, "w") as output_file:
+        json.dump(suite, output_file, indent=2)
+    print(f"Results written to {args.output}")
@@ -0,0 +1,189 @@
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from ai.keyword_matcher import KeywordHit, KeywordMatcher, get_threat_matcher
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Posts whose keyword score exceeds this are high severity and are always reported
+HIGH_SEVERITY_SCORE = 2.0
+
+# Screening probability below which a post is settled as harmless
+NEGATIVE_THRESHOLD = float(os.getenv("AI_CASCADE_NEGATIVE_THRESHOLD", 0.1))
+
+# Screening probability at or above which a post is settled as a threat
+POSITIVE_THRESHOLD = float(os.getenv("AI_CASCADE_POSITIVE_THRESHOLD", 0.9))
+
+# Decisions of a cascade stage
+NEGATIVE = 0
+POSITIVE = 1
+UNCERTAIN = -1
+
+# Stage names, in the order posts pass through them
+CASCADE_STAGES = ("screen", "encoder")
+
+
+class ScreeningResult(NamedTuple):
+    decisions: np.ndarray
+    probabilities: np.ndarray
+    keyword_scores: np.ndarray
+    keyword_hits: List[List[KeywordHit]]
+
+
+class ThreatCascade:
+    def __init__(
+        self,
+        keyword_matcher: Optional[KeywordMatcher] = None,
+        negative_threshold: float = NEGATIVE_THRESHOLD,
+        positive_threshold: float = POSITIVE_THRESHOLD,
+        n_features: int = 2 ** 18
+    ):
+        """
+        Initialize a cheap-first threat classification cascade
+
+        The screening stage scores each post with the keyword matcher and a
+        logistic regression over hashed word 1-2 gram features. Posts with a
+        probability below ``negative_threshold`` are settled as harmless,
+        posts at or above ``positive_threshold`` as threats; only the rest go
+        to the encoder stage. Posts whose keyword score is above
+        HIGH_SEVERITY_SCORE are always settled as threats, so the screen can
+        never drop a high-severity post. Before ``fit`` the screen uses
+        keywords alone: posts without any keyword are harmless. Without a
+        fitted encoder-stage model, embeddings cannot change a decision, so
+        the screen settles every post itself: those it is unsure about are
+        threats when they matched any keyword.
+        """
+        if not 0.0 <= negative_threshold <= positive_threshold <= 1.0:
+            raise ValueError("Cascade thresholds must satisfy 0 <= negative <= positive <= 1")
+        self.keyword_matcher = keyword_matcher or get_threat_matcher()
+        self.negative_threshold = negative_threshold
+        self.positive_threshold = positive_threshold
+        self.vectorizer = HashingVectorizer(
+            n_features=n_features, ngram_range=(1, 2), alternate_sign=False, norm="l2"
+        )
+        self.classifier = LogisticRegression(solver="liblinear", class_weight="balanced")
+        # Optional second-stage classifier on encoder embeddings
+        self.embedding_classifier: Optional[LogisticRegression] = None
+        self.reset_stats()
+
+    @property
+    def is_fitted(self) -> bool:
+        return hasattr(self.classifier, "coef_")
+
+    def reset_stats(self) -> None:
+        """
+        Clear the per-stage counters
+        """
+        self.posts = 0
+        self.stage_counts = {stage: 0 for stage in CASCADE_STAGES}
+        self.stage_seconds = {stage: 0.0 for stage in CASCADE_STAGES}
+
+    def fit(
+        self,
+        texts: Sequence[str],
+        labels: Sequence[int],
+        embeddings: Optional[np.ndarray] = None
+    ) -> "ThreatCascade":
+        """
+        Fit the screening model, and the encoder-stage model when embeddings are given
+
+        Labels are 1 for threats and 0 for harmless posts.
+        """
+        labels = np.asarray(labels, dtype=np.int64)
+        if len(np.unique(labels)) < 2:
+            raise ValueError("Cascade training data needs both threat and harmless posts")
+        self.classifier.fit(self.vectorizer.transform(texts), labels)
+        if embeddings is not None:
+            self.embedding_classifier = LogisticRegression(max_iter=1000, class_weight="balanced")
+            self.embedding_classifier.fit(np.asarray(embeddings), labels)
+        logger.info(f"Fitted threat cascade on {len(labels)} posts ({int(labels.sum())} threats)")
+        return self
+
+    def screen(self, texts: Sequence[str]) -> ScreeningResult:
+        """
+        Run the screening stage and settle the posts it is confident about
+        """
+        start = time.perf_counter()
+        keyword_hits = [self.keyword_matcher.find_all(text) for text in texts]
+        keyword_scores = np.array(
+            [sum({hit.keyword: hit.weight for hit in hits}.values()) for hits in keyword_hits], dtype=np.float64
+        )
+
+        decisions = np.full(len(texts), UNCERTAIN, dtype=np.int64)
+        if self.is_fitted and len(texts):
+            probabilities = self.classifier.predict_proba(self.vectorizer.transform(texts))[:, 1]
+            decisions[probabilities < self.negative_threshold] = NEGATIVE
+            decisions[probabilities >= self.positive_threshold] = POSITIVE
+        else:
+            probabilities = np.full(len(texts), np.nan)
+            decisions[keyword_scores == 0] = NEGATIVE
+        if self.embedding_classifier is None:
+            # The encoder stage would decide by keyword match anyway, so skip embedding
+            uncertain = decisions == UNCERTAIN
+            decisions[uncertain] = np.where(keyword_scores[uncertain] > 0, POSITIVE, NEGATIVE)
+        decisions[keyword_scores > HIGH_SEVERITY_SCORE] = POSITIVE
+
+        self.posts += len(texts)
+        self.stage_counts["screen"] += int(np.count_nonzero(decisions != UNCERTAIN))
+        self.stage_seconds["screen"] += time.perf_counter() - start
+        return ScreeningResult(decisions, probabilities, keyword_scores, keyword_hits)
+
+    def classify_embedded(self, embeddings: np.ndarray, keyword_scores: np.ndarray) -> np.ndarray:
+        """
+        Settle the posts the screen left uncertain from their embeddings
+
+        Without an encoder-stage model a post is a threat when it matched
+        any keyword, as in the detector's keyword-only path.
+        """
+        if self.embedding_classifier is not None and len(embeddings):
+            positive = self.embedding_classifier.predict(embeddings) == 1
+        else:
+            positive = keyword_scores > 0
+        return np.where(positive | (keyword_scores > HIGH_SEVERITY_SCORE), POSITIVE, NEGATIVE)
+
+    def run_encoder_stage(
+        self,
+        texts: Sequence[str],
+        keyword_scores: np.ndarray,
+        embed: Callable[[List[str]], np.ndarray]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Embed the uncertain posts with ``embed`` and classify them
+
+        Returns ``(decisions, embeddings)``.
+        """
+        start = time.perf_counter()
+        embeddings = embed(list(texts))
+        decisions = self.classify_embedded(embeddings, keyword_scores)
+        self.stage_counts["encoder"] += len(texts)
+        self.stage_seconds["encoder"] += time.perf_counter() - start
+        return decisions, embeddings
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Fraction of posts each stage settled and the time it took, since the last reset
+        """
+        stages = {}
+        for stage in CASCADE_STAGES:
+            stages[stage] = {
+                "settled": self.stage_counts[stage],
+                "settled_fraction": self.stage_counts[stage] / self.posts if self.posts else 0.0,
+                "seconds": self.stage_seconds[stage]
+            }
+        encoded = self.stage_counts["encoder"]
+        return {
+            "posts": self.posts,
+            "negative_threshold": self.negative_threshold,
+            "positive_threshold": self.positive_threshold,
+            "fitted": self.is_fitted,
+            "encoder_call_reduction": self.posts / encoded if encoded else None,
+            "stages": stages
+        }
@@ -0,0 +1,308 @@
+import logging
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.decomposition import PCA
+from sklearn.metrics import adjusted_rand_score
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Storage formats for projected embeddings
+STORAGE_FORMATS = ("float16", "pq")
+
+# Most vectors used to fit the projection and the PQ codebooks
+MAX_TRAINING_VECTORS = 65536
+
+# Rows decoded or compared per step, bounding temporary float32 memory
+CHUNK_ROWS = 65536
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class EmbeddingCompressor:
+    def __init__(
+        self,
+        dim: int = 128,
+        storage: str = "float16",
+        n_subvectors: int = 16,
+        n_centroids: int = 256,
+        random_state: Optional[int] = 0
+    ):
+        """
+        Initialize a compact representation for text embeddings
+
+        Embeddings are L2-normalized and projected onto their top ``dim``
+        PCA components. The projection is stored either as float16
+        (``2 * dim`` bytes per vector) or as product-quantized codes: the
+        projection is split into ``n_subvectors`` parts and each part is
+        replaced by the index of its nearest of ``n_centroids`` centroids
+        (one byte per part). Distances are computed on the stored form
+        directly; squared distances between normalized embeddings are
+        ``2 - 2 * cosine``, so ranking by distance ranks by cosine.
+        """
+        if storage not in STORAGE_FORMATS:
+            raise ValueError(f"Unknown embedding storage: {storage}")
+        if storage == "pq" and (dim % n_subvectors != 0 or n_centroids > 256):
+            raise ValueError("PQ needs dim divisible by n_subvectors and at most 256 centroids")
+        self.dim = dim
+        self.storage = storage
+        self.n_subvectors = n_subvectors
+        self.n_centroids = n_centroids
+        self.random_state = random_state
+        self.input_dim: Optional[int] = None
+        self.mean: Optional[np.ndarray] = None
+        self.components: Optional[np.ndarray] = None
+        self.explained_variance_ratio = 0.0
+        # (n_subvectors, n_centroids, dim // n_subvectors) for PQ
+        self.codebooks: Optional[np.ndarray] = None
+
+    @property
+    def is_fitted(self) -> bool:
+        return self.components is not None
+
+    @property
+    def code_shape(self) -> Tuple[int, Any]:
+        """
+        Width and dtype of one stored vector
+        """
+        if self.storage == "pq":
+            return self.n_subvectors, np.uint8
+        return self.dim, np.float16
+
+    @property
+    def bytes_per_vector(self) -> int:
+        width, dtype = self.code_shape
+        return width * np.dtype(dtype).itemsize
+
+    def fit(self, embeddings: np.ndarray) -> "EmbeddingCompressor":
+        """
+        Fit the PCA projection, and the PQ codebooks, on sample embeddings
+        """
+        vectors = _normalize(embeddings)
+        if len(vectors) > MAX_TRAINING_VECTORS:
+            rng = np.random.default_rng(self.random_state)
+            vectors = vectors[rng.choice(len(vectors), MAX_TRAINING_VECTORS, replace=False)]
+        if len(vectors) < self.dim:
+            raise ValueError(f"Need at least {self.dim} embeddings to fit a {self.dim}-dim projection")
+
+        pca = PCA(n_components=self.dim, svd_solver="randomized", random_state=self.random_state)
+        pca.fit(vectors)
+        self.input_dim = vectors.shape[1]
+        self.mean = pca.mean_.astype(np.float32)
+        self.components = pca.components_.astype(np.float32)
+        self.explained_variance_ratio = float(pca.explained_variance_ratio_.sum())
+
+        if self.storage == "pq":
+            if len(vectors) < self.n_centroids:
+                raise ValueError(f"Need at least {self.n_centroids} embeddings to fit PQ codebooks")
+            projected = self.project(vectors, normalized=True)
+            width = self.dim // self.n_subvectors
+            codebooks = np.empty((self.n_subvectors, self.n_centroids, width), dtype=np.float32)
+            for part in range(self.n_subvectors):
+                kmeans = MiniBatchKMeans(
+                    n_clusters=self.n_centroids, random_state=self.random_state, n_init=3, batch_size=4096
+                )
+                kmeans.fit(projected[:, part * width:(part + 1) * width])
+                codebooks[part] = kmeans.cluster_centers_
+            self.codebooks = codebooks
+
+        logger.info(
+            f"Fitted {self.storage} embedding compressor: {self.input_dim} -> {self.dim} dims, "
+            f"{self.explained_variance_ratio:.1%} variance kept, {self.bytes_per_vector} bytes per vector"
+        )
+        return self
+
+    def project(self, embeddings: np.ndarray, normalized: bool = False) -> np.ndarray:
+        """
+        Normalize embeddings and project them onto the PCA components (float32)
+        """
+        if not self.is_fitted:
+            raise RuntimeError("Embedding compressor is not fitted; call fit first")
+        vectors = np.asarray(embeddings, dtype=np.float32) if normalized else _normalize(embeddings)
+        return (vectors - self.mean) @ self.components.T
+
+    def _nearest_codes(self, projected: np.ndarray) -> np.ndarray:
+        width = self.dim // self.n_subvectors
+        codes = np.empty((len(projected), self.n_subvectors), dtype=np.uint8)
+        for part in range(self.n_subvectors):
+            centroids = self.codebooks[part]
+            sub = projected[:, part * width:(part + 1) * width]
+            # argmin ||x - c||^2 = argmin (||c||^2 - 2 x.c)
+            distances = np.sum(centroids * centroids, axis=1) - 2.0 * (sub @ centroids.T)
+            codes[:, part] = np.argmin(distances, axis=1)
+        return codes
+
+    def quantize(self, projected: np.ndarray) -> np.ndarray:
+        """
+        Stored form of vectors that are already projected
+        """
+        if self.storage == "pq":
+            return self._nearest_codes(projected)
+        return np.asarray(projected, dtype=np.float16)
+
+    def encode(self, embeddings: np.ndarray) -> np.ndarray:
+        """
+        Compress embeddings to their stored form
+        """
+        embeddings = np.atleast_2d(embeddings)
+        width, dtype = self.code_shape
+        codes = np.empty((len(embeddings), width), dtype=dtype)
+        for start in range(0, len(embeddings), CHUNK_ROWS):
+            codes[start:start + CHUNK_ROWS] = self.quantize(self.project(embeddings[start:start + CHUNK_ROWS]))
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """
+        Approximate projected vectors (float32) from stored codes
+        """
+        if self.storage == "pq":
+            parts = [self.codebooks[part][codes[:, part]] for part in range(self.n_subvectors)]
+            return np.concatenate(parts, axis=1)
+        return np.asarray(codes, dtype=np.float32)
+
+    def squared_distances(self, query: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """
+        Squared distances from one projected query to every stored vector
+
+        PQ codes use asymmetric distance computation: a table of the
+        query's distance to every centroid is built once, and each stored
+        vector's distance is the sum of its parts' table entries. float16
+        vectors are widened to float32 one chunk at a time.
+        """
+        query = np.asarray(query, dtype=np.float32).ravel()
+        if self.storage == "pq":
+            width = self.dim // self.n_subvectors
+            table = np.stack([
+                np.sum((self.codebooks[part] - query[part * width:(part + 1) * width]) ** 2, axis=1)
+                for part in range(self.n_subvectors)
+            ])
+            return np.sum(table[np.arange(self.n_subvectors), codes.astype(np.intp)], axis=1)
+
+        distances = np.empty(len(codes), dtype=np.float32)
+        query_norm = float(query @ query)
+        for start in range(0, len(codes), CHUNK_ROWS):
+            block = codes[start:start + CHUNK_ROWS].astype(np.float32)
+            distances[start:start + CHUNK_ROWS] = (
+                np.einsum("ij,ij->i", block, block) - 2.0 * (block @ query) + query_norm
+            )
+        return np.maximum(distances, 0.0)
+
+    def similarities(self, query: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """
+        Approximate cosine similarity of one projected query to every stored vector
+        """
+        return 1.0 - self.squared_distances(query, codes) / 2.0
+
+    def get_state(self) -> Dict[str, Any]:
+        """
+        Fitted state as plain values and arrays, for saving with the index
+        """
+        return {
+            "dim": self.dim,
+            "storage": self.storage,
+            "n_subvectors": self.n_subvectors,
+            "n_centroids": self.n_centroids,
+            "input_dim": self.input_dim,
+            "explained_variance_ratio": self.explained_variance_ratio,
+            "mean": self.mean,
+            "components": self.components,
+            "codebooks": self.codebooks
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "EmbeddingCompressor":
+        compressor = cls(
+            dim=int(state["dim"]),
+            storage=str(state["storage"]),
+            n_subvectors=int(state["n_subvectors"]),
+            n_centroids=int(state["n_centroids"])
+        )
+        compressor.input_dim = int(state["input_dim"])
+        compressor.explained_variance_ratio = float(state["explained_variance_ratio"])
+        compressor.mean = np.asarray(state["mean"], dtype=np.float32)
+        compressor.components = np.asarray(state["components"], dtype=np.float32)
+        codebooks = state.get("codebooks")
+        compressor.codebooks = None if codebooks is None else np.asarray(codebooks, dtype=np.float32)
+        return compressor
+
+    def save(self, path: str) -> None:
+        """
+        Write the fitted state to a single ``.npz`` file
+        """
+        state = {name: value for name, value in self.get_state().items() if value is not None}
+        with open(path, "wb") as state_file:
+            np.savez(state_file, **state)
+
+    @classmethod
+    def load(cls, path: str) -> "EmbeddingCompressor":
+        with np.load(path, allow_pickle=False) as data:
+            state = {name: data[name] for name in data.files}
+        if "storage" in state:
+            state["storage"] = str(state["storage"])
+        return cls.from_state(state)
+
+
+def _exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ vectors.T
+    return np.argpartition(-scores, k, axis=1)[:, :k]
+
+
+def evaluate_compression(
+    compressor: EmbeddingCompressor,
+    embeddings: np.ndarray,
+    queries: np.ndarray,
+    k: int = 10,
+    n_clusters: int = 5
+) -> Dict[str, Any]:
+    """
+    Report the memory saved and the recall and clustering changes
+
+    recall@k is the overlap of each query's k nearest neighbours by
+    compressed distance with its exact float32 cosine neighbours. Cluster
+    agreement is the adjusted Rand index between KMeans on the original and
+    on the decoded compressed embeddings (1.0 means identical clusterings).
+    """
+    vectors = _normalize(embeddings)
+    query_vectors = _normalize(queries)
+    original_bytes = vectors.shape[1] * 4
+
+    start = time.perf_counter()
+    codes = compressor.encode(vectors)
+    encode_seconds = time.perf_counter() - start
+
+    exact = _exact_top_k(vectors, query_vectors, k)
+    projected_queries = compressor.project(query_vectors, normalized=True)
+    hits = 0
+    start = time.perf_counter()
+    for query, expected in zip(projected_queries, exact):
+        distances = compressor.squared_distances(query, codes)
+        found = np.argpartition(distances, k)[:k]
+        hits += len(np.intersect1d(found, expected))
+    search_seconds = time.perf_counter() - start
+
+    original_clusters = KMeans(n_clusters=n_clusters, random_state=0).fit_predict(vectors)
+    compressed_clusters = KMeans(n_clusters=n_clusters, random_state=0).fit_predict(compressor.decode(codes))
+
+    return {
+        "vectors": len(vectors),
+        "storage": compressor.storage,
+        "dim": compressor.dim,
+        "explained_variance_ratio": compressor.explained_variance_ratio,
+        "original_bytes_per_vector": original_bytes,
+        "compressed_bytes_per_vector": compressor.bytes_per_vector,
+        "compression_ratio": original_bytes / compressor.bytes_per_vector,
+        "original_mb": len(vectors) * original_bytes / 1e6,
+        "compressed_mb": codes.nbytes / 1e6,
+        f"recall_at_{k}": hits / (len(exact) * k),
+        "cluster_agreement_ari": float(adjusted_rand_score(original_clusters, compressed_clusters)),
+        "encode_seconds": encode_seconds,
+        "search_ms_per_query": 1000 * search_seconds / max(len(exact), 1)
+    }
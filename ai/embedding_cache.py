@@ -0,0 +1,246 @@
+import hashlib
+import logging
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: disk tier still works, without cross-process locking
+    fcntl = None
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# File names used by the on-disk tier
+MATRIX_FILE = "embeddings.f32"
+INDEX_FILE = "index.txt"
+
+
+def normalize_text(text: str, lowercase: bool = True) -> str:
+    """
+    Normalize text so trivially different copies share one cache entry
+
+    Applies Unicode NFKC normalization, collapses runs of whitespace and
+    optionally lowercases (safe for uncased models such as bert-base-uncased).
+    """
+    text = unicodedata.normalize("NFKC", text or "")
+    text = " ".join(text.split())
+    return text.lower() if lowercase else text
+
+
+def content_hash(text: str, namespace: str = "", lowercase: bool = True) -> str:
+    """
+    Hash normalized text into a fixed-length hex cache key
+
+    The namespace (normally the model name) keeps embeddings produced by
+    different models apart.
+    """
+    payload = f"{namespace}\0{normalize_text(text, lowercase)}".encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+class DiskEmbeddingStore:
+    def __init__(self, path: str, dim: int, capacity: int):
+        """
+        Open or create a memory-mapped embedding matrix with an index file
+
+        Row ``i`` of the float32 matrix holds the embedding for the key on
+        line ``i`` of the index. Rows are written before their key is
+        appended, so readers in other processes never see a partial row.
+        """
+        os.makedirs(path, exist_ok=True)
+        self.dim = dim
+        self.matrix_path = os.path.join(path, MATRIX_FILE)
+        self.index_path = os.path.join(path, INDEX_FILE)
+
+        if os.path.exists(self.matrix_path):
+            rows = os.path.getsize(self.matrix_path) // (dim * 4)
+            self.matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r+", shape=(rows, dim))
+        else:
+            self.matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="w+", shape=(capacity, dim))
+        self.capacity = self.matrix.shape[0]
+
+        if not os.path.exists(self.index_path):
+            open(self.index_path, "a").close()
+
+        self._rows: Dict[str, int] = {}
+        self._index_offset = 0
+        self._refresh_index()
+
+    def _refresh_index(self) -> None:
+        """
+        Read keys appended to the index file since the last refresh
+        """
+        if os.path.getsize(self.index_path) == self._index_offset:
+            return
+        with open(self.index_path, "r") as index_file:
+            index_file.seek(self._index_offset)
+            for line in index_file:
+                if not line.endswith("\n"):
+                    break  # Partially written line; pick it up next time
+                self._rows[line.rstrip("\n")] = len(self._rows)
+                self._index_offset += len(line)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """
+        Return a copy of the stored embedding for key, or None
+        """
+        row = self._rows.get(key)
+        if row is None:
+            self._refresh_index()
+            row = self._rows.get(key)
+            if row is None:
+                return None
+        return np.array(self.matrix[row])
+
+    def put(self, key: str, embedding: np.ndarray) -> bool:
+        """
+        Append an embedding for key; returns False when the store is full
+        """
+        with open(self.index_path, "a") as index_file:
+            if fcntl is not None:
+                fcntl.flock(index_file, fcntl.LOCK_EX)
+            try:
+                self._refresh_index()
+                if key in self._rows:
+                    return True
+                row = len(self._rows)
+                if row >= self.capacity:
+                    return False
+                self.matrix[row] = embedding
+                self.matrix.flush()
+                line = f"{key}\n"
+                index_file.write(line)
+                index_file.flush()
+                self._rows[key] = row
+                self._index_offset += len(line)
+                return True
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(index_file, fcntl.LOCK_UN)
+
+
+class EmbeddingCache:
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        dim: int = 768,
+        disk_path: Optional[str] = None,
+        disk_capacity: int = 100000,
+        namespace: str = "",
+        lowercase: bool = True
+    ):
+        """
+        Initialize a two-tier embedding cache keyed by normalized content hash
+
+        The hot tier is an in-memory LRU holding at most ``max_entries``
+        embeddings. When ``disk_path`` is set, every new embedding is also
+        written through to a memory-mapped on-disk tier that survives
+        restarts and can be shared by worker processes.
+        """
+        self.max_entries = max_entries
+        self.dim = dim
+        self.namespace = namespace
+        self.lowercase = lowercase
+        self.disk = DiskEmbeddingStore(disk_path, dim, disk_capacity) if disk_path else None
+
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_rejections = 0
+
+    def key(self, text: str) -> str:
+        """
+        Compute the cache key for text
+        """
+        return content_hash(text, self.namespace, self.lowercase)
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        """
+        Look up the embedding for text
+        """
+        return self.get_by_key(self.key(text))
+
+    def put(self, text: str, embedding: np.ndarray) -> None:
+        """
+        Store the embedding for text
+        """
+        self.put_by_key(self.key(text), embedding)
+
+    def get_by_key(self, key: str) -> Optional[np.ndarray]:
+        """
+        Look up an embedding by cache key, promoting disk hits to memory
+        """
+        with self._lock:
+            embedding = self._memory.get(key)
+            if embedding is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return embedding
+
+            if self.disk is not None:
+                embedding = self.disk.get(key)
+                if embedding is not None:
+                    self.disk_hits += 1
+                    self._remember(key, embedding)
+                    return embedding
+
+            self.misses += 1
+            return None
+
+    def put_by_key(self, key: str, embedding: np.ndarray) -> None:
+        """
+        Store an embedding by cache key in memory and, if enabled, on disk
+        """
+        embedding = np.asarray(embedding, dtype=np.float32).reshape(self.dim)
+        with self._lock:
+            self._remember(key, embedding)
+            if self.disk is not None and not self.disk.put(key, embedding):
+                self.disk_rejections += 1
+
+    def _remember(self, key: str, embedding: np.ndarray) -> None:
+        """
+        Insert into the LRU tier, evicting the least recently used entries
+        """
+        self._memory[key] = embedding
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """
+        Empty the in-memory tier; the on-disk tier is left intact
+        """
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report hit/miss/eviction counters and tier sizes for cache sizing
+        """
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "disk_rejections": self.disk_rejections,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "memory_capacity": self.max_entries,
+            "disk_entries": len(self.disk) if self.disk is not None else 0,
+            "disk_capacity": self.disk.capacity if self.disk is not None else 0
+        }
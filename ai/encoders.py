@@ -0,0 +1,215 @@
+import logging
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+try:
+    import onnxruntime
+except ImportError:  # ONNX backend is optional; the PyTorch backend needs nothing extra
+    onnxruntime = None
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Encoder backend used when a detector does not ask for one
+DEFAULT_ENCODER_BACKEND = os.getenv("AI_ENCODER_BACKEND", "torch")
+
+# Directory holding exported ONNX encoders
+ONNX_MODEL_PATH = os.getenv(
+    "AI_ONNX_PATH", os.path.join(os.getenv("AI_MODEL_PATH", "/app/models"), "onnx")
+)
+
+# ONNX Runtime intra-op threads; 0 lets ONNX Runtime pick (one per physical core)
+ONNX_INTRA_OP_THREADS = int(os.getenv("AI_INTRA_OP_THREADS", 0))
+
+# Largest absolute difference from the PyTorch encoder accepted for an export
+PARITY_TOLERANCE = 1e-3
+
+# Model inputs passed to the encoder when the tokenizer produces them
+ENCODER_INPUTS = ("input_ids", "attention_mask", "token_type_ids")
+
+# Texts used to check an exported encoder against PyTorch
+PARITY_TEXTS = [
+    "Bomb threat at city hall, stay away",
+    "Unusual network traffic detected from unknown IP addresses",
+    "Be careful in downtown area today, potential threat reported near the station"
+]
+
+
+class TorchEncoder:
+    name = "torch"
+
+    def __init__(self, model: nn.Module):
+        """
+        Run the encoder eagerly with PyTorch (the default backend)
+        """
+        self.model = model
+
+    def encode(self, inputs: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Return the CLS embedding of each row of a padded, tokenized batch
+        """
+        tensors = {name: torch.from_numpy(np.asarray(inputs[name])) for name in ENCODER_INPUTS if name in inputs}
+        with torch.no_grad():
+            outputs = self.model(**tensors)
+        return outputs.last_hidden_state[:, 0, :].numpy()
+
+
+class _ClsEmbedding(nn.Module):
+    """Wraps an encoder so the exported graph returns only CLS embeddings."""
+
+    def __init__(self, model: nn.Module):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask, token_type_ids):
+        outputs = self.model(input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids)
+        return outputs.last_hidden_state[:, 0, :]
+
+
+def onnx_model_file(model_name: str, path: str = ONNX_MODEL_PATH) -> str:
+    """
+    File an encoder for model_name is exported to
+    """
+    return os.path.join(path, re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name) + ".onnx")
+
+
+def export_onnx(model: nn.Module, output_file: str, opset_version: int = 14) -> str:
+    """
+    Export an encoder to ONNX with dynamic batch and sequence dimensions
+
+    The graph takes input_ids, attention_mask and token_type_ids and returns
+    the CLS embedding. The file is written under a temporary name and moved
+    into place, so concurrent workers never load a partial export.
+    """
+    os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+    dummy = torch.ones((1, 8), dtype=torch.long)
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in ENCODER_INPUTS}
+    dynamic_axes["embedding"] = {0: "batch"}
+
+    tmp_file = f"{output_file}.tmp-{os.getpid()}"
+    kwargs: Dict[str, Any] = {}
+    if "dynamo" in torch.onnx.export.__code__.co_varnames:
+        kwargs["dynamo"] = False  # keep the TorchScript exporter and its dynamic_axes support
+    with torch.no_grad():
+        torch.onnx.export(
+            _ClsEmbedding(model).eval(),
+            (dummy, dummy, torch.zeros_like(dummy)),
+            tmp_file,
+            input_names=list(ENCODER_INPUTS),
+            output_names=["embedding"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset_version,
+            **kwargs
+        )
+    os.replace(tmp_file, output_file)
+    logger.info(f"Exported encoder to {output_file}")
+    return output_file
+
+
+class OnnxEncoder:
+    name = "onnx"
+
+    def __init__(self, model_file: str, intra_op_threads: int = ONNX_INTRA_OP_THREADS):
+        """
+        Run an exported encoder with ONNX Runtime
+
+        The session applies all graph optimizations (constant folding, node
+        fusion such as attention and GELU) and runs on the CPU with
+        ``intra_op_threads`` threads per operator.
+        """
+        if onnxruntime is None:
+            raise ImportError("The ONNX encoder backend requires the onnxruntime package")
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = intra_op_threads
+        self.model_file = model_file
+        self.intra_op_threads = intra_op_threads
+        self.session = onnxruntime.InferenceSession(model_file, options, providers=["CPUExecutionProvider"])
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+
+    def encode(self, inputs: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Return the CLS embedding of each row of a padded, tokenized batch
+        """
+        feed = {}
+        for name in self.input_names:
+            values = inputs.get(name)
+            if values is None:  # tokenizers without segment ids
+                values = np.zeros_like(inputs["input_ids"])
+            feed[name] = np.asarray(values, dtype=np.int64)
+        return self.session.run(None, feed)[0]
+
+    def memory_bytes(self) -> int:
+        """
+        Approximate weight memory as the size of the exported model file
+        """
+        return os.path.getsize(self.model_file)
+
+
+def check_parity(
+    reference: Any,
+    candidate: Any,
+    tokenizer: Any,
+    texts: Optional[List[str]] = None,
+    tolerance: float = PARITY_TOLERANCE
+) -> Dict[str, Any]:
+    """
+    Compare two encoders' embeddings on the same tokenized texts
+    """
+    inputs = tokenizer(texts or PARITY_TEXTS, padding=True, truncation=True, return_tensors="np")
+    expected = reference.encode(inputs)
+    actual = candidate.encode(inputs)
+    max_abs_difference = float(np.abs(expected - actual).max())
+    cosine = np.sum(expected * actual, axis=1) / (
+        np.linalg.norm(expected, axis=1) * np.linalg.norm(actual, axis=1)
+    )
+    return {
+        "max_abs_difference": max_abs_difference,
+        "min_cosine_similarity": float(cosine.min()),
+        "tolerance": tolerance,
+        "passed": max_abs_difference <= tolerance
+    }
+
+
+def create_encoder(
+    backend: str,
+    model: nn.Module,
+    tokenizer: Any,
+    model_name: str,
+    onnx_path: str = ONNX_MODEL_PATH,
+    intra_op_threads: int = ONNX_INTRA_OP_THREADS
+) -> Any:
+    """
+    Build the encoder backend named by ``backend`` ("torch" or "onnx")
+
+    The ONNX backend exports the model on first use and reuses the file
+    afterwards (delete it to re-export after changing weights). Each new
+    session is checked against the PyTorch encoder; if embeddings differ by
+    more than PARITY_TOLERANCE, the PyTorch encoder is used instead.
+    """
+    if backend == "torch":
+        return TorchEncoder(model)
+    if backend != "onnx":
+        raise ValueError(f"Unknown encoder backend: {backend}")
+
+    model_file = onnx_model_file(model_name, onnx_path)
+    if not os.path.exists(model_file):
+        export_onnx(model, model_file)
+    encoder = OnnxEncoder(model_file, intra_op_threads=intra_op_threads)
+
+    parity = check_parity(TorchEncoder(model), encoder, tokenizer)
+    if not parity["passed"]:
+        logger.error(
+            f"ONNX encoder for {model_name} differs from PyTorch by {parity['max_abs_difference']:.2e} "
+            f"(tolerance {parity['tolerance']:.0e}); falling back to PyTorch"
+        )
+        return TorchEncoder(model)
+    logger.info(f"ONNX encoder for {model_name} matches PyTorch (max difference {parity['max_abs_difference']:.2e})")
+    return encoder
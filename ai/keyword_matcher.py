@@ -0,0 +1,220 @@
+import json
+import logging
+import os
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Union
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Default threat lexicon shared by the AI and ingestion paths
+DEFAULT_THREAT_KEYWORDS: Dict[str, float] = {
+    "attack": 1.0,
+    "bomb": 1.0,
+    "threat": 1.0,
+    "danger": 1.0,
+    "emergency": 1.0,
+    "violence": 1.0
+}
+
+
+class KeywordHit(NamedTuple):
+    keyword: str
+    start: int
+    end: int
+    weight: float
+
+
+class _Automaton(NamedTuple):
+    goto: List[Dict[str, int]]
+    fail: List[int]
+    output: List[List[int]]
+    keywords: List[str]
+    weights: List[float]
+
+
+def _build_automaton(keywords: Dict[str, float]) -> _Automaton:
+    """
+    Build an Aho-Corasick automaton (trie, failure links, merged outputs)
+    """
+    goto: List[Dict[str, int]] = [{}]
+    output: List[List[int]] = [[]]
+    names = list(keywords)
+
+    for index, keyword in enumerate(names):
+        state = 0
+        for ch in keyword:
+            next_state = goto[state].get(ch)
+            if next_state is None:
+                next_state = len(goto)
+                goto[state][ch] = next_state
+                goto.append({})
+                output.append([])
+            state = next_state
+        output[state].append(index)
+
+    # Breadth-first pass sets each state's failure link to its longest
+    # proper suffix that is also a trie prefix, and inherits its outputs
+    fail = [0] * len(goto)
+    queue = list(goto[0].values())
+    for state in queue:
+        for ch, next_state in goto[state].items():
+            queue.append(next_state)
+            fallback = fail[state]
+            while fallback and ch not in goto[fallback]:
+                fallback = fail[fallback]
+            fail[next_state] = goto[fallback].get(ch, 0)
+            output[next_state] = output[next_state] + output[fail[next_state]]
+
+    return _Automaton(goto, fail, output, names, [keywords[name] for name in names])
+
+
+def load_keywords(path: str) -> Dict[str, float]:
+    """
+    Load a keyword lexicon from a file
+
+    JSON files hold either a list of keywords or a ``{keyword: weight}``
+    object. Other files hold one keyword per line, optionally followed by a
+    comma and a weight; blank lines and ``#`` comments are skipped.
+    """
+    with open(path, "r", encoding="utf-8") as lexicon_file:
+        if path.endswith(".json"):
+            data = json.load(lexicon_file)
+            if isinstance(data, dict):
+                return {str(k): float(v) for k, v in data.items()}
+            return {str(k): 1.0 for k in data}
+
+        keywords: Dict[str, float] = {}
+        for line in lexicon_file:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            keyword, _, weight = line.partition(",")
+            keywords[keyword.strip()] = float(weight) if weight.strip() else 1.0
+        return keywords
+
+
+class KeywordMatcher:
+    def __init__(
+        self,
+        keywords: Union[Iterable[str], Dict[str, float]],
+        whole_word: bool = False,
+        case_sensitive: bool = False
+    ):
+        """
+        Initialize a multi-pattern keyword matcher
+
+        All keywords are compiled into one Aho-Corasick automaton, so a scan
+        is a single pass over the text whose cost does not depend on the
+        lexicon size. Plain iterables get weight 1.0 per keyword.
+        """
+        self.whole_word = whole_word
+        self.case_sensitive = case_sensitive
+        self._lock = threading.Lock()
+        self._automaton = self._compile(keywords)
+
+    def _compile(self, keywords: Union[Iterable[str], Dict[str, float]]) -> _Automaton:
+        if not isinstance(keywords, dict):
+            keywords = {keyword: 1.0 for keyword in keywords}
+        normalized: Dict[str, float] = {}
+        for keyword, weight in keywords.items():
+            keyword = keyword if self.case_sensitive else keyword.lower()
+            if keyword:
+                normalized[keyword] = float(weight)
+        return _build_automaton(normalized)
+
+    def reload(self, keywords: Union[Iterable[str], Dict[str, float]]) -> None:
+        """
+        Replace the lexicon; scans in progress finish on the old automaton
+        """
+        automaton = self._compile(keywords)
+        with self._lock:
+            self._automaton = automaton
+        logger.info(f"Keyword matcher reloaded with {len(automaton.keywords)} keywords")
+
+    @property
+    def keywords(self) -> Dict[str, float]:
+        automaton = self._automaton
+        return dict(zip(automaton.keywords, automaton.weights))
+
+    def find_all(self, text: str) -> List[KeywordHit]:
+        """
+        Find every keyword occurrence in text with its character span
+        """
+        automaton = self._automaton
+        goto, fail, output = automaton.goto, automaton.fail, automaton.output
+        hits: List[KeywordHit] = []
+        if not text:
+            return hits
+
+        scan = text if self.case_sensitive else text.lower()
+        # Lowercasing can change length for a few Unicode characters; fall
+        # back to per-character folding so spans still index the original
+        if len(scan) != len(text):
+            scan = "".join(ch.lower()[:1] or ch for ch in text)
+
+        state = 0
+        for position, ch in enumerate(scan):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for index in output[state]:
+                keyword = automaton.keywords[index]
+                start = position - len(keyword) + 1
+                end = position + 1
+                if self.whole_word and not self._is_whole_word(text, start, end):
+                    continue
+                hits.append(KeywordHit(keyword, start, end, automaton.weights[index]))
+        return hits
+
+    @staticmethod
+    def _is_whole_word(text: str, start: int, end: int) -> bool:
+        before = text[start - 1] if start > 0 else " "
+        after = text[end] if end < len(text) else " "
+        return not (before.isalnum() or before == "_") and not (after.isalnum() or after == "_")
+
+    def matched_keywords(self, text: str) -> Set[str]:
+        """
+        Distinct keywords found in text
+        """
+        return {hit.keyword for hit in self.find_all(text)}
+
+    def score(self, text: str) -> float:
+        """
+        Sum of weights of the distinct keywords found in text
+        """
+        weights = {hit.keyword: hit.weight for hit in self.find_all(text)}
+        return sum(weights.values())
+
+
+_threat_matcher: Optional[KeywordMatcher] = None
+_threat_matcher_lock = threading.Lock()
+
+
+def get_threat_matcher() -> KeywordMatcher:
+    """
+    Get the process-wide threat keyword matcher
+
+    The lexicon is read from ``THREAT_KEYWORDS_PATH`` when set, otherwise
+    ``DEFAULT_THREAT_KEYWORDS`` is used.
+    """
+    global _threat_matcher
+    if _threat_matcher is None:
+        with _threat_matcher_lock:
+            if _threat_matcher is None:
+                path = os.getenv("THREAT_KEYWORDS_PATH")
+                _threat_matcher = KeywordMatcher(load_keywords(path) if path else DEFAULT_THREAT_KEYWORDS)
+    return _threat_matcher
+
+
+def reload_threat_keywords(keywords: Optional[Union[Iterable[str], Dict[str, float]]] = None) -> KeywordMatcher:
+    """
+    Reload the shared threat lexicon from keywords or from ``THREAT_KEYWORDS_PATH``
+    """
+    if keywords is None:
+        path = os.getenv("THREAT_KEYWORDS_PATH")
+        keywords = load_keywords(path) if path else DEFAULT_THREAT_KEYWORDS
+    matcher = get_threat_matcher()
+    matcher.reload(keywords)
+    return matcher
@@ -0,0 +1,103 @@
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, List
+
+import torch
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def model_memory_bytes(model: Any) -> int:
+    """
+    Estimate the memory held by a model's tensors (parameters and buffers)
+
+    Quantized weights count at their packed size (one byte per int8 value).
+    """
+    if hasattr(model, "memory_bytes"):
+        # Non-PyTorch encoders (e.g. ONNX Runtime sessions) report their own size
+        return model.memory_bytes()
+    if not isinstance(model, torch.nn.Module):
+        return 0
+
+    def tensor_bytes(value: Any) -> int:
+        if isinstance(value, torch.Tensor):
+            return value.numel() * value.element_size()
+        # Dynamically quantized layers store packed (weight, bias) tuples
+        if isinstance(value, (tuple, list)):
+            return sum(tensor_bytes(item) for item in value)
+        return 0
+
+    return sum(tensor_bytes(value) for value in model.state_dict().values())
+
+
+class ModelRegistry:
+    def __init__(self):
+        """
+        Initialize an empty process-wide model registry
+        """
+        self._lock = threading.Lock()
+        self._entries: Dict[Hashable, Dict[str, Any]] = {}
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Return the components registered under key, loading them on first use
+
+        The loader is called at most once per key, even when several threads
+        ask for the same key concurrently. It must return a dict of named
+        components (e.g. ``{"tokenizer": ..., "model": ...}``).
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            return entry
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                logger.info(f"Loading shared model components: {key}")
+                entry = loader()
+                self._entries[key] = entry
+        return entry
+
+    def register(self, key: Hashable, components: Dict[str, Any]) -> None:
+        """
+        Register already-built components under key, replacing any existing entry
+        """
+        with self._lock:
+            self._entries[key] = components
+
+    def is_loaded(self, key: Hashable) -> bool:
+        """
+        Check whether components for key are loaded in this process
+        """
+        return key in self._entries
+
+    def unload(self, key: Hashable) -> bool:
+        """
+        Drop the registry's reference to the components for key
+        """
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def memory_bytes(self, key: Hashable) -> int:
+        """
+        Estimate the tensor memory held by the components for key
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return 0
+        return sum(model_memory_bytes(component) for component in entry.values())
+
+    def status(self) -> List[Dict[str, Any]]:
+        """
+        Describe every loaded entry and its estimated memory use
+        """
+        return [
+            {"key": str(key), "memory_bytes": self.memory_bytes(key)}
+            for key in list(self._entries)
+        ]
+
+
+# Registry shared by every detector in this process
+model_registry = ModelRegistry()
@@ -0,0 +1,141 @@
+import logging
+import re
+import zlib
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from ai.embedding_cache import normalize_text
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Word tokens; punctuation and emoji are ignored when shingling
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Prime just below 2**32; with 32-bit shingle hashes a * x + b fits in uint64
+MINHASH_PRIME = np.uint64(4294967291)
+
+
+class NearDuplicateDetector:
+    def __init__(
+        self,
+        num_perm: int = 64,
+        bands: int = 16,
+        shingle_size: int = 3,
+        threshold: float = 0.5,
+        seed: int = 1
+    ):
+        """
+        Initialize a MinHash/LSH near-duplicate detector for short texts
+
+        Texts are normalized and split into word shingles, ignoring
+        punctuation. Each text gets a ``num_perm`` MinHash signature, which
+        is split into ``bands`` bands for LSH bucketing. Two texts become candidates when any band matches.
+        They are merged when their estimated Jaccard similarity (the fraction
+        of equal signature slots) is at least ``threshold``. The work is
+        linear in the number of texts.
+        """
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.shingle_size = shingle_size
+        self.threshold = threshold
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(MINHASH_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(MINHASH_PRIME), size=num_perm, dtype=np.uint64)
+
+    def shingles(self, text: str) -> np.ndarray:
+        """
+        Hash the word shingles of normalized text to 32-bit integers
+        """
+        tokens = TOKEN_PATTERN.findall(normalize_text(text))
+        if len(tokens) <= self.shingle_size:
+            grams = [" ".join(tokens)]
+        else:
+            grams = [
+                " ".join(tokens[i:i + self.shingle_size])
+                for i in range(len(tokens) - self.shingle_size + 1)
+            ]
+        return np.fromiter(
+            (zlib.crc32(gram.encode("utf-8")) for gram in set(grams)),
+            dtype=np.uint64
+        )
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        MinHash signature of text
+        """
+        hashes = self.shingles(text)
+        permuted = (np.outer(hashes, self._a) + self._b) % MINHASH_PRIME
+        return permuted.min(axis=0)
+
+    def signatures(self, texts: List[str]) -> np.ndarray:
+        """
+        MinHash signatures for many texts as a ``(n, num_perm)`` array
+        """
+        result = np.empty((len(texts), self.num_perm), dtype=np.uint64)
+        for i, text in enumerate(texts):
+            result[i] = self.signature(text)
+        return result
+
+    def group(self, texts: List[str]) -> np.ndarray:
+        """
+        Assign each text to a near-duplicate cluster
+
+        Returns an array whose entry ``i`` is the index of the
+        representative of text ``i``'s cluster. The representative is the
+        first text of the cluster in input order, so ``labels[i] == i``
+        marks a representative.
+        """
+        n = len(texts)
+        parent = np.arange(n)
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        signatures = self.signatures(texts)
+        for band in range(self.bands):
+            columns = slice(band * self.rows_per_band, (band + 1) * self.rows_per_band)
+            buckets: Dict[bytes, int] = {}
+            for i in range(n):
+                key = signatures[i, columns].tobytes()
+                first = buckets.setdefault(key, i)
+                if first == i:
+                    continue
+                root_i, root_first = find(i), find(first)
+                if root_i == root_first:
+                    continue
+                if np.mean(signatures[i] == signatures[first]) >= self.threshold:
+                    # Keep the earliest index as the root so it is the representative
+                    parent[max(root_i, root_first)] = min(root_i, root_first)
+
+        return np.array([find(i) for i in range(n)])
+
+    def clusters(self, texts: List[str], scores: Optional[Sequence[float]] = None) -> Dict[int, List[int]]:
+        """
+        Map each representative index to the indices of its cluster members
+
+        With ``scores`` (e.g. keyword threat scores, one per text) each
+        cluster is represented by its highest-scoring member, the earliest
+        on ties, which is listed first. Otherwise the representative is the
+        cluster's first text.
+        """
+        groups: Dict[int, List[int]] = {}
+        for i, representative in enumerate(self.group(texts)):
+            groups.setdefault(int(representative), []).append(i)
+        if scores is None:
+            return groups
+
+        ranked: Dict[int, List[int]] = {}
+        for members in groups.values():
+            best = max(members, key=lambda i: (scores[i], -i))
+            ranked[best] = [best] + [i for i in members if i != best]
+        return ranked
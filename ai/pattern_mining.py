@@ -0,0 +1,193 @@
+import logging
+import uuid
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+from sklearn.utils import murmurhash3_32
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Upper bound on remembered hash-bucket -> term mappings used for top terms
+MAX_TERM_NAMES = 200000
+
+
+def threat_texts(threat_data: List[Dict[str, Any]]) -> List[str]:
+    """
+    Build the text used for pattern mining from threat descriptions and titles
+    """
+    return [data.get("description", "") + " " + data.get("title", "") for data in threat_data]
+
+
+class IncrementalPatternMiner:
+    def __init__(
+        self,
+        n_clusters: int = 5,
+        n_features: int = 2 ** 18,
+        top_terms: int = 5,
+        random_state: Optional[int] = 0
+    ):
+        """
+        Initialize an incremental threat pattern miner
+
+        Texts are vectorized with a stateless hashing vectorizer and weighted
+        by IDF statistics that accumulate across calls. Clusters are updated
+        with mini-batch k-means ``partial_fit`` on only the new threats, so
+        cluster indices (and the derived pattern IDs) stay stable over time.
+        """
+        self.n_clusters = n_clusters
+        self.n_features = n_features
+        self.top_terms = top_terms
+        self.miner_id = uuid.uuid4()
+
+        self.vectorizer = HashingVectorizer(
+            n_features=n_features, stop_words="english", alternate_sign=False, norm=None
+        )
+        self._analyzer = self.vectorizer.build_analyzer()
+        self.kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=random_state, n_init=3)
+
+        self.doc_count = 0
+        self.doc_freq = np.zeros(n_features, dtype=np.int64)
+        self.cluster_counts = np.zeros(n_clusters, dtype=np.int64)
+        self.term_names: Dict[int, str] = {}
+        self._pending: List[str] = []
+
+    @property
+    def is_fitted(self) -> bool:
+        return hasattr(self.kmeans, "cluster_centers_")
+
+    def idf(self) -> np.ndarray:
+        """
+        Smoothed IDF weights from the running document frequencies
+        """
+        return np.log((1 + self.doc_count) / (1 + self.doc_freq)) + 1.0
+
+    def _remember_terms(self, texts: List[str]) -> None:
+        """
+        Record a readable term for each hash bucket seen, for top-term output
+        """
+        for text in texts:
+            if len(self.term_names) >= MAX_TERM_NAMES:
+                return
+            for term in self._analyzer(text):
+                index = abs(murmurhash3_32(term, seed=0)) % self.n_features
+                self.term_names.setdefault(index, term)
+
+    def _vectorize(self, texts: List[str], update_stats: bool):
+        counts = self.vectorizer.transform(texts)
+        if update_stats:
+            self.doc_count += counts.shape[0]
+            self.doc_freq += np.bincount(counts.indices, minlength=self.n_features)
+            self._remember_terms(texts)
+        return normalize(counts.multiply(self.idf()).tocsr())
+
+    def partial_fit(self, texts: List[str]) -> np.ndarray:
+        """
+        Fold new texts into the IDF statistics and clusters
+
+        Returns the cluster label of each text, or -1 while fewer texts than
+        clusters have been seen (they are buffered for the first fit).
+        """
+        labels = np.full(len(texts), -1, dtype=np.int64)
+        if not texts:
+            return labels
+
+        if not self.is_fitted:
+            self._pending.extend(texts)
+            if len(self._pending) < self.n_clusters:
+                self._vectorize(texts, update_stats=True)
+                return labels
+            vectors = self._vectorize(texts, update_stats=True)
+            first_batch = self._vectorize(self._pending, update_stats=False)
+            self.kmeans.partial_fit(first_batch)
+            self.cluster_counts += np.bincount(self.kmeans.predict(first_batch), minlength=self.n_clusters)
+            self._pending = []
+            return self.kmeans.predict(vectors)
+
+        vectors = self._vectorize(texts, update_stats=True)
+        self.kmeans.partial_fit(vectors)
+        labels = self.kmeans.predict(vectors)
+        self.cluster_counts += np.bincount(labels, minlength=self.n_clusters)
+        return labels
+
+    def get_state(self) -> Dict[str, Any]:
+        """
+        Export the miner's statistics and clusters for saving as an artifact
+        """
+        state: Dict[str, Any] = {
+            "miner_id": str(self.miner_id),
+            "n_clusters": self.n_clusters,
+            "n_features": self.n_features,
+            "top_terms": self.top_terms,
+            "doc_count": int(self.doc_count),
+            "doc_freq": self.doc_freq,
+            "cluster_counts": self.cluster_counts,
+            "term_index": np.fromiter(self.term_names.keys(), dtype=np.int64, count=len(self.term_names)),
+            "term_words": list(self.term_names.values()),
+            "pending": list(self._pending)
+        }
+        if self.is_fitted:
+            state["kmeans"] = self.kmeans
+        return state
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        """
+        Restore a state produced by ``get_state``
+        """
+        self.miner_id = uuid.UUID(state["miner_id"])
+        self.n_clusters = state["n_clusters"]
+        self.n_features = state["n_features"]
+        self.top_terms = state["top_terms"]
+        self.doc_count = state["doc_count"]
+        # Counters are updated in place, so take private copies of mapped arrays
+        self.doc_freq = np.array(state["doc_freq"], dtype=np.int64)
+        self.cluster_counts = np.array(state["cluster_counts"], dtype=np.int64)
+        self.term_names = dict(zip(state["term_index"].tolist(), state["term_words"]))
+        self._pending = list(state["pending"])
+        if "kmeans" in state:
+            self.kmeans = state["kmeans"]
+
+    def pattern_id(self, cluster_id: int) -> str:
+        """
+        Stable pattern ID for a cluster of this miner
+        """
+        return str(uuid.uuid5(self.miner_id, f"cluster-{cluster_id}"))
+
+    def cluster_terms(self, cluster_id: int) -> List[str]:
+        """
+        Highest-weighted terms of a cluster centroid
+        """
+        centroid = self.kmeans.cluster_centers_[cluster_id]
+        top = np.argsort(centroid)[-self.top_terms:][::-1]
+        return [self.term_names[idx] for idx in top if centroid[idx] > 0 and idx in self.term_names]
+
+    def update(self, threat_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Mine patterns incrementally from new threats
+
+        Returns every cluster that has accumulated more than one threat, with
+        its stable ``pattern_id``, cumulative ``count`` and ``new_count``
+        (threats from this call).
+        """
+        labels = self.partial_fit(threat_texts(threat_data))
+        if not self.is_fitted:
+            return []
+
+        new_counts = np.bincount(labels[labels >= 0], minlength=self.n_clusters)
+        patterns = []
+        for cluster_id in range(self.n_clusters):
+            count = int(self.cluster_counts[cluster_id])
+            if count > 1:  # Only consider clusters with multiple items
+                patterns.append({
+                    "pattern_id": self.pattern_id(cluster_id),
+                    "cluster_id": int(cluster_id),
+                    "count": count,
+                    "new_count": int(new_counts[cluster_id]),
+                    "common_terms": self.cluster_terms(cluster_id),
+                    "severity": "high" if count > 5 else "medium"
+                })
+        return patterns
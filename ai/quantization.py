@@ -0,0 +1,96 @@
+import logging
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from ai.model_registry import model_memory_bytes
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def quantize_encoder(model: nn.Module) -> nn.Module:
+    """
+    Apply dynamic int8 quantization to the encoder's linear layers
+
+    Weights are stored as int8 and activations are quantized on the fly, so
+    no calibration data is needed. Only CPU execution is supported.
+    """
+    model.eval()
+    return torch.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+
+def cosine_similarities(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Row-wise cosine similarity between two embedding matrices
+    """
+    norms = np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1)
+    return np.sum(a * b, axis=1) / np.maximum(norms, 1e-12)
+
+
+def validate_quantization(fp32_detector: Any, int8_detector: Any, texts: List[str]) -> Dict[str, Any]:
+    """
+    Compare quantized and fp32 embeddings of a sample set of texts
+
+    Both detectors must bypass any embedding cache so the encoders are
+    actually exercised.
+    """
+    fp32 = fp32_detector.embed_texts(texts)
+    int8 = int8_detector.embed_texts(texts)
+    similarities = cosine_similarities(fp32, int8)
+    return {
+        "samples": len(texts),
+        "mean_cosine": float(similarities.mean()),
+        "min_cosine": float(similarities.min()),
+        "p05_cosine": float(np.percentile(similarities, 5))
+    }
+
+
+def benchmark_quantization(
+    fp32_detector: Any,
+    int8_detector: Any,
+    texts: List[str],
+    batch_size: int = 32,
+    repeats: int = 3
+) -> Dict[str, Any]:
+    """
+    Measure embedding latency, throughput and model memory for each mode
+
+    Each detector is warmed up once and then timed over ``repeats`` runs of
+    ``embed_texts`` on the full sample; the best run is reported.
+    """
+    results: Dict[str, Any] = {}
+    for mode, detector in (("fp32", fp32_detector), ("int8", int8_detector)):
+        detector.warmup()
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            detector.embed_texts(texts, batch_size=batch_size)
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        results[mode] = {
+            "seconds": best,
+            "ms_per_text": 1000 * best / len(texts),
+            "texts_per_second": len(texts) / best,
+            "memory_bytes": model_memory_bytes(detector.bert_model)
+        }
+
+    results["speedup"] = results["fp32"]["seconds"] / results["int8"]["seconds"]
+    results["memory_ratio"] = results["int8"]["memory_bytes"] / max(results["fp32"]["memory_bytes"], 1)
+    results["accuracy"] = validate_quantization(fp32_detector, int8_detector, texts)
+    return results
+
+
+if __name__ == "__main__":
+    import json
+
+    from ai.benchmarks.embedding_batching import synthetic_posts
+    from ai.threat_detection import ThreatDetector
+
+    sample = synthetic_posts(256)
+    report = benchmark_quantization(ThreatDetector(), ThreatDetector(quantize=True), sample)
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,162 @@
+import json
+import logging
+import uuid
+from typing import Any, Dict, IO, Iterable, Iterator, List, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Report sections in the order they are written, with their summary counter
+REPORT_SECTIONS = [
+    ("threats", "total_threats"),
+    ("anomalies", "anomalies_detected"),
+    ("social_media_threats", "social_threats"),
+    ("patterns", "patterns_identified")
+]
+
+# Items encoded per json call; bounds memory while amortizing per-call overhead
+ITEMS_PER_ENCODE = 1000
+
+# Buffered text is flushed to the output once it reaches this many characters
+CHUNK_SIZE = 64 * 1024
+
+
+def empty_summary() -> Dict[str, int]:
+    """
+    Summary counters of a report before any item is seen
+    """
+    summary = {counter: 0 for _, counter in REPORT_SECTIONS}
+    summary["high_severity_count"] = 0
+    return summary
+
+
+def report_recommendations(summary: Mapping[str, int]) -> List[str]:
+    """
+    Recommendations derived from a report's summary counters
+    """
+    recommendations = []
+
+    # Check for high severity threats
+    if summary["high_severity_count"] > 0:
+        recommendations.append(f"Investigate {summary['high_severity_count']} high severity threats immediately")
+
+    # Check for anomalies
+    if summary["anomalies_detected"] > 5:
+        recommendations.append(
+            f"Review {summary['anomalies_detected']} detected anomalies for potential security issues"
+        )
+
+    # Check for social media threats
+    if summary["social_threats"] > 10:
+        recommendations.append(
+            f"Monitor social media activity closely - {summary['social_threats']} potential threats detected"
+        )
+
+    # Check for patterns
+    if summary["patterns_identified"] > 0:
+        recommendations.append(
+            f"Investigate {summary['patterns_identified']} identified threat patterns for coordinated activities"
+        )
+
+    # General recommendation
+    if len(recommendations) == 0:
+        recommendations.append("Continue monitoring for potential threats")
+
+    return recommendations
+
+
+def _json_default(value: Any) -> Any:
+    """
+    Encode NumPy scalars and arrays, and fall back to str for anything else
+    """
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+class StreamingThreatReport:
+    def __init__(
+        self,
+        analysis_results: Mapping[str, Iterable[Dict[str, Any]]],
+        report_id: Optional[str] = None,
+        chunk_size: int = CHUNK_SIZE
+    ):
+        """
+        Stream a threat report as JSON text without holding it in memory
+
+        Each section of ``analysis_results`` may be any iterable, including
+        a generator, and is consumed exactly once. Items are encoded and
+        written as they arrive while the summary counters are updated. The
+        summary and recommendations are written last, after every section
+        has been counted. Memory use is bounded by ``ITEMS_PER_ENCODE``
+        items plus about ``chunk_size`` characters of buffered output.
+        """
+        self.analysis_results = analysis_results
+        self.report_id = report_id or str(uuid.uuid4())
+        self.chunk_size = chunk_size
+        self.summary = empty_summary()
+        self.recommendations: List[str] = []
+        self._encoder = json.JSONEncoder(default=_json_default)
+
+    def _chunks(self) -> Iterator[str]:
+        encode = self._encoder.encode
+        yield '{"report_id": ' + encode(self.report_id)
+        yield ', "generated_at": ' + encode(pd.Timestamp.now().isoformat())
+
+        for section, counter in REPORT_SECTIONS:
+            yield f', "{section}": ['
+            count = 0
+            batch: List[Dict[str, Any]] = []
+            for item in self.analysis_results.get(section) or []:
+                batch.append(item)
+                if section == "threats" and item.get("severity") == "high":
+                    self.summary["high_severity_count"] += 1
+                if len(batch) == ITEMS_PER_ENCODE:
+                    # Encode a slice of items in one call and drop its brackets
+                    yield (", " if count else "") + encode(batch)[1:-1]
+                    count += len(batch)
+                    batch = []
+            if batch:
+                yield (", " if count else "") + encode(batch)[1:-1]
+                count += len(batch)
+            self.summary[counter] = count
+            yield "]"
+
+        self.recommendations = report_recommendations(self.summary)
+        yield ', "summary": ' + encode(self.summary)
+        yield ', "recommendations": ' + encode(self.recommendations) + "}"
+
+    def __iter__(self) -> Iterator[str]:
+        """
+        Yield the report as JSON text in chunks of about ``chunk_size`` characters
+
+        Suitable as the body of a streaming HTTP response.
+        """
+        buffer: List[str] = []
+        buffered = 0
+        for chunk in self._chunks():
+            buffer.append(chunk)
+            buffered += len(chunk)
+            if buffered >= self.chunk_size:
+                yield "".join(buffer)
+                buffer, buffered = [], 0
+        if buffer:
+            yield "".join(buffer)
+
+    def write_to(self, output: IO[str]) -> Dict[str, int]:
+        """
+        Write the whole report to a text stream and return its summary
+        """
+        for chunk in self:
+            output.write(chunk)
+        logger.info(
+            f"Threat report {self.report_id} written: "
+            f"{self.summary['total_threats']} threats, {self.summary['anomalies_detected']} anomalies"
+        )
+        return self.summary
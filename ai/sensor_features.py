@@ -0,0 +1,229 @@
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Default rolling windows, in readings per sensor
+DEFAULT_WINDOWS = (5, 20)
+
+
+def _as_seconds(timestamps: Any) -> np.ndarray:
+    """
+    Timestamps as float seconds; numbers are taken to be seconds already
+    """
+    values = np.asarray(timestamps)
+    if values.dtype.kind in "iuf":
+        return values.astype(np.float64)
+    return pd.to_datetime(values).asi8 / 1e9
+
+
+def _group_starts(codes: np.ndarray) -> np.ndarray:
+    """
+    For rows sorted by sensor code, the index of each row's first group row
+    """
+    n = len(codes)
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if n else np.zeros(0, dtype=np.int64)
+    return np.repeat(starts, np.diff(np.r_[starts, n]))
+
+
+def window_bounds(group_start: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    First row and length of each row's trailing window within its group
+
+    Rows must be sorted by group, with ``group_start`` giving each row's
+    first group row. Windows are shorter at the start of a group.
+    """
+    index = np.arange(len(group_start))
+    start = np.maximum(index - window + 1, group_start)
+    return start, index - start + 1
+
+
+def window_statistics(
+    prefix_sums: np.ndarray,
+    prefix_squares: np.ndarray,
+    start: np.ndarray,
+    count: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Trailing mean and population std from prefix sums of a column
+
+    ``prefix_sums`` and ``prefix_squares`` have a leading zero, so the cost
+    is independent of the window length.
+    """
+    mean = (prefix_sums[1:] - prefix_sums[start]) / count
+    variance = (prefix_squares[1:] - prefix_squares[start]) / count - mean * mean
+    return mean, np.sqrt(np.maximum(variance, 0.0))
+
+
+class RollingFeatureExtractor:
+    def __init__(self, windows: Sequence[int] = DEFAULT_WINDOWS):
+        """
+        Initialize per-sensor rolling-window features for sensor readings
+
+        For each numeric input column and window ``w`` it produces the
+        trailing mean, std and z-score of the current reading over the
+        sensor's last ``w`` readings (including the current one), plus the
+        change from the sensor's previous reading and its rate per second.
+        Everything is computed with NumPy prefix sums over readings grouped
+        by sensor; Python only loops over sensors, never over readings.
+        The last readings of every sensor are kept, so windows continue
+        across batches.
+        """
+        self.windows = sorted(set(int(window) for window in windows))
+        self.history = max(self.windows)
+        self.input_names: Optional[List[str]] = None
+        # sensor -> (last readings, their timestamps in seconds)
+        self._tails: Dict[Any, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def output_names(self) -> List[str]:
+        names = []
+        for name in self.input_names or []:
+            for window in self.windows:
+                names += [f"{name}_mean_{window}", f"{name}_std_{window}", f"{name}_zscore_{window}"]
+            names += [f"{name}_delta", f"{name}_rate"]
+        return names
+
+    def reset(self) -> None:
+        """
+        Forget every sensor's recent readings
+        """
+        self._tails = {}
+
+    def transform(
+        self,
+        sensor_ids: Sequence[Any],
+        X: np.ndarray,
+        timestamps: Optional[Sequence[Any]] = None
+    ) -> np.ndarray:
+        """
+        Compute features for a batch of readings, in input order
+
+        Readings are ordered per sensor by timestamp when timestamps are
+        given, otherwise by their position in the batch. Without
+        timestamps the rate equals the delta (per reading). Returns an
+        ``(n, len(output_names()))`` array.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        n, n_features = X.shape
+        if n == 0:
+            return np.zeros((0, n_features * (3 * len(self.windows) + 2)))
+        codes, sensors = pd.factorize(np.asarray(sensor_ids, dtype=object))
+        seconds = _as_seconds(timestamps) if timestamps is not None else np.arange(n, dtype=np.float64)
+
+        # Prepend each known sensor's last readings so windows span batches
+        tail_codes, tail_rows, tail_seconds = [], [], []
+        for code, sensor in enumerate(sensors):
+            tail = self._tails.get(sensor)
+            if tail is not None:
+                tail_codes.append(np.full(len(tail[0]), code))
+                tail_rows.append(tail[0])
+                tail_seconds.append(tail[1])
+        history = sum(len(rows) for rows in tail_rows)
+        if history:
+            codes = np.concatenate(tail_codes + [codes])
+            X = np.concatenate(tail_rows + [X])
+            seconds = np.concatenate(tail_seconds + [seconds])
+
+        # A stable sort on sensor keeps history before the batch and, when
+        # timestamps already arrive in order, keeps each sensor's readings in time order
+        if timestamps is not None and np.any(np.diff(seconds) < 0):
+            order = np.lexsort((seconds, codes))
+        else:
+            # Narrow codes let NumPy use its radix sort
+            order = np.argsort(codes.astype(np.int16) if len(sensors) < 2 ** 15 else codes, kind="stable")
+        sorted_codes = codes[order]
+        sorted_seconds = seconds[order]
+        group_start = _group_starts(sorted_codes)
+        first = group_start == np.arange(len(sorted_codes))
+        bounds = [window_bounds(group_start, window) for window in self.windows]
+        counts = np.maximum(np.bincount(sorted_codes, minlength=len(sensors)), 1)
+
+        if timestamps is not None:
+            elapsed = np.zeros(len(sorted_seconds))
+            elapsed[1:] = sorted_seconds[1:] - sorted_seconds[:-1]
+            elapsed[first] = 0.0
+            positive = elapsed > 0
+
+        # Inverse permutation gathers sorted rows back to input order
+        inverse = np.empty_like(order)
+        inverse[order] = np.arange(len(order))
+        inverse = inverse[history:]
+
+        # One contiguous column at a time; output is column-major so writes are contiguous
+        output = np.empty((n, n_features * (3 * len(self.windows) + 2)), order="F")
+        sorted_X = np.empty((len(order), n_features))
+        column = 0
+        for j in range(n_features):
+            values = X[:, j][order]
+            sorted_X[:, j] = values
+
+            # Center on each sensor's mean so prefix sums stay small
+            offsets = (np.bincount(sorted_codes, weights=values, minlength=len(sensors)) / counts)[sorted_codes]
+            centered = values - offsets
+            prefix_sums = np.zeros(len(centered) + 1)
+            np.cumsum(centered, out=prefix_sums[1:])
+            prefix_squares = np.zeros(len(centered) + 1)
+            np.cumsum(centered * centered, out=prefix_squares[1:])
+
+            for start, count in bounds:
+                mean, std = window_statistics(prefix_sums, prefix_squares, start, count)
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    zscore = np.where(std > 0, (centered - mean) / std, 0.0)
+                np.take(mean + offsets, inverse, out=output[:, column])
+                np.take(std, inverse, out=output[:, column + 1])
+                np.take(zscore, inverse, out=output[:, column + 2])
+                column += 3
+
+            delta = np.zeros(len(values))
+            delta[1:] = values[1:] - values[:-1]
+            delta[first] = 0.0
+            if timestamps is not None:
+                rate = np.zeros(len(values))
+                np.divide(delta, elapsed, out=rate, where=positive)
+            else:
+                rate = delta
+            np.take(delta, inverse, out=output[:, column])
+            np.take(rate, inverse, out=output[:, column + 1])
+            column += 2
+
+        # Remember each sensor's last readings for the next batch
+        group_end = np.r_[np.flatnonzero(sorted_codes[1:] != sorted_codes[:-1]) + 1, len(sorted_codes)]
+        for end in group_end:
+            begin = max(end - self.history, group_start[end - 1])
+            sensor = sensors[sorted_codes[end - 1]]
+            self._tails[sensor] = (sorted_X[begin:end].copy(), sorted_seconds[begin:end].copy())
+
+        return output
+
+    def transform_columns(self, columns: Dict[str, np.ndarray], sensor_column: str = "sensor_id") -> Dict[str, np.ndarray]:
+        """
+        Rolling features for sensor columns, as a dict of new columns
+
+        The numeric columns seen in the first call become the inputs.
+        Uses the ``timestamp`` column for ordering and rates when present.
+        """
+        if self.input_names is None:
+            self.input_names = [
+                name for name, values in columns.items()
+                if name not in (sensor_column, "timestamp") and values.dtype.kind in "iuf"
+            ]
+        if not self.input_names or sensor_column not in columns:
+            return {}
+
+        n_rows = len(columns[sensor_column])
+        X = np.empty((n_rows, len(self.input_names)))
+        for j, name in enumerate(self.input_names):
+            values = columns.get(name)
+            X[:, j] = values if values is not None else np.nan
+        missing = np.isnan(X)
+        if missing.any():
+            column_means = np.nan_to_num(np.nanmean(np.where(missing.all(axis=0), 0.0, X), axis=0))
+            X[missing] = np.take(column_means, np.nonzero(missing)[1])
+
+        features = self.transform(columns[sensor_column], X, columns.get("timestamp"))
+        return {name: features[:, j] for j, name in enumerate(self.output_names())}
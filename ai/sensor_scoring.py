@@ -0,0 +1,273 @@
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sklearn.ensemble import IsolationForest
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Worker processes each detector uses for per-sensor scoring; separate from the
+# inference pool size (AI_MAX_PARALLEL), since every inference worker owns a detector
+WORKERS = int(os.getenv("SENSOR_SCORING_WORKERS", 1))
+
+# Sensors with fewer baseline readings are scored by the shared fallback model
+MIN_SENSOR_READINGS = 50
+
+# Work items per worker; more chunks balance uneven sensor sizes better
+CHUNKS_PER_WORKER = 4
+
+# Key of the model fitted on all sensors together
+FALLBACK_MODEL = "__all__"
+
+# (forest, mean, scale) of one fitted model
+SensorModel = Tuple[IsolationForest, np.ndarray, np.ndarray]
+
+# (sensor, start, stop) rows of one sensor in the grouped matrix
+Group = Tuple[Hashable, int, int]
+
+# Models installed in each worker process by the pool initializer
+_worker_models: Dict[Hashable, SensorModel] = {}
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """
+    Attach to a parent-owned shared memory block without taking ownership
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13 attaching always registers the block, but pool
+        # workers share the parent's resource tracker, where that is a no-op
+        return shared_memory.SharedMemory(name=name)
+
+
+def _fit_model(X: np.ndarray, contamination: float, random_state: Optional[int]) -> SensorModel:
+    mean = X.mean(axis=0)
+    std = X.std(axis=0)
+    scale = np.where(std > 0, std, 1.0)
+    forest = IsolationForest(contamination=contamination, random_state=random_state)
+    forest.fit((X - mean) / scale)
+    return forest, mean, scale
+
+
+def _fit_groups(
+    name: str,
+    shape: Tuple[int, int],
+    groups: List[Group],
+    contamination: float,
+    random_state: Optional[int]
+) -> Dict[Hashable, SensorModel]:
+    """
+    Fit one model per sensor group, reading rows from shared memory
+    """
+    block = _attach(name)
+    X = np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+    try:
+        return {sensor: _fit_model(X[start:stop], contamination, random_state) for sensor, start, stop in groups}
+    finally:
+        del X
+        block.close()
+
+
+def _init_scoring_worker(models: Dict[Hashable, SensorModel]) -> None:
+    """
+    Install the fitted models once per worker process
+    """
+    global _worker_models
+    _worker_models = models
+
+
+def _score_groups(
+    name: str,
+    scores_name: str,
+    shape: Tuple[int, int],
+    groups: List[Group],
+    models: Optional[Dict[Hashable, SensorModel]] = None
+) -> int:
+    """
+    Score sensor groups from shared memory and write scores back in place
+
+    Only the group offsets travel between processes; readings and scores
+    stay in shared memory. Returns the number of rows scored.
+    """
+    models = models if models is not None else _worker_models
+    block, scores_block = _attach(name), _attach(scores_name)
+    X = np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+    scores = np.ndarray(shape[0], dtype=np.float64, buffer=scores_block.buf)
+    try:
+        for sensor, start, stop in groups:
+            forest, mean, scale = models.get(sensor) or models[FALLBACK_MODEL]
+            scores[start:stop] = forest.decision_function((X[start:stop] - mean) / scale)
+        return sum(stop - start for _, start, stop in groups)
+    finally:
+        del X, scores
+        block.close()
+        scores_block.close()
+
+
+def group_by_sensor(sensor_ids: Sequence[Any]) -> Tuple[np.ndarray, List[Group]]:
+    """
+    Stable order that places each sensor's readings together, and the groups
+
+    Returns ``(order, groups)``: ``X[order]`` is grouped by sensor and each
+    group is ``(sensor, start, stop)`` in that grouped matrix.
+    """
+    sensors, codes = np.unique(np.asarray(sensor_ids, dtype=object).astype(str), return_inverse=True)
+    order = np.argsort(codes, kind="stable")
+    counts = np.bincount(codes, minlength=len(sensors))
+    bounds = np.concatenate([[0], np.cumsum(counts)])
+    groups = [(sensor, int(bounds[i]), int(bounds[i + 1])) for i, sensor in enumerate(sensors.tolist()) if counts[i]]
+    return order, groups
+
+
+def balance_groups(groups: List[Group], n_chunks: int) -> List[List[Group]]:
+    """
+    Split groups into at most n_chunks lists of similar total size
+
+    Largest groups are placed first, each into the currently smallest chunk.
+    """
+    chunks: List[List[Group]] = [[] for _ in range(max(1, min(n_chunks, len(groups))))]
+    sizes = [0] * len(chunks)
+    for group in sorted(groups, key=lambda g: g[2] - g[1], reverse=True):
+        target = sizes.index(min(sizes))
+        chunks[target].append(group)
+        sizes[target] += group[2] - group[1]
+    return [chunk for chunk in chunks if chunk]
+
+
+class SensorAnomalyScorer:
+    def __init__(
+        self,
+        workers: int = WORKERS,
+        contamination: float = 0.1,
+        min_readings: int = MIN_SENSOR_READINGS,
+        random_state: Optional[int] = None
+    ):
+        """
+        Initialize per-sensor anomaly scoring on a process pool
+
+        Readings are grouped by ``sensor_id`` and copied once into
+        ``multiprocessing.shared_memory``. Worker processes receive only
+        group offsets, score their groups in place and write scores into a
+        shared output array, so readings and results are never pickled.
+        Each sensor with at least ``min_readings`` baseline readings gets
+        its own scaler and IsolationForest; other sensors use a fallback
+        model fitted on all baseline readings. With ``workers=1`` groups
+        are scored in the calling process.
+        """
+        self.workers = workers
+        self.contamination = contamination
+        self.min_readings = min_readings
+        self.random_state = random_state
+        self.feature_names: Optional[List[str]] = None
+        self.fill_values: Optional[np.ndarray] = None
+        self.models: Dict[Hashable, SensorModel] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def is_fitted(self) -> bool:
+        return FALLBACK_MODEL in self.models
+
+    def _new_executor(self, models: Optional[Dict[Hashable, SensorModel]]) -> ProcessPoolExecutor:
+        kwargs: Dict[str, Any] = {}
+        if models is not None:
+            kwargs = {"initializer": _init_scoring_worker, "initargs": (models,)}
+        return ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"), **kwargs
+        )
+
+    def close(self) -> None:
+        """
+        Shut the worker processes down
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _share(self, X: np.ndarray) -> shared_memory.SharedMemory:
+        block = shared_memory.SharedMemory(create=True, size=max(X.nbytes, 1))
+        np.ndarray(X.shape, dtype=np.float64, buffer=block.buf)[:] = X
+        return block
+
+    def fit(self, sensor_ids: Sequence[Any], X: np.ndarray, feature_names: Optional[List[str]] = None) -> "SensorAnomalyScorer":
+        """
+        Fit per-sensor models and the fallback model on baseline readings
+        """
+        X = np.asarray(X, dtype=np.float64)
+        order, groups = group_by_sensor(sensor_ids)
+        fitted = [group for group in groups if group[2] - group[1] >= self.min_readings]
+
+        models: Dict[Hashable, SensorModel] = {}
+        block = self._share(X[order])
+        try:
+            if self.workers > 1 and len(fitted) > 1:
+                executor = self._new_executor(None)
+                try:
+                    futures = [
+                        executor.submit(_fit_groups, block.name, X.shape, chunk, self.contamination, self.random_state)
+                        for chunk in balance_groups(fitted, self.workers * CHUNKS_PER_WORKER)
+                    ]
+                    for future in futures:
+                        models.update(future.result())
+                finally:
+                    executor.shutdown(wait=True)
+            else:
+                models.update(_fit_groups(block.name, X.shape, fitted, self.contamination, self.random_state))
+        finally:
+            block.close()
+            block.unlink()
+
+        models[FALLBACK_MODEL] = _fit_model(X, self.contamination, self.random_state)
+        self.models = models
+        self.feature_names = list(feature_names) if feature_names is not None else None
+        self.fill_values = X.mean(axis=0)
+
+        # Workers hold the models from their initializer; restart them with the new set
+        self.close()
+        if self.workers > 1:
+            self._executor = self._new_executor(self.models)
+        logger.info(f"Fitted {len(fitted)} per-sensor anomaly models on {len(X)} readings ({len(groups)} sensors)")
+        return self
+
+    def score(self, sensor_ids: Sequence[Any], X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score readings against their sensor's model
+
+        Returns ``(predictions, scores)`` in input order, as IsolationForest
+        reports them: -1 marks an anomaly and lower scores are more anomalous.
+        """
+        if not self.is_fitted:
+            raise RuntimeError("Sensor scorer has no baseline; call fit first")
+
+        X = np.asarray(X, dtype=np.float64)
+        order, groups = group_by_sensor(sensor_ids)
+        block = self._share(X[order])
+        scores_block = shared_memory.SharedMemory(create=True, size=max(X.shape[0] * 8, 1))
+        try:
+            if self._executor is not None and len(groups) > 1:
+                futures = [
+                    self._executor.submit(_score_groups, block.name, scores_block.name, X.shape, chunk)
+                    for chunk in balance_groups(groups, self.workers * CHUNKS_PER_WORKER)
+                ]
+                for future in futures:
+                    future.result()
+            else:
+                _score_groups(block.name, scores_block.name, X.shape, groups, self.models)
+
+            scores = np.empty(X.shape[0], dtype=np.float64)
+            scores[order] = np.ndarray(X.shape[0], dtype=np.float64, buffer=scores_block.buf)
+        finally:
+            block.close()
+            block.unlink()
+            scores_block.close()
+            scores_block.unlink()
+
+        # Same rule as IsolationForest.predict
+        predictions = np.where(scores < 0, -1, 1)
+        return predictions, scores
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests run from ai/ (CI); modules import as ``ai.*``
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
@@ -0,0 +1,124 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from ai import ann_index
+from ai.ann_index import METADATA_FILE, IVFIndex
+from ai.compression import EmbeddingCompressor
+
+
+def _vectors(count, dim=16, seed=0):
+    return np.random.default_rng(seed).standard_normal((count, dim)).astype(np.float32)
+
+
+def _trained_index(count=64):
+    index = IVFIndex(dim=16, n_lists=4, n_probe=4, train_factor=4)
+    index.add([f"item-{i}" for i in range(count)], _vectors(count))
+    assert index.is_trained
+    return index
+
+
+def test_exact_search_finds_the_nearest_vector():
+    index = IVFIndex(dim=16)
+    vectors = _vectors(10)
+    index.add([str(i) for i in range(10)], vectors)
+
+    assert index.search(vectors[3], k=1)[0][0] == "3"
+    assert index.search(vectors[3], k=2, exclude=["3"])[0][0] != "3"
+
+
+def test_readding_an_id_replaces_its_vector():
+    index = IVFIndex(dim=16)
+    vectors = _vectors(3)
+    index.add(["a", "b"], vectors[:2])
+    index.add(["a"], vectors[2:])
+
+    assert len(index) == 2
+    assert index.search(vectors[2], k=1) == [("a", pytest.approx(1.0))]
+
+
+def test_save_load_round_trip(tmp_path):
+    index = _trained_index()
+    index.save(str(tmp_path))
+    loaded = IVFIndex.load(str(tmp_path))
+
+    query = _vectors(1, seed=1)[0]
+    assert loaded.ids == index.ids
+    assert loaded.search(query, k=5) == index.search(query, k=5)
+    assert loaded.search_by_id("item-7", k=5) == index.search_by_id("item-7", k=5)
+
+
+def test_compressed_round_trip(tmp_path):
+    vectors = _vectors(200)
+    index = IVFIndex(dim=16, n_lists=4, train_factor=4)
+    index.add([str(i) for i in range(200)], vectors)
+    compressed = index.compress(EmbeddingCompressor(storage="float16", dim=8))
+    compressed.save(str(tmp_path))
+    loaded = IVFIndex.load(str(tmp_path))
+
+    assert loaded.compressor is not None
+    assert loaded.search(vectors[5], k=3) == compressed.search(vectors[5], k=3)
+
+
+def test_search_by_id_matches_search_with_the_stored_vector():
+    index = _trained_index()
+    vectors = _vectors(64)
+
+    assert index.search_by_id("item-3", k=5) == index.search(vectors[3], k=5, exclude=["item-3"])
+    assert index.search_by_id("missing") is None
+
+
+def test_failed_save_leaves_the_previous_save_readable(tmp_path, monkeypatch):
+    index = _trained_index()
+    index.save(str(tmp_path))
+    index.add(["extra"], _vectors(1, seed=2))
+
+    def crash(source, destination):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(ann_index.os, "replace", crash)
+    with pytest.raises(OSError):
+        index.save(str(tmp_path))
+    monkeypatch.undo()
+
+    loaded = IVFIndex.load(str(tmp_path))
+    assert len(loaded) == 64
+    assert "extra" not in loaded.ids
+
+
+def test_save_keeps_only_the_current_and_previous_generation(tmp_path):
+    index = _trained_index()
+    generations = []
+    for _ in range(3):
+        index.save(str(tmp_path))
+        with open(tmp_path / METADATA_FILE) as metadata_file:
+            generations.append(json.load(metadata_file)["generation"])
+
+    remaining = {name.split(".")[1] for name in os.listdir(tmp_path) if name.endswith((".npy", ".npz"))}
+    assert remaining == set(generations[1:])
+
+
+def test_load_rejects_mismatched_ids_and_vectors(tmp_path):
+    _trained_index().save(str(tmp_path))
+    with open(tmp_path / METADATA_FILE) as metadata_file:
+        metadata = json.load(metadata_file)
+    metadata["ids"] = metadata["ids"][:-1]
+    with open(tmp_path / METADATA_FILE, "w") as metadata_file:
+        json.dump(metadata, metadata_file)
+
+    with pytest.raises(ValueError, match="inconsistent"):
+        IVFIndex.load(str(tmp_path))
+
+
+def test_load_rejects_other_format_versions(tmp_path):
+    _trained_index().save(str(tmp_path))
+    with open(tmp_path / METADATA_FILE) as metadata_file:
+        metadata = json.load(metadata_file)
+    metadata["format_version"] = 1
+    with open(tmp_path / METADATA_FILE, "w") as metadata_file:
+        json.dump(metadata, metadata_file)
+
+    with pytest.raises(ValueError, match="format version"):
+        IVFIndex.load(str(tmp_path))
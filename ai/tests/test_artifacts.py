@@ -0,0 +1,98 @@
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from ai.artifacts import ARTIFACT_FORMAT_VERSION, MANIFEST_FILE, ArtifactError
+from ai.pattern_mining import IncrementalPatternMiner
+from ai.threat_detection import ThreatDetector
+
+
+def _readings(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {"temperature": float(t), "pressure": float(p)}
+        for t, p in zip(rng.normal(25.0, 1.0, count), rng.normal(1013.0, 2.0, count))
+    ]
+
+
+def _fitted_detector(**kwargs):
+    detector = ThreatDetector(**kwargs)
+    detector.fit_baseline(_readings(500))
+    return detector
+
+
+def _rewrite_manifest(path, **changes):
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    with open(manifest_path) as manifest_file:
+        manifest = json.load(manifest_file)
+    manifest.update(changes)
+    with open(manifest_path, "w") as manifest_file:
+        json.dump(manifest, manifest_file)
+
+
+def test_loaded_detector_scores_like_the_saved_one(tmp_path):
+    path = str(tmp_path / "detector")
+    detector = _fitted_detector()
+    manifest = detector.save_artifacts(path)
+
+    loaded = ThreatDetector()
+    loaded.load_artifacts(path, expected_features=["temperature", "pressure"])
+
+    features = np.array([[r["temperature"], r["pressure"]] for r in _readings(50, seed=1)])
+    expected = detector.anomaly_model.score(features, update=False)
+    actual = loaded.anomaly_model.score(features, update=False)
+    np.testing.assert_array_equal(actual[0], expected[0])
+    np.testing.assert_array_equal(actual[1], expected[1])
+    assert manifest["format_version"] == ARTIFACT_FORMAT_VERSION
+    assert datetime.fromisoformat(manifest["created_at"]).tzinfo is not None
+
+
+def test_saves_repoint_a_symlink_and_keep_two_previous_versions(tmp_path):
+    path = str(tmp_path / "detector")
+    detector = _fitted_detector()
+    for _ in range(4):
+        detector.save_artifacts(path)
+
+    versions = [name for name in os.listdir(tmp_path / ".detector.versions") if not name.startswith(".")]
+    assert os.path.islink(path)
+    assert len(versions) == 3
+    assert os.path.basename(os.path.realpath(path)) in versions
+
+
+def test_other_format_versions_are_rejected(tmp_path):
+    path = str(tmp_path / "detector")
+    _fitted_detector().save_artifacts(path)
+    _rewrite_manifest(path, format_version=ARTIFACT_FORMAT_VERSION - 1)
+
+    with pytest.raises(ArtifactError, match="format version"):
+        ThreatDetector().load_artifacts(path)
+
+
+def test_mismatched_rolling_windows_are_rejected(tmp_path):
+    path = str(tmp_path / "detector")
+    _fitted_detector().save_artifacts(path)
+
+    with pytest.raises(ArtifactError, match="rolling windows"):
+        ThreatDetector(rolling_windows=[5]).load_artifacts(path)
+
+
+def test_mismatched_pattern_cluster_count_is_rejected(tmp_path):
+    path = str(tmp_path / "detector")
+    _fitted_detector().save_artifacts(path)
+    detector = ThreatDetector()
+    detector.pattern_miner = IncrementalPatternMiner(n_clusters=3)
+
+    with pytest.raises(ArtifactError, match="clusters"):
+        detector.load_artifacts(path)
+    assert detector.pattern_miner.n_clusters == 3
+
+
+def test_unexpected_features_are_rejected(tmp_path):
+    path = str(tmp_path / "detector")
+    _fitted_detector().save_artifacts(path)
+
+    with pytest.raises(ArtifactError, match="expected"):
+        ThreatDetector().load_artifacts(path, expected_features=["temperature", "humidity"])
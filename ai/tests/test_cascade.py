@@ -0,0 +1,49 @@
+import numpy as np
+
+from ai.cascade import NEGATIVE, POSITIVE, UNCERTAIN, ThreatCascade
+from ai.threat_detection import ThreatDetector
+
+TEXTS = ["attack on the station", "lovely weather today", "bomb threat at the mall", "see you at lunch"]
+LABELS = [1, 0, 1, 0]
+
+
+def test_unfitted_screen_settles_posts_by_keyword():
+    screening = ThreatCascade().screen(["an attack downtown", "lovely weather today"])
+
+    assert screening.decisions.tolist() == [POSITIVE, NEGATIVE]
+
+
+def test_screen_settles_uncertain_posts_without_an_embedding_classifier():
+    # Thresholds that leave every post uncertain for the screening model
+    cascade = ThreatCascade(negative_threshold=0.0, positive_threshold=1.0).fit(TEXTS, LABELS)
+
+    screening = cascade.screen(["a threat was made", "nothing to report"])
+
+    assert screening.decisions.tolist() == [POSITIVE, NEGATIVE]
+
+
+def test_uncertain_posts_reach_a_fitted_embedding_classifier():
+    embeddings = np.random.default_rng(0).normal(size=(len(TEXTS), 8))
+    cascade = ThreatCascade(negative_threshold=0.0, positive_threshold=1.0).fit(TEXTS, LABELS, embeddings=embeddings)
+
+    screening = cascade.screen(["a threat was made", "nothing to report"])
+
+    assert screening.decisions.tolist() == [UNCERTAIN, UNCERTAIN]
+
+
+def test_detector_does_not_embed_without_an_embedding_classifier(monkeypatch):
+    detector = ThreatDetector(cascade=ThreatCascade())
+
+    def embed_texts(texts, *args, **kwargs):
+        raise AssertionError("posts were embedded")
+
+    monkeypatch.setattr(detector, "embed_texts", embed_texts)
+    posts = [
+        {"post_id": "1", "content": "there is danger near the school"},
+        {"post_id": "2", "content": "great game last night"}
+    ]
+
+    results = detector.analyze_social_media(posts)
+
+    assert [(result["post_id"], result["cascade_stage"]) for result in results] == [("1", "screen")]
+    assert detector.cascade.stats()["stages"]["encoder"]["settled"] == 0
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ai.anomaly import AnomalyModel
+from ai.threat_detection import ThreatDetector
+
+
+def _frame(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        "timestamp": pd.date_range("2021-08-01", periods=n, freq="min"),
+        "temperature": rng.normal(25.0, 1.0, n),
+        "pressure": rng.normal(1013.0, 2.0, n)
+    })
+    # A few obvious outliers
+    frame.loc[[5, 50, 300], "temperature"] = [60.0, -20.0, 80.0]
+    return frame
+
+
+def _detector():
+    detector = ThreatDetector()
+    detector.anomaly_model = AnomalyModel(contamination=0.05, random_state=0)
+    detector.fit_baseline(_frame(seed=1)[["temperature", "pressure"]].to_dict("records"))
+    return detector
+
+
+def _comparable(results):
+    return [(result["timestamp"], round(result["anomaly_score"], 12), result["features"]) for result in results]
+
+
+def test_records_columns_and_arrays_give_the_same_results():
+    detector = _detector()
+    frame = _frame()
+
+    from_records = detector.detect_anomalies(frame.to_dict("records"))
+    from_columns = detector.detect_anomalies_columnar({name: frame[name].to_numpy() for name in frame.columns})
+    from_array = detector.detect_anomalies_columnar(frame[["temperature", "pressure"]].to_numpy())
+
+    assert from_records and _comparable(from_records) == _comparable(from_columns)
+    assert [result["anomaly_score"] for result in from_array] == [result["anomaly_score"] for result in from_columns]
+    flagged = {result["timestamp"] for result in from_columns}
+    assert set(frame.loc[[5, 50, 300], "timestamp"]) <= flagged
+
+
+def test_predictions_match_isolation_forest_predict():
+    detector = _detector()
+    X = _frame()[["temperature", "pressure"]].to_numpy()
+
+    predictions, scores = detector.anomaly_model.score(X, update=False)
+
+    forest, mean, scale = detector.anomaly_model._fitted
+    np.testing.assert_array_equal(predictions, forest.predict((X - mean) / scale))
+    np.testing.assert_allclose(scores, forest.decision_function((X - mean) / scale))
+
+
+def test_columns_follow_the_baseline_schema():
+    detector = _detector()
+    columns = {"pressure": np.array([1013.0, 1013.0]), "temperature": np.array([np.nan, 90.0]), "extra": np.array([1, 2])}
+
+    results = detector.detect_anomalies_columnar(columns)
+
+    # The missing temperature is filled with the baseline mean, so only the hot reading is flagged
+    assert [result["features"]["temperature"] for result in results] == [90.0]
+    assert results[0]["timestamp"] is None and results[0]["severity"] in ("high", "medium")
+
+
+def test_first_batch_becomes_the_baseline():
+    detector = ThreatDetector()
+
+    detector.detect_anomalies_columnar({"temperature": _frame()["temperature"].to_numpy()})
+
+    assert detector.anomaly_model.is_fitted
+    assert detector.anomaly_model.feature_names == ["temperature"]
+
+
+def test_malformed_columnar_input_is_rejected():
+    detector = ThreatDetector()
+    with pytest.raises(ValueError):
+        detector.detect_anomalies_columnar(np.zeros((3, 2)))
+    with pytest.raises(ValueError):
+        detector.detect_anomalies_columnar({"a": [1.0, 2.0], "b": [1.0]})
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from ai.compression import EmbeddingCompressor, evaluate_compression
+
+
+def _embeddings(n=600, rank=16, dim=64, seed=0):
+    # Embeddings on a low-rank subspace, so a rank-dim projection keeps them exactly
+    rng = np.random.default_rng(seed)
+    return (rng.normal(size=(n, rank)) @ rng.normal(size=(rank, dim))).astype(np.float32)
+
+
+def _normalized(vectors):
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_float16_similarities_match_cosine():
+    embeddings = _embeddings()
+    compressor = EmbeddingCompressor(dim=16).fit(embeddings)
+
+    codes = compressor.encode(embeddings)
+    scores = compressor.similarities(compressor.project(embeddings[:1]), codes)
+
+    assert codes.dtype == np.float16 and codes.shape == (600, 16)
+    assert compressor.bytes_per_vector == 32
+    np.testing.assert_allclose(scores, _normalized(embeddings) @ _normalized(embeddings)[0], atol=2e-3)
+
+
+def test_pq_distances_are_distances_to_the_decoded_vectors():
+    embeddings = _embeddings()
+    compressor = EmbeddingCompressor(dim=16, storage="pq", n_subvectors=4, n_centroids=16).fit(embeddings)
+    query = compressor.project(embeddings[:1])[0]
+
+    codes = compressor.encode(embeddings)
+    distances = compressor.squared_distances(query, codes)
+
+    assert codes.dtype == np.uint8 and codes.shape == (600, 4)
+    expected = np.sum((compressor.decode(codes) - query) ** 2, axis=1)
+    np.testing.assert_allclose(distances, expected, rtol=1e-4, atol=1e-5)
+
+
+@pytest.mark.parametrize("storage", ["float16", "pq"])
+def test_saved_compressor_encodes_identically(tmp_path, storage):
+    embeddings = _embeddings()
+    compressor = EmbeddingCompressor(dim=16, storage=storage, n_subvectors=4, n_centroids=16).fit(embeddings)
+    path = str(tmp_path / "compressor.npz")
+
+    compressor.save(path)
+    loaded = EmbeddingCompressor.load(path)
+
+    assert loaded.storage == storage
+    np.testing.assert_array_equal(loaded.encode(embeddings), compressor.encode(embeddings))
+
+
+def test_evaluation_reports_recall_and_size():
+    embeddings = _embeddings()
+    compressor = EmbeddingCompressor(dim=16).fit(embeddings)
+
+    report = evaluate_compression(compressor, embeddings, embeddings[:20], k=5, n_clusters=3)
+
+    assert report["compression_ratio"] == 8.0
+    assert report["recall_at_5"] >= 0.95
+    assert report["explained_variance_ratio"] == pytest.approx(1.0, abs=1e-4)
+
+
+def test_invalid_configurations_are_rejected():
+    with pytest.raises(ValueError):
+        EmbeddingCompressor(storage="int4")
+    with pytest.raises(ValueError):
+        EmbeddingCompressor(dim=10, storage="pq", n_subvectors=4)
+    with pytest.raises(ValueError):
+        EmbeddingCompressor(dim=16).fit(_embeddings(n=8))
+    with pytest.raises(RuntimeError):
+        EmbeddingCompressor().encode(_embeddings(n=2))
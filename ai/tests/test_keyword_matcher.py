@@ -0,0 +1,66 @@
+import json
+import random
+
+from ai.keyword_matcher import KeywordMatcher, load_keywords
+
+
+def _naive_hits(keywords, text):
+    return sorted(
+        (keyword, start, start + len(keyword))
+        for keyword in keywords
+        for start in range(len(text) - len(keyword) + 1)
+        if text.startswith(keyword, start)
+    )
+
+
+def test_overlapping_keywords_match_a_naive_scan():
+    keywords = ["he", "she", "his", "hers", "a", "ab", "bab", "abab"]
+    matcher = KeywordMatcher(keywords)
+    rng = random.Random(0)
+    for _ in range(200):
+        text = "".join(rng.choice("abehirs") for _ in range(rng.randint(0, 40)))
+        hits = sorted((hit.keyword, hit.start, hit.end) for hit in matcher.find_all(text))
+        assert hits == _naive_hits(keywords, text)
+
+
+def test_spans_index_the_original_text():
+    matcher = KeywordMatcher(["bomb"])
+    # "İ" lowercases to two characters, which must not shift the span
+    text = "İstanbul BOMB alert"
+
+    [hit] = matcher.find_all(text)
+
+    assert text[hit.start:hit.end] == "BOMB"
+
+
+def test_whole_word_and_case_sensitive_matching():
+    assert KeywordMatcher(["attack"], whole_word=True).matched_keywords("counterattack, attack!") == {"attack"}
+    assert len(KeywordMatcher(["attack"], whole_word=True).find_all("counterattacks")) == 0
+    assert KeywordMatcher(["Bomb"], case_sensitive=True).matched_keywords("bomb Bomb") == {"Bomb"}
+    assert len(KeywordMatcher(["Bomb"], case_sensitive=True).find_all("bomb")) == 0
+
+
+def test_score_counts_each_keyword_once():
+    matcher = KeywordMatcher({"bomb": 2.0, "threat": 0.5})
+
+    assert matcher.score("bomb bomb threat") == 2.5
+    assert matcher.score("") == 0
+
+
+def test_reload_replaces_the_lexicon():
+    matcher = KeywordMatcher(["bomb"])
+
+    matcher.reload({"Flood": 3.0})
+
+    assert matcher.keywords == {"flood": 3.0}
+    assert matcher.matched_keywords("bomb flood") == {"flood"}
+
+
+def test_load_keywords_reads_text_and_json_lexicons(tmp_path):
+    text_path = tmp_path / "keywords.txt"
+    text_path.write_text("# threats\nbomb, 2.5\n\nattack\n")
+    json_path = tmp_path / "keywords.json"
+    json_path.write_text(json.dumps(["riot", "flood"]))
+
+    assert load_keywords(str(text_path)) == {"bomb": 2.5, "attack": 1.0}
+    assert load_keywords(str(json_path)) == {"riot": 1.0, "flood": 1.0}
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from ai.near_duplicates import NearDuplicateDetector
+
+ALERT = "Police report a bomb threat at the central station, please avoid the area until further notice"
+
+
+def _jaccard(detector, a, b):
+    left, right = set(detector.shingles(a).tolist()), set(detector.shingles(b).tolist())
+    return len(left & right) / len(left | right)
+
+
+def test_signature_agreement_estimates_jaccard_similarity():
+    detector = NearDuplicateDetector(num_perm=512, bands=64)
+    a = " ".join(f"word{i}" for i in range(40))
+    b = " ".join(f"word{i}" for i in range(10, 50))
+
+    estimate = np.mean(detector.signature(a) == detector.signature(b))
+
+    assert estimate == pytest.approx(_jaccard(detector, a, b), abs=0.08)
+
+
+def test_copies_with_formatting_changes_are_grouped():
+    detector = NearDuplicateDetector()
+    texts = [
+        "Sunny afternoon at the beach with friends",
+        ALERT,
+        "RT: " + ALERT.upper() + "!!",
+        "  " + ALERT.replace(",", "") + " #alert"
+    ]
+
+    assert detector.group(texts).tolist() == [0, 1, 1, 1]
+
+
+def test_unrelated_texts_stay_apart():
+    detector = NearDuplicateDetector()
+    texts = [ALERT, "Flooding closes the riverside road after heavy overnight rain", "Great match last night"]
+
+    assert detector.group(texts).tolist() == [0, 1, 2]
+
+
+def test_clusters_are_represented_by_their_highest_scoring_member():
+    detector = NearDuplicateDetector()
+    texts = [ALERT, "Great match last night", ALERT + " now"]
+
+    assert detector.clusters(texts) == {0: [0, 2], 1: [1]}
+    assert detector.clusters(texts, scores=[1.0, 0.0, 2.0]) == {2: [2, 0], 1: [1]}
+    assert detector.clusters(texts, scores=[1.0, 0.0, 1.0]) == {0: [0, 2], 1: [1]}
+
+
+def test_band_count_must_divide_the_signature():
+    with pytest.raises(ValueError):
+        NearDuplicateDetector(num_perm=64, bands=10)
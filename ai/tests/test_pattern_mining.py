@@ -0,0 +1,93 @@
+import numpy as np
+from sklearn.feature_extraction.text import TfidfTransformer
+
+from ai.pattern_mining import IncrementalPatternMiner, threat_texts
+from ai.threat_detection import ThreatDetector
+
+TOPICS = [
+    ("Phishing email", "credential phishing email targeting payroll staff"),
+    ("Flood warning", "river flood levels rising near the bridge"),
+    ("Network intrusion", "ransomware intrusion on the hospital network")
+]
+
+
+def _threats(count, offset=0):
+    return [
+        {"title": TOPICS[i % len(TOPICS)][0], "description": f"{TOPICS[i % len(TOPICS)][1]} report {i}"}
+        for i in range(offset, offset + count)
+    ]
+
+
+def test_running_idf_matches_a_batch_fit():
+    miner = IncrementalPatternMiner(n_clusters=3, n_features=2 ** 12)
+    texts = threat_texts(_threats(12))
+
+    miner.partial_fit(texts[:5])
+    miner.partial_fit(texts[5:])
+
+    counts = miner.vectorizer.transform(texts)
+    expected = TfidfTransformer(smooth_idf=True).fit(counts).idf_
+    seen = np.unique(counts.indices)
+    np.testing.assert_allclose(miner.idf()[seen], expected[seen])
+    assert miner.doc_count == 12
+
+
+def test_texts_are_buffered_until_every_cluster_can_be_seeded():
+    miner = IncrementalPatternMiner(n_clusters=3)
+
+    assert miner.partial_fit(threat_texts(_threats(2))).tolist() == [-1, -1]
+    assert not miner.is_fitted
+
+    labels = miner.partial_fit(threat_texts(_threats(2, offset=2)))
+
+    assert miner.is_fitted
+    assert (labels >= 0).all()
+    assert miner.cluster_counts.sum() == 4
+
+
+def test_pattern_ids_and_counts_carry_across_updates():
+    miner = IncrementalPatternMiner(n_clusters=3)
+    first = {pattern["cluster_id"]: pattern for pattern in miner.update(_threats(9))}
+    second = {pattern["cluster_id"]: pattern for pattern in miner.update(_threats(6, offset=9))}
+
+    for cluster_id, pattern in second.items():
+        assert pattern["pattern_id"] == miner.pattern_id(cluster_id)
+        if cluster_id in first:
+            assert pattern["pattern_id"] == first[cluster_id]["pattern_id"]
+            assert pattern["count"] == first[cluster_id]["count"] + pattern["new_count"]
+    assert sum(pattern["new_count"] for pattern in second.values()) == 6
+
+
+def test_state_round_trip_keeps_predictions():
+    miner = IncrementalPatternMiner(n_clusters=3)
+    miner.update(_threats(9))
+    restored = IncrementalPatternMiner(n_clusters=3)
+
+    restored.set_state(miner.get_state())
+
+    texts = threat_texts(_threats(6, offset=20))
+    np.testing.assert_array_equal(
+        restored.kmeans.predict(restored._vectorize(texts, update_stats=False)),
+        miner.kmeans.predict(miner._vectorize(texts, update_stats=False))
+    )
+    assert restored.pattern_id(0) == miner.pattern_id(0)
+
+
+def test_batch_patterns_use_the_cluster_mean_tfidf():
+    detector = ThreatDetector()
+    threats = _threats(15)
+
+    patterns = detector.detect_patterns(threats)
+
+    tfidf = detector.tfidf.transform(threat_texts(threats)).toarray()
+    labels = detector.kmeans.labels_
+    columns = {name: i for i, name in enumerate(detector.tfidf.get_feature_names_out())}
+    assert sum(pattern["count"] for pattern in patterns) <= len(threats)
+    for pattern in patterns:
+        members = labels == pattern["cluster_id"]
+        mean = tfidf[members].mean(axis=0)
+        fifth = np.sort(mean)[-5]
+        assert pattern["count"] == int(members.sum())
+        assert len(pattern["common_terms"]) == np.count_nonzero(np.sort(mean)[-5:] > 0)
+        # Terms tied with the fifth-highest mean may be picked in either order
+        assert all(mean[columns[term]] >= fifth - 1e-12 for term in pattern["common_terms"])
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ai.sensor_features import RollingFeatureExtractor
+
+WINDOWS = (3, 10)
+
+
+def _readings(n=400, sensors=7, seed=0):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        "sensor_id": rng.choice([f"s{i}" for i in range(sensors)], size=n),
+        "timestamp": pd.Timestamp("2021-08-01") + pd.to_timedelta(rng.permutation(n) * 1.5, unit="s"),
+        # A large offset checks that the prefix sums stay accurate
+        "temperature": 1e6 + rng.normal(25.0, 2.0, n),
+        "humidity": rng.normal(60.0, 5.0, n)
+    })
+    # Repeated values give zero-variance windows
+    frame.loc[::9, "humidity"] = 50.0
+    return frame
+
+
+def _pandas_features(frame, names):
+    ordered = frame.sort_values(["sensor_id", "timestamp"], kind="stable")
+    groups = ordered.groupby("sensor_id", sort=False)
+    elapsed = groups["timestamp"].diff().dt.total_seconds()
+    expected = {}
+    for name in names:
+        for window in WINDOWS:
+            rolling = groups[name].rolling(window, min_periods=1)
+            mean = rolling.mean().reset_index(level=0, drop=True)
+            std = rolling.std(ddof=0).reset_index(level=0, drop=True)
+            expected[f"{name}_mean_{window}"] = mean
+            expected[f"{name}_std_{window}"] = std
+            expected[f"{name}_zscore_{window}"] = ((ordered[name] - mean) / std).where(std > 1e-9, 0.0)
+        delta = groups[name].diff().fillna(0.0)
+        expected[f"{name}_delta"] = delta
+        expected[f"{name}_rate"] = (delta / elapsed).where(elapsed > 0, 0.0)
+    return pd.DataFrame(expected).loc[frame.index]
+
+
+def _columns(frame):
+    return {name: frame[name].to_numpy() for name in frame.columns}
+
+
+def test_features_match_pandas_rolling_windows():
+    frame = _readings()
+    extractor = RollingFeatureExtractor(WINDOWS)
+
+    features = extractor.transform_columns(_columns(frame))
+
+    expected = _pandas_features(frame, ["temperature", "humidity"])
+    assert list(features) == extractor.output_names() == list(expected.columns)
+    for name, values in features.items():
+        if "zscore" in name:
+            # Constant windows have a std of zero up to rounding; only compare real spreads
+            spread = expected[name.replace("zscore", "std")].to_numpy() > 1e-6
+            np.testing.assert_allclose(values[spread], expected[name].to_numpy()[spread], rtol=1e-5, atol=1e-6)
+        else:
+            np.testing.assert_allclose(values, expected[name].to_numpy(), rtol=1e-9, atol=1e-6)
+
+
+def test_windows_continue_across_batches():
+    frame = _readings().sort_values("timestamp")
+    whole = RollingFeatureExtractor(WINDOWS).transform_columns(_columns(frame))
+
+    extractor = RollingFeatureExtractor(WINDOWS)
+    extractor.transform_columns(_columns(frame.iloc[:250]))
+    second = extractor.transform_columns(_columns(frame.iloc[250:]))
+
+    for name, values in second.items():
+        if "zscore" not in name:
+            np.testing.assert_allclose(values, whole[name][250:], rtol=1e-9, atol=1e-6)
+
+
+def test_rate_equals_delta_without_timestamps():
+    sensor_ids = ["a", "b", "a", "a", "b"]
+    X = np.array([[1.0], [10.0], [4.0], [2.0], [7.0]])
+    extractor = RollingFeatureExtractor([2])
+
+    features = extractor.transform(sensor_ids, X)
+
+    names = ["x_mean_2", "x_std_2", "x_zscore_2", "x_delta", "x_rate"]
+    extractor.input_names = ["x"]
+    assert extractor.output_names() == names
+    assert features[:, 0].tolist() == pytest.approx([1.0, 10.0, 2.5, 3.0, 8.5])
+    assert features[:, 3].tolist() == [0.0, 0.0, 3.0, -2.0, -3.0]
+    assert features[:, 4].tolist() == features[:, 3].tolist()
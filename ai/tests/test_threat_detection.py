@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from ai.embedding_cache import EmbeddingCache
+from ai.model_registry import model_registry
+from ai.threat_detection import EMBEDDING_DIM, ThreatDetector
+
+
+class FallbackEncoder:
+    # What create_encoder returns when the ONNX session fails its parity check
+    name = "torch"
+
+
+@pytest.fixture
+def fallback_model():
+    model_registry.register("fallback-model:onnx", {"tokenizer": None, "encoder": FallbackEncoder()})
+    yield "fallback-model"
+    model_registry.unload("fallback-model:onnx")
+
+
+def test_onnx_fallback_uses_the_torch_model_key(fallback_model):
+    cache = EmbeddingCache()
+    detector = ThreatDetector(model_name=fallback_model, encoder_backend="onnx", embedding_cache=cache)
+    assert detector.model_key == cache.namespace == "fallback-model:onnx"
+
+    assert detector.encoder.name == "torch"
+
+    assert detector.model_key == cache.namespace == "fallback-model"
+    assert detector.model_status()["loaded"]
+
+
+def test_cache_lookups_use_the_built_encoder_namespace(fallback_model):
+    cache = EmbeddingCache()
+    detector = ThreatDetector(model_name=fallback_model, encoder_backend="onnx", embedding_cache=cache)
+    cache.put_by_key(EmbeddingCache(namespace=fallback_model).key("bomb threat"), np.ones(EMBEDDING_DIM, dtype=np.float32))
+
+    embeddings = detector.embed_texts(["bomb threat"], raise_errors=True)
+
+    assert (embeddings == 1).all()
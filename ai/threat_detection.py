@@ -1,33 +1,128 @@
 import pandas as pd
 import numpy as np
+from scipy.sparse import csr_matrix
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.cluster import KMeans
-from sklearn.ensemble import IsolationForest
-from sklearn.preprocessing import StandardScaler
-import torch
-import torch.nn as nn
 from transformers import AutoTokenizer, AutoModel
 import json
 import logging
-from typing import Dict, Any, List
+import os
+from typing import Dict, Any, IO, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
 import uuid
 
+from ai.anomaly import AnomalyModel
+from ai.artifacts import load_detector_artifacts, save_detector_artifacts
+from ai.cascade import POSITIVE, UNCERTAIN, ThreatCascade
+from ai.compression import EmbeddingCompressor
+from ai.embedding_cache import EmbeddingCache
+from ai.encoders import DEFAULT_ENCODER_BACKEND, TorchEncoder, create_encoder
+from ai.keyword_matcher import KeywordMatcher, get_threat_matcher
+from ai.model_registry import model_registry
+from ai.near_duplicates import NearDuplicateDetector
+from ai.pattern_mining import IncrementalPatternMiner, threat_texts
+from ai.quantization import quantize_encoder
+from ai.report_writer import StreamingThreatReport, report_recommendations
+from ai.sensor_features import RollingFeatureExtractor
+from ai.sensor_scoring import SensorAnomalyScorer
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Pre-trained text model used for embeddings
+DEFAULT_MODEL_NAME = "bert-base-uncased"
+
+# BERT base produces 768-dimensional hidden states
+EMBEDDING_DIM = 768
+
+# Default number of texts per encoder forward pass
+DEFAULT_BATCH_SIZE = int(os.getenv("AI_BATCH_SIZE", 32))
+
+def _column_values(values: np.ndarray, rows: np.ndarray) -> List[Any]:
+    """
+    Selected rows of a column as Python values (datetimes as Timestamps)
+    """
+    selected = values[rows]
+    if selected.dtype.kind == "M":
+        return list(pd.DatetimeIndex(selected))
+    return selected.tolist()
+
+
+def _model_key(model_name: str, quantize: bool, encoder_backend: str) -> str:
+    """
+    Key of an encoder configuration; quantized, ONNX and fp32 encoders get separate keys
+    """
+    if quantize:
+        return f"{model_name}:int8"
+    if encoder_backend != "torch":
+        return f"{model_name}:{encoder_backend}"
+    return model_name
+
+
 class ThreatDetector:
-    def __init__(self):
+    def __init__(
+        self,
+        model_name: str = DEFAULT_MODEL_NAME,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        quantize: bool = False,
+        keyword_matcher: Optional[KeywordMatcher] = None,
+        near_duplicates: Optional[NearDuplicateDetector] = None,
+        encoder_backend: str = DEFAULT_ENCODER_BACKEND,
+        rolling_windows: Optional[Sequence[int]] = None,
+        cascade: Optional[ThreatCascade] = None,
+        embedding_compressor: Optional[EmbeddingCompressor] = None
+    ):
         """
         Initialize the threat detection system with pre-trained models
+        
+        The text model is not loaded here. It is loaded on first use and
+        shared through the process-wide model registry, so detectors that
+        only use anomaly or pattern detection never pay for it. An optional
+        embedding cache lets repeated texts skip the encoder. With
+        ``quantize=True`` the encoder's linear layers run as dynamic int8
+        (CPU only). Threat keywords are scanned with the shared keyword
+        matcher unless a custom one is given. Near-duplicate social media
+        posts are collapsed with MinHash/LSH before embedding. The embedding
+        cache is namespaced by the encoder's model key (a cache without a
+        namespace adopts it; a different namespace is rejected), so fp32,
+        int8 and ONNX vectors never mix. If the ONNX encoder falls back to
+        PyTorch, the model key and cache namespace switch to the PyTorch
+        encoder's once the model is loaded.
+        ``encoder_backend`` selects how the encoder runs: "torch" (default,
+        from ``AI_ENCODER_BACKEND``) or "onnx" for ONNX Runtime. With
+        ``rolling_windows``, sensor anomaly detection also uses per-sensor
+        rolling mean, std, z-score, delta and rate features. With a
+        ``cascade``, social media posts are screened cheaply first and only
+        uncertain posts are embedded. A fitted ``embedding_compressor``
+        makes social media clustering run on compact PCA projections.
         """
-        # Initialize text processing models
-        self.tokenizer = AutoTokenizer.from_pretrained("bert-base-uncased")
-        self.bert_model = AutoModel.from_pretrained("bert-base-uncased")
+        if quantize and encoder_backend != "torch":
+            raise ValueError("Int8 quantization is only supported with the torch encoder backend")
+        self.model_name = model_name
+        self.embedding_cache = embedding_cache
+        self.quantize = quantize
+        self.encoder_backend = encoder_backend
+        self.keyword_matcher = keyword_matcher or get_threat_matcher()
+        self.near_duplicates = near_duplicates or NearDuplicateDetector()
+        self.cascade = cascade
+        self.embedding_compressor = embedding_compressor
+        # Quantized, ONNX and fp32 encoders are registered under separate keys;
+        # model_key follows the encoder actually built (see _text_model)
+        self.registry_key = _model_key(model_name, quantize, encoder_backend)
+        self.model_key = self.registry_key
+        
+        # Cached vectors are only valid for the encoder that produced them, so
+        # the cache is keyed by model_key; an unnamed cache adopts it
+        if embedding_cache is not None:
+            if not embedding_cache.namespace:
+                embedding_cache.namespace = self.model_key
+            elif embedding_cache.namespace != self.model_key:
+                raise ValueError(
+                    f"Embedding cache namespace {embedding_cache.namespace!r} does not match encoder {self.model_key!r}"
+                )
         
         # Initialize anomaly detection models
-        self.isolation_forest = IsolationForest(contamination=0.1)
-        self.scaler = StandardScaler()
+        self.anomaly_model = AnomalyModel(contamination=0.1)
         
         # Initialize text classification vectorizer
         self.tfidf = TfidfVectorizer(max_features=1000, stop_words='english')
@@ -35,147 +130,614 @@ class ThreatDetector:
         # Initialize clustering for pattern detection
         self.kmeans = KMeans(n_clusters=5)
         
+        # Incremental pattern mining keeps state across detect_patterns calls
+        self.pattern_miner = IncrementalPatternMiner(n_clusters=5)
+        
+        # Rolling time-series features added to sensor readings, when configured
+        self.feature_extractor = RollingFeatureExtractor(rolling_windows) if rolling_windows else None
+        
+        # Per-sensor models for detect_sensor_anomalies; worker processes start on first fit
+        self.sensor_scorer = SensorAnomalyScorer(contamination=0.1)
+        
         logger.info("Threat detection models initialized")
     
+    def _load_text_model(self) -> Dict[str, Any]:
+        """
+        Load the tokenizer and encoder for this detector's model name
+        """
+        tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        model = AutoModel.from_pretrained(self.model_name)
+        model.eval()
+        if self.quantize:
+            model = quantize_encoder(model)
+        encoder = create_encoder(self.encoder_backend, model, tokenizer, self.model_name)
+        if encoder.name != "torch":
+            # The exported graph holds its own weights; drop the PyTorch copy
+            return {"tokenizer": tokenizer, "encoder": encoder}
+        return {"tokenizer": tokenizer, "model": model, "encoder": encoder}
+    
+    def _text_model(self) -> Dict[str, Any]:
+        """
+        Get the shared text model components, loading them if needed
+        
+        When the encoder built is not the one requested (an ONNX parity
+        failure falls back to PyTorch), the model key and the embedding
+        cache namespace are switched to the built encoder's.
+        """
+        components = model_registry.get_or_load(self.registry_key, self._load_text_model)
+        encoder = components.get("encoder")
+        model_key = _model_key(self.model_name, self.quantize, encoder.name if encoder is not None else "torch")
+        if model_key != self.model_key:
+            logger.warning(f"Encoder {self.model_key!r} was built as {model_key!r}; using its embedding namespace")
+            self.model_key = model_key
+            if self.embedding_cache is not None:
+                self.embedding_cache.namespace = model_key
+        return components
+    
+    def _resolve_model_key(self) -> None:
+        """
+        Load the text model before cache lookups when the encoder built may
+        differ from the one requested, so keys use its namespace
+        """
+        if self.encoder_backend != "torch":
+            self._text_model()
+    
+    @property
+    def tokenizer(self):
+        return self._text_model()["tokenizer"]
+    
+    @property
+    def bert_model(self):
+        return self._text_model().get("model")
+    
+    @property
+    def encoder(self):
+        components = self._text_model()
+        if "encoder" not in components:
+            # Components registered directly with only a PyTorch model
+            components["encoder"] = TorchEncoder(components["model"])
+        return components["encoder"]
+    
+    def warmup(self) -> Dict[str, Any]:
+        """
+        Load the text model and run one forward pass so the first request is fast
+        """
+        self.embed_texts(["warmup"])
+        return self.model_status()
+    
+    def model_status(self) -> Dict[str, Any]:
+        """
+        Report whether the text model is loaded and its estimated memory use
+        """
+        return {
+            "model_name": self.model_name,
+            "quantized": self.quantize,
+            "encoder_backend": self.encoder.name if model_registry.is_loaded(self.registry_key) else self.encoder_backend,
+            "loaded": model_registry.is_loaded(self.registry_key),
+            "memory_bytes": model_registry.memory_bytes(self.registry_key),
+            "cascade": self.cascade.stats() if self.cascade is not None else None
+        }
+    
+    def close(self) -> None:
+        """
+        Shut down the sensor scoring worker processes; the detector stays usable
+        
+        The shared text model is left in the model registry for other detectors.
+        """
+        self.sensor_scorer.close()
+    
+    def __enter__(self) -> "ThreatDetector":
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+    
     def process_text(self, text: str) -> np.ndarray:
         """
         Process text using BERT embeddings
         """
         try:
-            inputs = self.tokenizer(text, return_tensors="pt", truncation=True, padding=True)
-            with torch.no_grad():
-                outputs = self.bert_model(**inputs)
+            if self.embedding_cache is not None:
+                self._resolve_model_key()
+                key = self.embedding_cache.key(text)
+                cached = self.embedding_cache.get_by_key(key)
+                if cached is not None:
+                    return cached
+            
+            inputs = self.tokenizer(text, return_tensors="np", truncation=True, padding=True)
             # Use the CLS token embedding as the text representation
-            embeddings = outputs.last_hidden_state[:, 0, :].numpy()
-            return embeddings.flatten()
+            embeddings = self.encoder.encode(inputs).flatten()
+            
+            if self.embedding_cache is not None:
+                self.embedding_cache.put_by_key(key, embeddings)
+            return embeddings
         except Exception as e:
             logger.error(f"Error processing text: {str(e)}")
-            return np.zeros(768)  # BERT base has 768 dimensions
+            return np.zeros(EMBEDDING_DIM)
     
-    def detect_anomalies(self, sensor_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def embed_texts(
+        self,
+        texts: List[str],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        raise_errors: bool = False
+    ) -> np.ndarray:
         """
-        Detect anomalies in sensor data
+        Process many texts using batched BERT embeddings
+        
+        Texts are tokenized once, sorted by token length and split into
+        buckets of ``batch_size`` so each forward pass only pads up to the
+        longest text in its bucket. Returns an ``(n, 768)`` array of CLS
+        embeddings in the original input order. With an embedding cache,
+        only texts not already cached are encoded, each distinct text once.
+        Encoder errors are logged and give zero vectors, unless
+        ``raise_errors`` is set.
         """
+        if len(texts) == 0:
+            return np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+        
         try:
-            # Convert to DataFrame
-            df = pd.DataFrame(sensor_data)
+            if self.embedding_cache is None:
+                return self._encode_texts(texts, batch_size)
             
-            # Extract numerical features
-            numerical_cols = df.select_dtypes(include=[np.number]).columns
-            if len(numerical_cols) == 0:
-                return []
-            
-            # Scale the data
-            scaled_data = self.scaler.fit_transform(df[numerical_cols])
-            
-            # Fit isolation forest
-            self.isolation_forest.fit(scaled_data)
+            self._resolve_model_key()
+            embeddings = np.zeros((len(texts), EMBEDDING_DIM), dtype=np.float32)
+            missing: Dict[str, List[int]] = {}
+            for i, text in enumerate(texts):
+                key = self.embedding_cache.key(text)
+                if key in missing:
+                    missing[key].append(i)
+                    continue
+                cached = self.embedding_cache.get_by_key(key)
+                if cached is not None:
+                    embeddings[i] = cached
+                else:
+                    missing[key] = [i]
             
-            # Predict anomalies
-            predictions = self.isolation_forest.predict(scaled_data)
-            anomaly_scores = self.isolation_forest.decision_function(scaled_data)
-            
-            # Create results
-            anomalies = []
-            for i, (prediction, score) in enumerate(zip(predictions, anomaly_scores)):
-                if prediction == -1:  # Anomaly detected
-                    anomalies.append({
-                        "data_id": str(uuid.uuid4()),
-                        "timestamp": df.iloc[i].get("timestamp", None),
-                        "anomaly_score": float(score),
-                        "severity": "high" if score < -0.5 else "medium",
-                        "features": df.iloc[i].to_dict()
-                    })
+            if missing:
+                encoded = self._encode_texts([texts[indices[0]] for indices in missing.values()], batch_size)
+                for (key, indices), embedding in zip(missing.items(), encoded):
+                    embeddings[indices] = embedding
+                    self.embedding_cache.put_by_key(key, embedding)
             
-            return anomalies
+            return embeddings
+        except Exception as e:
+            if raise_errors:
+                raise
+            logger.error(f"Error processing text batch: {str(e)}")
+            return np.zeros((len(texts), EMBEDDING_DIM), dtype=np.float32)
+    
+    def _encode_texts(self, texts: List[str], batch_size: int) -> np.ndarray:
+        """
+        Run length-bucketed batched forward passes over texts
+        """
+        input_ids = self.tokenizer(list(texts), truncation=True)["input_ids"]
+        order = np.argsort([len(ids) for ids in input_ids], kind="stable")
+        
+        embeddings = np.zeros((len(texts), EMBEDDING_DIM), dtype=np.float32)
+        for start in range(0, len(order), batch_size):
+            bucket = order[start:start + batch_size]
+            inputs = self.tokenizer.pad(
+                {"input_ids": [input_ids[i] for i in bucket]},
+                return_tensors="np"
+            )
+            embeddings[bucket] = self.encoder.encode(inputs)
+        
+        return embeddings
+    
+    def _sensor_columns(
+        self,
+        data: Union[np.ndarray, Mapping[str, Any]],
+        feature_names: Optional[List[str]] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Normalize columnar sensor input to a dict of equal-length NumPy columns
+        
+        A 2-D array needs column names, from ``feature_names`` or the fitted
+        baseline. Its columns are returned as views, not copies.
+        """
+        if isinstance(data, np.ndarray):
+            if data.ndim != 2:
+                raise ValueError("Sensor array must be 2-dimensional (readings x features)")
+            names = feature_names or self.anomaly_model.feature_names
+            if names is None or len(names) != data.shape[1]:
+                raise ValueError("Sensor array needs one feature name per column")
+            return {name: data[:, j] for j, name in enumerate(names)}
+        
+        columns = {name: np.asarray(values) for name, values in data.items()}
+        if len({len(values) for values in columns.values()}) > 1:
+            raise ValueError("Sensor columns must all have the same length")
+        return columns
+    
+    def _feature_matrix(
+        self,
+        columns: Dict[str, np.ndarray],
+        feature_names: Optional[List[str]] = None,
+        fill_values: Optional[np.ndarray] = None
+    ) -> Tuple[List[str], np.ndarray]:
+        """
+        Build the float64 feature matrix from sensor columns
+        
+        Before a baseline exists (``feature_names`` is None), every numeric
+        column is a feature. Once a baseline exists, features follow its
+        schema: unknown columns are ignored and missing values are filled
+        with ``fill_values`` (the baseline mean).
+        """
+        n_rows = len(next(iter(columns.values()))) if columns else 0
+        if feature_names is None:
+            feature_names = [name for name, values in columns.items() if values.dtype.kind in "iuf"]
+            features = np.empty((n_rows, len(feature_names)), dtype=np.float64)
+            for j, name in enumerate(feature_names):
+                features[:, j] = columns[name]
+            return feature_names, features
+        
+        features = np.empty((n_rows, len(feature_names)), dtype=np.float64)
+        for j, name in enumerate(feature_names):
+            values = columns.get(name)
+            if values is None:
+                features[:, j] = np.nan
+            elif values.dtype.kind in "biuf":
+                features[:, j] = values
+            else:
+                features[:, j] = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=np.float64)
+        missing = np.isnan(features)
+        if missing.any():
+            features[missing] = np.take(fill_values, np.nonzero(missing)[1])
+        return feature_names, features
+    
+    def _records_to_columns(self, sensor_data: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+        """
+        Convert list-of-dicts readings to columns (missing keys become NaN)
+        """
+        df = pd.DataFrame(sensor_data)
+        return {str(name): df[name].to_numpy() for name in df.columns}
+    
+    def _with_rolling_features(self, columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """
+        Add rolling-window feature columns when a feature extractor is configured
+        """
+        if self.feature_extractor is None:
+            return columns
+        return {**columns, **self.feature_extractor.transform_columns(columns)}
+    
+    def fit_baseline(self, sensor_data: List[Dict[str, Any]]) -> int:
+        """
+        Fit the persistent anomaly model on baseline sensor readings
+        
+        Returns the number of readings used. Later calls to
+        ``detect_anomalies`` score against this baseline without refitting.
+        """
+        feature_names, features = self._feature_matrix(
+            self._with_rolling_features(self._records_to_columns(sensor_data)),
+            self.anomaly_model.feature_names,
+            self.anomaly_model.scaler.mean
+        )
+        if len(feature_names) == 0 or len(features) == 0:
+            raise ValueError("Baseline sensor data has no numerical features")
+        self.anomaly_model.fit_baseline(features, feature_names)
+        return len(features)
+    
+    def save_artifacts(self, path: str) -> Dict[str, Any]:
+        """
+        Save the fitted anomaly and pattern models to an artifact directory
+        """
+        return save_detector_artifacts(self, path)
+    
+    def load_artifacts(self, path: str, mmap: bool = True, expected_features: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Load fitted models saved with ``save_artifacts``, memory-mapped by default
+        
+        Workers that load artifacts start scoring immediately instead of
+        refitting a baseline. Raises ArtifactError on version or schema mismatch.
+        """
+        return load_detector_artifacts(self, path, mmap=mmap, expected_features=expected_features)
+    
+    def detect_anomalies(self, sensor_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Detect anomalies in sensor data
+        
+        Readings are scored against the persistent baseline. If no baseline
+        has been fitted yet, the first batch becomes the baseline.
+        """
+        try:
+            if not sensor_data:
+                return []
+            return self.detect_anomalies_columnar(self._records_to_columns(sensor_data))
         except Exception as e:
             logger.error(f"Error detecting anomalies: {str(e)}")
             return []
     
-    def analyze_social_media(self, posts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def detect_anomalies_columnar(
+        self,
+        data: Union[np.ndarray, Mapping[str, Any]],
+        feature_names: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Detect anomalies in columnar sensor data
+        
+        ``data`` is either a dict of equal-length columns (arrays or lists)
+        or a 2-D array with ``feature_names`` (defaulting to the baseline
+        schema). Anomalies are selected with a boolean mask, and result
+        dicts are built only for flagged rows. Errors propagate to the caller.
+        """
+        columns = self._with_rolling_features(self._sensor_columns(data, feature_names))
+        feature_names, features = self._feature_matrix(
+            columns, self.anomaly_model.feature_names, self.anomaly_model.scaler.mean
+        )
+        if len(feature_names) == 0 or len(features) == 0:
+            return []
+        
+        # The first batch seen becomes the baseline; it is not folded in twice
+        is_baseline = not self.anomaly_model.is_fitted
+        if is_baseline:
+            self.anomaly_model.fit_baseline(features, feature_names)
+        
+        # Score against the fitted baseline (inference only)
+        predictions, anomaly_scores = self.anomaly_model.score(features, update=not is_baseline)
+        return self._anomaly_results(columns, predictions, anomaly_scores)
+    
+    def detect_sensor_anomalies(
+        self,
+        data: Union[List[Dict[str, Any]], np.ndarray, Mapping[str, Any]],
+        sensor_ids: Optional[Sequence[Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Detect anomalies against per-sensor baselines on a process pool
+        
+        ``data`` is a list of readings or columns as for
+        ``detect_anomalies_columnar``. Sensor IDs come from ``sensor_ids``
+        or the ``sensor_id`` column. The first batch seen fits one model per
+        sensor (see ``SensorAnomalyScorer``); later batches are scored in
+        parallel with readings shared through shared memory.
+        """
+        columns = self._records_to_columns(data) if isinstance(data, list) else self._sensor_columns(data)
+        if sensor_ids is None:
+            if "sensor_id" not in columns:
+                raise ValueError("Per-sensor scoring needs a sensor_id column or sensor_ids")
+            sensor_ids = columns["sensor_id"]
+        
+        columns = self._with_rolling_features(columns)
+        scorer = self.sensor_scorer
+        feature_names, features = self._feature_matrix(columns, scorer.feature_names, scorer.fill_values)
+        if len(feature_names) == 0 or len(features) == 0:
+            return []
+        if not scorer.is_fitted:
+            scorer.fit(sensor_ids, features, feature_names)
+        
+        predictions, anomaly_scores = scorer.score(sensor_ids, features)
+        return self._anomaly_results(columns, predictions, anomaly_scores)
+    
+    def _anomaly_results(
+        self,
+        columns: Dict[str, np.ndarray],
+        predictions: np.ndarray,
+        anomaly_scores: np.ndarray
+    ) -> List[Dict[str, Any]]:
+        """
+        Build result dicts for the rows flagged as anomalies
+        """
+        flagged = np.flatnonzero(predictions == -1)
+        if len(flagged) == 0:
+            return []
+        
+        scores = anomaly_scores[flagged]
+        severities = np.where(scores < -0.5, "high", "medium").tolist()
+        names = list(columns)
+        rows = zip(*[_column_values(columns[name], flagged) for name in names])
+        timestamps = _column_values(columns["timestamp"], flagged) if "timestamp" in columns else [None] * len(flagged)
+        
+        return [
+            {
+                "data_id": str(uuid.uuid4()),
+                "timestamp": timestamp,
+                "anomaly_score": score,
+                "severity": severity,
+                "features": dict(zip(names, row))
+            }
+            for timestamp, score, severity, row in zip(timestamps, scores.tolist(), severities, rows)
+        ]
+    
+    def analyze_social_media(self, posts: List[Dict[str, Any]], collapse_duplicates: bool = True) -> List[Dict[str, Any]]:
         """
         Analyze social media posts for threat indicators
+        
+        With ``collapse_duplicates`` near-identical posts are grouped first,
+        and only one post of each group is embedded and reported: the member
+        with the highest keyword score, so a copy that adds a threat keyword
+        is never hidden behind a harmless one. It carries
+        ``duplicate_count`` (the group size) and the IDs of the collapsed
+        copies.
         """
         try:
-            # Extract text content
-            texts = [post.get("content", "") for post in posts]
-            if not texts:
+            if not posts:
                 return []
             
-            # Process texts with BERT
-            embeddings = np.array([self.process_text(text) for text in texts])
+            # Score threat keywords in a single pass per post; every post is
+            # matched, since near-duplicates can differ in exactly the threat word
+            all_texts = [post.get("content", "") for post in posts]
+            all_hits = [self.keyword_matcher.find_all(text) for text in all_texts]
             
-            # Cluster similar posts
-            if len(embeddings) > 5:  # Only cluster if we have enough data
-                clusters = self.kmeans.fit_predict(embeddings)
+            # Collapse near-duplicate posts onto their worst member each
+            if collapse_duplicates:
+                scores = [sum({hit.keyword: hit.weight for hit in hits}.values()) for hits in all_hits]
+                groups = self.near_duplicates.clusters(all_texts, scores=scores)
             else:
-                clusters = [0] * len(embeddings)
+                groups = {i: [i] for i in range(len(posts))}
+            members = list(groups.values())
+            representatives = [posts[i] for i in groups]
             
-            # Analyze sentiment (simplified)
-            threat_keywords = ["attack", "bomb", "threat", "danger", "emergency", "violence"]
-            threat_scores = []
+            # Extract text content
+            texts = [all_texts[i] for i in groups]
             
-            for text in texts:
-                score = sum(1 for keyword in threat_keywords if keyword in text.lower())
-                threat_scores.append(score)
+            if self.cascade is not None:
+                return self._cascade_results(posts, representatives, members, texts)
+            
+            # Process texts with BERT in length-bucketed batches
+            embeddings = self.embed_texts(texts)
+            
+            # Cluster similar posts
+            clusters = self._cluster_embeddings(embeddings)
+            
+            keyword_hits = [all_hits[i] for i in groups]
             
             # Create results
             results = []
-            for i, (post, cluster, score) in enumerate(zip(posts, clusters, threat_scores)):
+            for post, cluster, hits, group in zip(representatives, clusters, keyword_hits, members):
+                matched = {hit.keyword: hit.weight for hit in hits}
+                score = sum(matched.values())
                 if score > 0:  # Potential threat detected
-                    results.append({
-                        "post_id": post.get("post_id", str(uuid.uuid4())),
-                        "platform": post.get("platform", "unknown"),
-                        "content": post.get("content", ""),
-                        "threat_score": score,
-                        "cluster": int(cluster),
-                        "timestamp": post.get("timestamp", None),
-                        "location": post.get("location", None),
-                        "severity": "high" if score > 2 else "medium"
-                    })
+                    results.append(self._social_result(posts, post, group, matched, int(cluster)))
             
             return results
         except Exception as e:
             logger.error(f"Error analyzing social media: {str(e)}")
             return []
     
-    def detect_patterns(self, threat_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _cluster_embeddings(self, embeddings: np.ndarray) -> List[int]:
+        """
+        Cluster post embeddings, or put every post in cluster 0 when there are few
+        """
+        if len(embeddings) > 5:  # Only cluster if we have enough data
+            if self.embedding_compressor is not None and self.embedding_compressor.is_fitted:
+                embeddings = self.embedding_compressor.decode(self.embedding_compressor.encode(embeddings))
+            return self.kmeans.fit_predict(embeddings).tolist()
+        return [0] * len(embeddings)
+    
+    def _social_result(
+        self,
+        posts: List[Dict[str, Any]],
+        post: Dict[str, Any],
+        group: List[int],
+        matched: Dict[str, float],
+        cluster: int
+    ) -> Dict[str, Any]:
+        score = sum(matched.values())
+        return {
+            "post_id": post.get("post_id", str(uuid.uuid4())),
+            "platform": post.get("platform", "unknown"),
+            "content": post.get("content", ""),
+            "threat_score": score,
+            "matched_keywords": sorted(matched),
+            "cluster": cluster,
+            "timestamp": post.get("timestamp", None),
+            "location": post.get("location", None),
+            "severity": "high" if score > 2 else "medium",
+            "duplicate_count": len(group),
+            "duplicate_post_ids": [
+                posts[j]["post_id"] for j in group[1:] if posts[j].get("post_id")
+            ]
+        }
+    
+    def _cascade_results(
+        self,
+        posts: List[Dict[str, Any]],
+        representatives: List[Dict[str, Any]],
+        members: List[List[int]],
+        texts: List[str]
+    ) -> List[Dict[str, Any]]:
+        """
+        Classify posts through the cascade, embedding only uncertain ones
+        
+        Posts settled by the screen are not embedded and get cluster -1.
+        """
+        screening = self.cascade.screen(texts)
+        decisions = screening.decisions.copy()
+        clusters = np.full(len(texts), -1, dtype=np.int64)
+        uncertain = np.flatnonzero(screening.decisions == UNCERTAIN)
+        if len(uncertain):
+            decisions[uncertain], embeddings = self.cascade.run_encoder_stage(
+                [texts[i] for i in uncertain], screening.keyword_scores[uncertain], self.embed_texts
+            )
+            clusters[uncertain] = self._cluster_embeddings(embeddings)
+        
+        results = []
+        for i in np.flatnonzero(decisions == POSITIVE).tolist():
+            matched = {hit.keyword: hit.weight for hit in screening.keyword_hits[i]}
+            result = self._social_result(posts, representatives[i], members[i], matched, int(clusters[i]))
+            probability = screening.probabilities[i]
+            result["threat_probability"] = None if np.isnan(probability) else float(probability)
+            result["cascade_stage"] = "encoder" if screening.decisions[i] == UNCERTAIN else "screen"
+            results.append(result)
+        return results
+    
+    def fit_cascade(self, posts: List[Dict[str, Any]], labels: Sequence[int], embed: bool = True) -> Dict[str, Any]:
+        """
+        Train the cascade on labelled posts (1 threat, 0 harmless)
+        
+        With ``embed`` the posts are also embedded to train the encoder
+        stage; otherwise uncertain posts fall back to keyword matching.
+        """
+        if self.cascade is None:
+            self.cascade = ThreatCascade(keyword_matcher=self.keyword_matcher)
+        texts = [post.get("content", "") for post in posts]
+        embeddings = self.embed_texts(texts) if embed else None
+        self.cascade.fit(texts, labels, embeddings=embeddings)
+        return self.cascade.stats()
+    
+    def fit_embedding_compressor(
+        self,
+        texts: List[str],
+        dim: int = 128,
+        storage: str = "float16"
+    ) -> EmbeddingCompressor:
+        """
+        Embed sample texts and fit the compact embedding representation
+        
+        ``storage`` is "float16" or "pq" (product-quantized codes). The
+        fitted compressor is used for clustering from then on.
+        """
+        compressor = EmbeddingCompressor(dim=dim, storage=storage)
+        self.embedding_compressor = compressor.fit(self.embed_texts(texts))
+        return compressor
+    
+    def detect_patterns(self, threat_data: List[Dict[str, Any]], incremental: bool = False) -> List[Dict[str, Any]]:
         """
         Detect patterns in threat data
+        
+        By default the vectorizer and clustering are refit on ``threat_data``.
+        With ``incremental=True`` only the new threats are folded into the
+        persistent pattern miner, and patterns keep stable IDs across calls.
         """
         try:
+            if incremental:
+                return self.pattern_miner.update(threat_data)
+            
             # Extract text descriptions
-            texts = [data.get("description", "") + " " + data.get("title", "") for data in threat_data]
+            texts = threat_texts(threat_data)
             if not texts:
                 return []
             
             # Vectorize texts
             tfidf_matrix = self.tfidf.fit_transform(texts)
             
-            # Cluster similar threats
-            clusters = self.kmeans.fit_predict(tfidf_matrix.toarray())
+            # Cluster similar threats directly on the sparse CSR matrix
+            clusters = self.kmeans.fit_predict(tfidf_matrix)
+            
+            # Mean TF-IDF per cluster via one sparse group-by-cluster reduction
+            n_clusters = self.kmeans.n_clusters
+            membership = csr_matrix(
+                (np.ones(len(clusters)), (clusters, np.arange(len(clusters)))),
+                shape=(n_clusters, len(clusters))
+            )
+            cluster_sizes = np.bincount(clusters, minlength=n_clusters)
+            cluster_sums = (membership @ tfidf_matrix).toarray()
+            feature_names = self.tfidf.get_feature_names_out()
             
             # Identify common patterns
             patterns = []
-            for cluster_id in range(self.kmeans.n_clusters):
-                cluster_indices = np.where(clusters == cluster_id)[0]
-                if len(cluster_indices) > 1:  # Only consider clusters with multiple items
-                    # Get common terms for this cluster
-                    cluster_texts = [texts[i] for i in cluster_indices]
-                    cluster_tfidf = self.tfidf.transform(cluster_texts)
-                    feature_names = self.tfidf.get_feature_names_out()
-                    
+            for cluster_id in range(n_clusters):
+                cluster_size = int(cluster_sizes[cluster_id])
+                if cluster_size > 1:  # Only consider clusters with multiple items
                     # Get top terms for this cluster
-                    mean_tfidf = cluster_tfidf.mean(axis=0).A1
+                    mean_tfidf = cluster_sums[cluster_id] / cluster_size
                     top_terms_idx = mean_tfidf.argsort()[-5:][::-1]
                     top_terms = [feature_names[idx] for idx in top_terms_idx if mean_tfidf[idx] > 0]
                     
                     patterns.append({
                         "pattern_id": str(uuid.uuid4()),
                         "cluster_id": int(cluster_id),
-                        "count": len(cluster_indices),
+                        "count": cluster_size,
                         "common_terms": top_terms,
-                        "severity": "high" if len(cluster_indices) > 5 else "medium"
+                        "severity": "high" if cluster_size > 5 else "medium"
                     })
             
             return patterns
@@ -186,23 +748,28 @@ class ThreatDetector:
     def generate_threat_report(self, analysis_results: Dict[str, Any]) -> Dict[str, Any]:
         """
         Generate a comprehensive threat report
+        
+        Builds the whole report in memory; use ``write_threat_report`` for
+        large analysis results.
         """
         try:
+            threats = analysis_results.get("threats", [])
+            summary = {
+                "total_threats": len(threats),
+                "high_severity_count": sum(1 for t in threats if t.get("severity") == "high"),
+                "anomalies_detected": len(analysis_results.get("anomalies", [])),
+                "social_threats": len(analysis_results.get("social_media_threats", [])),
+                "patterns_identified": len(analysis_results.get("patterns", []))
+            }
             report = {
                 "report_id": str(uuid.uuid4()),
                 "generated_at": pd.Timestamp.now().isoformat(),
-                "summary": {
-                    "total_threats": len(analysis_results.get("threats", [])),
-                    "high_severity_count": len([t for t in analysis_results.get("threats", []) if t.get("severity") == "high"]),
-                    "anomalies_detected": len(analysis_results.get("anomalies", [])),
-                    "social_threats": len(analysis_results.get("social_media_threats", [])),
-                    "patterns_identified": len(analysis_results.get("patterns", []))
-                },
-                "threats": analysis_results.get("threats", []),
+                "summary": summary,
+                "threats": threats,
                 "anomalies": analysis_results.get("anomalies", []),
                 "social_media_threats": analysis_results.get("social_media_threats", []),
                 "patterns": analysis_results.get("patterns", []),
-                "recommendations": self._generate_recommendations(analysis_results)
+                "recommendations": report_recommendations(summary)
             }
             
             return report
@@ -210,37 +777,21 @@ class ThreatDetector:
             logger.error(f"Error generating threat report: {str(e)}")
             return {"error": str(e)}
     
-    def _generate_recommendations(self, analysis_results: Dict[str, Any]) -> List[str]:
-        """
-        Generate recommendations based on analysis results
+    def stream_threat_report(self, analysis_results: Dict[str, Iterable[Dict[str, Any]]]) -> StreamingThreatReport:
         """
-        recommendations = []
+        Stream a threat report as JSON chunks with bounded memory
         
-        # Check for high severity threats
-        high_threats = [t for t in analysis_results.get("threats", []) if t.get("severity") == "high"]
-        if len(high_threats) > 0:
-            recommendations.append(f"Investigate {len(high_threats)} high severity threats immediately")
-        
-        # Check for anomalies
-        anomalies = analysis_results.get("anomalies", [])
-        if len(anomalies) > 5:
-            recommendations.append(f"Review {len(anomalies)} detected anomalies for potential security issues")
-        
-        # Check for social media threats
-        social_threats = analysis_results.get("social_media_threats", [])
-        if len(social_threats) > 10:
-            recommendations.append(f"Monitor social media activity closely - {len(social_threats)} potential threats detected")
-        
-        # Check for patterns
-        patterns = analysis_results.get("patterns", [])
-        if len(patterns) > 0:
-            recommendations.append(f"Investigate {len(patterns)} identified threat patterns for coordinated activities")
-        
-        # General recommendation
-        if len(recommendations) == 0:
-            recommendations.append("Continue monitoring for potential threats")
-        
-        return recommendations
+        Sections may be generators; each is read once. Iterate the returned
+        report for text chunks (e.g. a streaming HTTP response body). Its
+        ``summary`` is complete once iteration finishes.
+        """
+        return StreamingThreatReport(analysis_results)
+    
+    def write_threat_report(self, analysis_results: Dict[str, Iterable[Dict[str, Any]]], output: IO[str]) -> Dict[str, int]:
+        """
+        Write a threat report as JSON to a text stream and return its summary
+        """
+        return self.stream_threat_report(analysis_results).write_to(output)
 
 # Example usage
 if __name__ == "__main__":
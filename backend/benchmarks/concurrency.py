@@ -0,0 +1,141 @@
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List
+
+from sqlalchemy import event, select, text
+
+from backend.database import AsyncSessionLocal, Base, SessionLocal, async_engine, engine
+from backend.models.threat import Threat
+from backend.models.user import Agency, User
+
+# Title prefix of the rows each run writes, so they can be removed afterwards
+BENCHMARK_TITLE = "concurrency-benchmark"
+
+
+def _add_sqlite_sleep(sync_engine) -> None:
+    """
+    Give SQLite a ``pg_sleep(seconds)`` function so both databases run the same SQL
+
+    On aiosqlite the function runs in the driver's worker thread, like a
+    server-side wait, so it does not hold the event loop; on pysqlite it
+    runs in the calling thread.
+    """
+    @event.listens_for(sync_engine, "connect")
+    def register(dbapi_connection, connection_record):
+        dbapi_connection.create_function("pg_sleep", 1, time.sleep)
+
+
+def _threat(index: int) -> Threat:
+    return Threat(
+        threat_id=uuid.uuid4(),
+        threat_title=f"{BENCHMARK_TITLE} {index}",
+        threat_type="benchmark",
+        threat_source="benchmark",
+        created_at=datetime.utcnow()
+    )
+
+
+async def sync_request(index: int, latency: float) -> None:
+    """
+    The previous route body: a blocking Session inside an async handler
+    """
+    db = SessionLocal()
+    try:
+        db.execute(select(text("pg_sleep(:seconds)")), {"seconds": latency})
+        db.add(_threat(index))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def async_request(index: int, latency: float) -> None:
+    """
+    The same work on a pooled AsyncSession
+    """
+    async with AsyncSessionLocal() as db:
+        await db.execute(select(text("pg_sleep(:seconds)")), {"seconds": latency})
+        db.add(_threat(index))
+        await db.commit()
+
+
+async def run_concurrent(
+    request: Callable[[int, float], Awaitable[None]],
+    requests: int,
+    concurrency: int,
+    latency: float
+) -> Dict[str, Any]:
+    """
+    Run ``requests`` requests with at most ``concurrency`` in flight, as a server would
+    """
+    limit = asyncio.Semaphore(concurrency)
+    durations: List[float] = []
+    errors: List[str] = []
+
+    async def timed(index: int) -> None:
+        async with limit:
+            start = time.perf_counter()
+            try:
+                await request(index, latency)
+                durations.append(time.perf_counter() - start)
+            except Exception as e:
+                errors.append(str(e))
+
+    start = time.perf_counter()
+    await asyncio.gather(*[timed(index) for index in range(requests)])
+    seconds = time.perf_counter() - start
+    durations.sort()
+    return {
+        "requests_per_second": len(durations) / seconds,
+        "seconds": seconds,
+        "p50_ms": 1000 * statistics.median(durations) if durations else None,
+        "p95_ms": 1000 * durations[int(0.95 * (len(durations) - 1))] if durations else None,
+        "errors": len(errors)
+    }
+
+
+async def measure(requests: int, concurrency: int, latency_ms: float) -> Dict[str, Any]:
+    latency = latency_ms / 1000.0
+    try:
+        # Warm both pools so connection setup is not timed
+        await sync_request(-1, 0.0)
+        await async_request(-1, 0.0)
+        before = await run_concurrent(sync_request, requests, concurrency, latency)
+        after = await run_concurrent(async_request, requests, concurrency, latency)
+    finally:
+        db = SessionLocal()
+        db.query(Threat).filter(Threat.threat_title.like(f"{BENCHMARK_TITLE}%")).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+        await async_engine.dispose()
+
+    return {
+        "dialect": async_engine.dialect.name,
+        "driver": async_engine.dialect.driver,
+        "requests": requests,
+        "concurrency": concurrency,
+        "latency_ms": latency_ms,
+        "sync_session": before,
+        "async_session": after,
+        "throughput_gain": after["requests_per_second"] / before["requests_per_second"]
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare concurrent request throughput on sync and async sessions")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Database wait per request (pg_sleep)")
+    parser.add_argument("--create-tables", action="store_true", help="Create the threat tables first (empty databases)")
+    args = parser.parse_args()
+
+    if engine.dialect.name == "sqlite":
+        _add_sqlite_sleep(engine)
+        _add_sqlite_sleep(async_engine.sync_engine)
+    if args.create_tables:
+        Base.metadata.create_all(engine, tables=[Agency.__table__, User.__table__, Threat.__table__])
+    print(json.dumps(asyncio.run(measure(args.requests, args.concurrency, args.latency_ms)), indent=2))
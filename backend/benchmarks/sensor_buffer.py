@@ -0,0 +1,139 @@
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List
+
+from sqlalchemy import delete
+
+from backend.database import AsyncSessionLocal, Base, async_engine, engine
+from backend.models.sensor import Sensor, SensorData
+from backend.models.user import Agency
+from backend.services.bulk_insert import _encode_json
+from backend.services.write_buffer import SensorWriteBuffer, WriteBufferFullError
+
+
+def single_readings(count: int, sensor_ids: List[uuid.UUID]) -> List[Dict[str, Any]]:
+    """
+    One reading per request, as thousands of devices each posting would send them
+    """
+    start = datetime(2021, 1, 1)
+    return [
+        {
+            "sensor_id": sensor_ids[i % len(sensor_ids)],
+            "timestamp": start + timedelta(milliseconds=i),
+            "data": {"temperature": 25.0 + (i % 10) / 10}
+        }
+        for i in range(count)
+    ]
+
+
+async def direct_write(reading: Dict[str, Any]) -> None:
+    """
+    The previous request path: one session, one row and one commit per reading
+    """
+    async with AsyncSessionLocal() as db:
+        db.add(SensorData(
+            sensor_id=reading["sensor_id"],
+            timestamp=reading["timestamp"],
+            data=_encode_json(reading["data"]),
+            processed=False
+        ))
+        await db.commit()
+
+
+async def run_requests(
+    write: Callable[[Dict[str, Any]], Awaitable[None]],
+    readings: List[Dict[str, Any]],
+    concurrency: int
+) -> Dict[str, Any]:
+    """
+    Send every reading as its own request, with at most ``concurrency`` in flight
+    """
+    limit = asyncio.Semaphore(concurrency)
+    durations: List[float] = []
+    rejected = 0
+    errors = 0
+
+    async def request(reading: Dict[str, Any]) -> None:
+        nonlocal rejected, errors
+        async with limit:
+            start = time.perf_counter()
+            try:
+                await write(reading)
+                durations.append(time.perf_counter() - start)
+            except WriteBufferFullError:
+                rejected += 1
+            except Exception:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[request(reading) for reading in readings])
+    seconds = time.perf_counter() - start
+    durations.sort()
+    return {
+        "acknowledged": len(durations),
+        "rejected": rejected,
+        "errors": errors,
+        "readings_per_second": len(durations) / seconds,
+        "p50_ms": 1000 * statistics.median(durations) if durations else None,
+        "p95_ms": 1000 * durations[int(0.95 * (len(durations) - 1))] if durations else None
+    }
+
+
+async def measure(requests: int, concurrency: int, sensors: int, batch_size: int, max_delay_ms: float) -> Dict[str, Any]:
+    sensor_ids = [uuid.uuid4() for _ in range(sensors)]
+    async with AsyncSessionLocal() as db:
+        db.add_all([Sensor(sensor_id=sensor_id, sensor_name=f"benchmark-{i}") for i, sensor_id in enumerate(sensor_ids)])
+        await db.commit()
+
+    # The two paths write disjoint key ranges
+    readings = single_readings(2 * requests, sensor_ids)
+    buffer = SensorWriteBuffer(max_batch_size=batch_size, max_delay_ms=max_delay_ms, max_pending=10 * concurrency)
+    try:
+        before = await run_requests(direct_write, readings[:requests], concurrency)
+        before["transactions"] = before["acknowledged"]
+
+        await buffer.start()
+        after = await run_requests(buffer.submit, readings[requests:], concurrency)
+        await buffer.stop()
+        metrics = buffer.metrics()
+        after["transactions"] = metrics["flushes"] + metrics["isolated_flushes"]
+        after["mean_batch_size"] = metrics["mean_batch_size"]
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(SensorData).where(SensorData.sensor_id.in_(sensor_ids)))
+            await db.execute(delete(Sensor).where(Sensor.sensor_id.in_(sensor_ids)))
+            await db.commit()
+        await async_engine.dispose()
+
+    return {
+        "dialect": async_engine.dialect.name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "max_batch_size": batch_size,
+        "max_delay_ms": max_delay_ms,
+        "commit_per_reading": before,
+        "write_buffer": after,
+        "throughput_gain": after["readings_per_second"] / before["readings_per_second"]
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare per-reading commits with the sensor write-behind buffer")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--sensors", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--max-delay-ms", type=float, default=50)
+    parser.add_argument("--create-tables", action="store_true", help="Create the sensor tables first (empty databases)")
+    args = parser.parse_args()
+
+    if args.create_tables:
+        Base.metadata.create_all(engine, tables=[Agency.__table__, Sensor.__table__, SensorData.__table__])
+    print(json.dumps(asyncio.run(
+        measure(args.requests, args.concurrency, args.sensors, args.batch_size, args.max_delay_ms)
+    ), indent=2))
@@ -0,0 +1,101 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.database import AsyncSessionLocal, Base, async_engine, engine
+from backend.models.sensor import Sensor, SensorData
+from backend.models.user import Agency
+from backend.services.bulk_insert import async_bulk_insert_sensor_data
+
+
+def synthetic_readings(count: int, sensor_ids: List[uuid.UUID], seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Readings with unique (sensor_id, timestamp) keys, as the ingestion API receives them
+    """
+    rng = random.Random(seed)
+    start = datetime(2021, 1, 1)
+    return [
+        {
+            "sensor_id": str(sensor_ids[i % len(sensor_ids)]),
+            "timestamp": (start + timedelta(milliseconds=i)).isoformat(),
+            "data": {
+                "temperature": round(rng.gauss(25.0, 1.0), 2),
+                "humidity": round(rng.gauss(60.0, 5.0), 2),
+                "pressure": round(rng.gauss(1013.0, 2.0), 2)
+            }
+        }
+        for i in range(count)
+    ]
+
+
+async def orm_insert(db: AsyncSession, readings: List[Dict[str, Any]]) -> None:
+    """
+    The previous path: one ORM object per reading, flushed on commit
+    """
+    for reading in readings:
+        db.add(SensorData(
+            sensor_id=uuid.UUID(reading["sensor_id"]),
+            timestamp=datetime.fromisoformat(reading["timestamp"]),
+            data=json.dumps(reading.get("data", {})),
+            processed=False
+        ))
+    await db.commit()
+
+
+async def measure(readings: int, sensors: int, chunk_size: int, seed: int) -> Dict[str, Any]:
+    sensor_ids = [uuid.uuid4() for _ in range(sensors)]
+    try:
+        async with AsyncSessionLocal() as db:
+            # The previous path and the bulk path write disjoint key ranges
+            db.add_all([Sensor(sensor_id=sensor_id, sensor_name=f"benchmark-{i}") for i, sensor_id in enumerate(sensor_ids)])
+            await db.commit()
+            orm_readings = synthetic_readings(readings, sensor_ids, seed=seed)
+            bulk_readings = synthetic_readings(readings, sensor_ids[::-1], seed=seed + 1)
+
+            start = time.perf_counter()
+            await orm_insert(db, orm_readings)
+            orm_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            result = await async_bulk_insert_sensor_data(db, bulk_readings, chunk_size=chunk_size)
+            bulk_seconds = time.perf_counter() - start
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(SensorData).where(SensorData.sensor_id.in_(sensor_ids)))
+            await db.execute(delete(Sensor).where(Sensor.sensor_id.in_(sensor_ids)))
+            await db.commit()
+        await async_engine.dispose()
+
+    return {
+        "dialect": async_engine.dialect.name,
+        "driver": async_engine.dialect.driver,
+        "readings": readings,
+        "chunk_size": chunk_size,
+        "method": result["method"],
+        "orm_rows_per_second": readings / orm_seconds,
+        "bulk_rows_per_second": result["inserted"] / bulk_seconds,
+        "speedup": orm_seconds / bulk_seconds,
+        "failed_chunks": sum(1 for chunk in result["chunks"] if chunk["status"] != "success")
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare ORM and bulk sensor data inserts on DATABASE_URL")
+    parser.add_argument("--readings", type=int, default=50000)
+    parser.add_argument("--sensors", type=int, default=100)
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--create-tables", action="store_true", help="Create the sensor tables first (empty databases)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.create_tables:
+        Base.metadata.create_all(engine, tables=[Agency.__table__, Sensor.__table__, SensorData.__table__])
+    print(json.dumps(asyncio.run(measure(args.readings, args.sensors, args.chunk_size, args.seed)), indent=2))
@@ -0,0 +1,17 @@
+from datetime import datetime, timezone
+from typing import Any
+
+
+def parse_timestamp(value: Any) -> datetime:
+    """
+    Parse a timestamp (datetime or ISO 8601 string); naive timestamps are taken to be UTC
+
+    Async drivers (asyncpg, aiosqlite) only accept datetime objects for
+    DateTime columns, and fixing the zone here means every write path
+    stores the same instant, whatever the database session's TimeZone is.
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if not isinstance(value, datetime):
+        raise ValueError(f"Invalid timestamp: {value!r}")
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
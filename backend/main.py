@@ -1,9 +1,19 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+import os
 import uvicorn
 
 # Import routers
 from backend.routers import users, threats, incidents, sensors, communication, analytics, data_ingestion
+from backend.services.inference import inference_service
+from backend.services.similarity import close_similarity_service
+from backend.services.write_buffer import sensor_write_buffer
+
+# Run the micro-batching ThreatDetector workers alongside the API
+INFERENCE_ENABLED = os.getenv("AI_INFERENCE_ENABLED", "true").lower() == "true"
+
+# Batch single sensor readings from POST /data/sensors/data through the write-behind buffer
+SENSOR_WRITE_BUFFER_ENABLED = os.getenv("SENSOR_WRITE_BUFFER_ENABLED", "true").lower() == "true"
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -30,6 +40,30 @@ app.include_router(communication.router, prefix="/api/v1/communication", tags=["
 app.include_router(analytics.router, prefix="/api/v1/analytics", tags=["analytics"])
 app.include_router(data_ingestion.router, prefix="/api/v1/data", tags=["data ingestion"])
 
+@app.on_event("startup")
+async def start_inference_service():
+    if INFERENCE_ENABLED:
+        await inference_service.start()
+
+@app.on_event("shutdown")
+async def stop_inference_service():
+    await inference_service.stop()
+
+@app.on_event("shutdown")
+async def save_threat_index():
+    # Each worker merges its unsaved similar-threat inserts into the saved index
+    await close_similarity_service()
+
+@app.on_event("startup")
+async def start_sensor_write_buffer():
+    if SENSOR_WRITE_BUFFER_ENABLED:
+        await sensor_write_buffer.start()
+
+@app.on_event("shutdown")
+async def stop_sensor_write_buffer():
+    # Writes everything still buffered before the process exits
+    await sensor_write_buffer.stop()
+
 # Health check endpoint
 @app.get("/")
 async def root():
@@ -39,5 +73,13 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics/inference")
+async def inference_metrics():
+    return inference_service.metrics()
+
+@app.get("/metrics/ingestion")
+async def ingestion_metrics():
+    return sensor_write_buffer.metrics()
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -1,13 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 import json
-from backend.database import get_db
+from backend.database import get_async_db
 from backend.models.threat import Threat
 from backend.models.sensor import SensorData
 from backend.schemas.threat import ThreatCreate
 from backend.schemas.sensor import SensorDataCreate
 from backend.core.security import get_current_active_user
+from backend.services.similarity import index_new_threat, threat_text
+from backend.services.write_buffer import WriteBufferFullError, WriteBufferUnavailableError, sensor_write_buffer
 import uuid
 
 router = APIRouter(prefix="/data", tags=["data ingestion"])
@@ -15,7 +17,8 @@ router = APIRouter(prefix="/data", tags=["data ingestion"])
 @router.post("/threats")
 async def submit_threat_report(
     threat_data: ThreatCreate,
-    db: Session = Depends(get_db),
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_active_user)
 ):
     """
@@ -36,22 +39,44 @@ async def submit_threat_report(
             agency_id=current_user.agency_id
         )
         db.add(threat)
-        db.commit()
-        db.refresh(threat)
+        await db.commit()
+        background_tasks.add_task(index_new_threat, str(threat.threat_id), threat_text(threat))
         return {"message": "Threat report submitted successfully", "threat_id": threat.threat_id}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error submitting threat report: {str(e)}")
 
 @router.post("/sensors/data")
 async def submit_sensor_data(
     sensor_data: SensorDataCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_active_user)
 ):
     """
     Submit sensor data from IoT devices
+    
+    While the write-behind buffer is running, the reading is batched with
+    other requests and the response is sent once its batch is committed.
+    A full buffer answers 429 and a stopping buffer 503; clients should
+    retry after the Retry-After delay.
     """
+    if sensor_write_buffer.running:
+        try:
+            await sensor_write_buffer.submit({
+                "sensor_id": sensor_data.sensor_id,
+                "timestamp": sensor_data.timestamp,
+                "data": sensor_data.data
+            })
+        except WriteBufferFullError as e:
+            raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+        except WriteBufferUnavailableError as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid sensor data: {str(e)}")
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error submitting sensor data: {str(e)}")
+        return {"message": "Sensor data submitted successfully"}
+    
     try:
         # Create sensor data record
         data = SensorData(
@@ -61,16 +86,16 @@ async def submit_sensor_data(
             processed=False
         )
         db.add(data)
-        db.commit()
+        await db.commit()
         return {"message": "Sensor data submitted successfully"}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error submitting sensor data: {str(e)}")
 
 @router.post("/intel/reports")
 async def submit_intel_report(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_active_user)
 ):
     """
@@ -88,7 +113,7 @@ async def submit_intel_report(
 @router.post("/emergency/calls")
 async def submit_emergency_call(
     call_data: dict,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_active_user)
 ):
     """
@@ -104,7 +129,7 @@ async def submit_emergency_call(
 @router.post("/social/feed")
 async def submit_social_media_data(
     social_data: dict,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_active_user)
 ):
     """
@@ -120,7 +145,7 @@ async def submit_social_media_data(
 @router.post("/satellite/imagery")
 async def submit_satellite_data(
     satellite_data: dict,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(get_current_active_user)
 ):
     """
@@ -1,17 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
+import asyncio
+import logging
 import uuid
 
 from backend import schemas, models
-from backend.database import get_db
+from backend.database import get_async_db, get_db
 from backend.routers.users import get_current_user
+from backend.services.similarity import get_similarity_service, index_new_threat, threat_text
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/v1/threats", tags=["threats"])
 
 @router.post("/", response_model=schemas.ThreatResponse)
 def create_threat(
     threat: schemas.ThreatCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
@@ -33,6 +41,10 @@ def create_threat(
     db.commit()
     db.refresh(db_threat)
     
+    # Index the new threat for similar-threat lookups after the response is
+    # sent; embedding and index training stay off the request path
+    background_tasks.add_task(index_new_threat, str(db_threat.threat_id), threat_text(db_threat))
+    
     return db_threat
 
 @router.get("/{threat_id}", response_model=schemas.ThreatResponse)
@@ -58,6 +70,47 @@ def read_threat(
     
     return db_threat
 
+@router.get("/{threat_id}/similar", response_model=List[schemas.SimilarThreatResponse])
+async def read_similar_threats(
+    threat_id: uuid.UUID,
+    k: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """Get the past threats most similar to a threat."""
+    db_threat = await db.scalar(select(models.Threat).where(models.Threat.threat_id == threat_id))
+    if not db_threat:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Threat not found"
+        )
+    
+    # Check if user has permission to access this threat
+    if current_user.agency_id != db_threat.agency_id and current_user.security_clearance_level < 3:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions to access this threat"
+        )
+    
+    # Over-fetch so results the user may not see can be dropped
+    service = await asyncio.get_running_loop().run_in_executor(None, get_similarity_service)
+    neighbours = await service.similar(db_threat, k=3 * k)
+    if not neighbours:
+        return []
+    
+    query = select(models.Threat).where(
+        models.Threat.threat_id.in_([uuid.UUID(neighbour_id) for neighbour_id, _ in neighbours])
+    )
+    if current_user.security_clearance_level < 3:
+        query = query.where(models.Threat.agency_id == current_user.agency_id)
+    threats_by_id = {str(threat.threat_id): threat for threat in (await db.scalars(query)).all()}
+    
+    return [
+        {"threat": threats_by_id[neighbour_id], "similarity": similarity}
+        for neighbour_id, similarity in neighbours
+        if neighbour_id in threats_by_id
+    ][:k]
+
 @router.get("/", response_model=List[schemas.ThreatResponse])
 def read_threats(
     skip: int = 0,
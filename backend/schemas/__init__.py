@@ -5,7 +5,7 @@ from .user import (
     Token, TokenData
 )
 from .threat import (
-    ThreatBase, ThreatCreate, ThreatUpdate, ThreatInDB, ThreatResponse,
+    ThreatBase, ThreatCreate, ThreatUpdate, ThreatInDB, ThreatResponse, SimilarThreatResponse,
     IncidentBase, IncidentCreate, IncidentUpdate, IncidentInDB, IncidentResponse,
     IncidentThreatBase, IncidentThreatCreate, IncidentThreatInDB, IncidentThreatResponse
 )
@@ -33,7 +33,7 @@ __all__ = [
     "Token", "TokenData",
     
     # Threat schemas
-    "ThreatBase", "ThreatCreate", "ThreatUpdate", "ThreatInDB", "ThreatResponse",
+    "ThreatBase", "ThreatCreate", "ThreatUpdate", "ThreatInDB", "ThreatResponse", "SimilarThreatResponse",
     "IncidentBase", "IncidentCreate", "IncidentUpdate", "IncidentInDB", "IncidentResponse",
     "IncidentThreatBase", "IncidentThreatCreate", "IncidentThreatInDB", "IncidentThreatResponse",
     
@@ -34,6 +34,10 @@ class ThreatInDB(ThreatBase):
 class ThreatResponse(ThreatInDB):
     pass
 
+class SimilarThreatResponse(BaseModel):
+    threat: ThreatResponse
+    similarity: float
+
 class IncidentBase(BaseModel):
     incident_title: str = Field(..., min_length=1, max_length=200)
     incident_description: Optional[str] = None
@@ -0,0 +1,151 @@
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.core.timestamps import parse_timestamp
+from backend.models.sensor import SensorData
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Readings written per COPY or executemany call (and per savepoint)
+SENSOR_BULK_CHUNK_SIZE = int(os.getenv("SENSOR_BULK_CHUNK_SIZE", 10000))
+
+# sensor_data columns in the order rows are written
+SENSOR_DATA_COLUMNS = ("sensor_id", "timestamp", "data", "processed")
+
+# Shared encoder for reading payloads
+_encode_json = json.JSONEncoder().encode
+
+
+def _parse_sensor_id(value: Any) -> uuid.UUID:
+    if value is None:
+        raise ValueError("Missing sensor_id")
+    return value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+
+
+def sensor_row(
+    reading: Dict[str, Any],
+    sensor_ids: Optional[Dict[Any, uuid.UUID]] = None
+) -> Tuple[uuid.UUID, datetime, str, bool]:
+    """
+    Validate one reading and convert it to a sensor_data row tuple (UTC-aware timestamp)
+
+    ``sensor_ids`` caches parsed sensor IDs across readings.
+    """
+    raw_id = reading.get("sensor_id")
+    sensor_id = sensor_ids.get(raw_id) if sensor_ids is not None else None
+    if sensor_id is None:
+        sensor_id = _parse_sensor_id(raw_id)
+        if sensor_ids is not None:
+            sensor_ids[raw_id] = sensor_id
+    return (
+        sensor_id,
+        parse_timestamp(reading.get("timestamp")),
+        _encode_json(reading.get("data", {})),
+        bool(reading.get("processed", False))
+    )
+
+
+def _chunks(readings: Iterable[Dict[str, Any]], chunk_size: int, errors: List[str]) -> Iterator[List[Tuple]]:
+    # Few sensors send many readings, so each sensor ID is parsed once
+    sensor_ids: Dict[Any, uuid.UUID] = {}
+    chunk: List[Tuple] = []
+    for position, reading in enumerate(readings):
+        try:
+            chunk.append(sensor_row(reading, sensor_ids))
+        except (ValueError, TypeError, AttributeError) as e:
+            errors.append(f"Reading {position}: {str(e)}")
+            continue
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _chunk_result(index: int, rows: List[Tuple], method: str, start: float, error: Optional[str] = None) -> Dict[str, Any]:
+    result = {
+        "chunk": index,
+        "rows": len(rows),
+        "method": method,
+        "status": "success" if error is None else "error",
+        "seconds": time.perf_counter() - start
+    }
+    if error is not None:
+        result["error"] = error
+    return result
+
+
+def _supports_async_copy(db: AsyncSession) -> bool:
+    dialect = db.sync_session.get_bind().dialect
+    return dialect.name == "postgresql" and dialect.driver == "asyncpg"
+
+
+async def _write_copy_async(db: AsyncSession, rows: List[Tuple[uuid.UUID, datetime, str, bool]]) -> None:
+    """
+    Send rows with asyncpg's binary COPY on the session's own connection and transaction
+    """
+    connection = await db.connection()
+    raw_connection = await connection.get_raw_connection()
+    # Binary COPY takes the row tuples as typed values; sensor_row already made timestamps UTC-aware
+    await raw_connection.driver_connection.copy_records_to_table(
+        SensorData.__tablename__, records=rows, columns=list(SENSOR_DATA_COLUMNS)
+    )
+
+
+async def _write_executemany_async(db: AsyncSession, rows: List[Tuple[uuid.UUID, datetime, str, bool]]) -> None:
+    connection = await db.connection()
+    await connection.execute(
+        SensorData.__table__.insert(),
+        [dict(zip(SENSOR_DATA_COLUMNS, row)) for row in rows]
+    )
+
+
+async def async_bulk_insert_sensor_data(
+    db: AsyncSession,
+    readings: Iterable[Dict[str, Any]],
+    chunk_size: int = SENSOR_BULK_CHUNK_SIZE
+) -> Dict[str, Any]:
+    """
+    Write sensor readings in chunks without building ORM objects
+
+    On PostgreSQL with asyncpg each chunk is written with binary ``COPY``
+    (``copy_records_to_table``); other databases get one ``executemany``
+    per chunk. Each chunk runs in its own savepoint, so a failing chunk is
+    rolled back and reported while the others are kept, and everything is
+    committed once at the end. Readings that fail validation are skipped
+    and listed in ``errors``.
+    """
+    method = "copy" if _supports_async_copy(db) else "executemany"
+    write = _write_copy_async if method == "copy" else _write_executemany_async
+    errors: List[str] = []
+    chunks: List[Dict[str, Any]] = []
+    inserted = 0
+
+    try:
+        for index, rows in enumerate(_chunks(readings, chunk_size, errors)):
+            start = time.perf_counter()
+            try:
+                async with db.begin_nested():
+                    await write(db, rows)
+                inserted += len(rows)
+                chunks.append(_chunk_result(index, rows, method, start))
+            except Exception as e:  # COPY raises driver errors, not SQLAlchemyError
+                logger.error(f"Database error writing sensor data chunk {index}: {str(e)}")
+                chunks.append(_chunk_result(index, rows, method, start, error=str(e)))
+        await db.commit()
+    except SQLAlchemyError:
+        await db.rollback()
+        raise
+
+    logger.info(f"Bulk inserted {inserted} sensor readings in {len(chunks)} chunks via {method}")
+    return {"inserted": inserted, "method": method, "chunks": chunks, "errors": errors}
@@ -1,109 +1,217 @@
 import asyncio
-import json
 import logging
-from typing import Dict, Any, List
-from datetime import datetime
+import os
+import time
+from typing import Awaitable, Callable, Dict, Any, List, Optional, Set, Tuple, Union
+from datetime import datetime, timezone
 import uuid
-from sqlalchemy.orm import Session
+from types import SimpleNamespace
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 
 # Import models
-from backend.models.threat import Threat, SensorData
-from backend.models.user import User
-from backend.database import get_db
+from backend.models.threat import Threat
+from backend.core.timestamps import parse_timestamp
+from backend.database import AsyncSessionLocal
+from backend.services.bulk_insert import async_bulk_insert_sensor_data
+from backend.services.similarity import index_new_threats, threat_text
+from ai.keyword_matcher import get_threat_matcher
+from ai.near_duplicates import NearDuplicateDetector
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Threat reports per multi-row INSERT; keeps well under PostgreSQL's 65535 bind parameters
+THREAT_INSERT_BATCH_SIZE = 1000
+
+# Streams of one batch_process_data call processed at the same time, each on its own pooled session
+INGESTION_BATCH_CONCURRENCY = int(os.getenv("INGESTION_BATCH_CONCURRENCY", 4))
+
 class DataIngestionService:
-    def __init__(self):
+    def __init__(
+        self,
+        session_factory=None,
+        batch_concurrency: int = INGESTION_BATCH_CONCURRENCY,
+        threat_indexer: Optional[Callable[[List[Tuple[str, str]]], Awaitable[None]]] = index_new_threats
+    ):
         """
         Initialize the data ingestion service
+        
+        ``session_factory`` creates the sessions batch_process_data gives
+        each stream (default: the pooled AsyncSessionLocal).
+        ``threat_indexer`` is run in the background with the
+        ``(threat_id, text)`` pairs of committed threat reports (default:
+        the similar-threat index; None disables indexing).
         """
+        self.near_duplicates = NearDuplicateDetector()
+        self.session_factory = session_factory or AsyncSessionLocal
+        self.batch_concurrency = max(1, batch_concurrency)
+        self.threat_indexer = threat_indexer
+        self._indexing_tasks: Set[asyncio.Task] = set()
         logger.info("Data ingestion service initialized")
     
-    async def process_threat_report(self, threat_data: Dict[str, Any], db: Session) -> Dict[str, Any]:
+    def _threat_values(self, threat_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Column values of a threats row for a threat report
+
+        ``created_at`` may be a datetime or an ISO 8601 string (naive values
+        are UTC); it defaults to now. Raises ValueError for an invalid one.
+        """
+        created_at = threat_data.get("created_at")
+        return {
+            "threat_id": uuid.uuid4(),
+            "threat_title": threat_data.get("threat_title", ""),
+            "threat_description": threat_data.get("threat_description", ""),
+            "threat_type": threat_data.get("threat_type", ""),
+            "threat_source": threat_data.get("threat_source", ""),
+            "severity_score": threat_data.get("severity_score", 0.0),
+            "confidence_score": threat_data.get("confidence_score", 0.0),
+            "geolocation": threat_data.get("geolocation", ""),
+            "created_at": parse_timestamp(created_at) if created_at else datetime.now(timezone.utc),
+            "agency_id": threat_data.get("agency_id")
+        }
+    
+    def _index_threats(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        Index committed threat rows in the background, keeping a reference
+        to the task until it finishes
+        """
+        if self.threat_indexer is None or not rows:
+            return
+        threats = [(str(row["threat_id"]), threat_text(SimpleNamespace(**row))) for row in rows]
+        task = asyncio.get_running_loop().create_task(self.threat_indexer(threats))
+        self._indexing_tasks.add(task)
+        task.add_done_callback(self._indexing_tasks.discard)
+    
+    def _failed_threat_reports(self, count: int, message: str) -> Dict[str, Any]:
+        return {
+            "status": "error",
+            "created_count": 0,
+            "threat_ids": [],
+            "results": [{"status": "error", "message": message} for _ in range(count)],
+            "message": message
+        }
+    
+    async def process_threat_report(self, threat_data: Dict[str, Any], db: AsyncSession) -> Dict[str, Any]:
         """
         Process a threat report and store it in the database
         """
+        result = await self.process_threat_reports([threat_data], db)
+        return result["results"][0]
+    
+    async def process_threat_reports(self, threat_reports: List[Dict[str, Any]], db: AsyncSession) -> Dict[str, Any]:
+        """
+        Store many threat reports in one transaction
+        
+        Reports are inserted with one multi-row ``INSERT`` per
+        THREAT_INSERT_BATCH_SIZE reports, each inside a savepoint. Threat
+        IDs are generated here, so nothing needs to be returned. If a statement fails, its reports are retried in their
+        own savepoints, so one bad report does not discard the others.
+        Reports with invalid values (e.g. an unparseable ``created_at``)
+        fail on their own. Everything is committed once, and the created
+        threats are then indexed for similar-threat search in the
+        background. ``results`` holds one entry per report, in input order.
+        """
+        if not threat_reports:
+            return {"status": "success", "created_count": 0, "threat_ids": [], "results": [], "message": "No threat reports"}
         try:
-            # Create threat record
-            threat = Threat(
-                threat_id=uuid.uuid4(),
-                threat_title=threat_data.get("threat_title", ""),
-                threat_description=threat_data.get("threat_description", ""),
-                threat_type=threat_data.get("threat_type", ""),
-                threat_source=threat_data.get("threat_source", ""),
-                severity_score=threat_data.get("severity_score", 0.0),
-                confidence_score=threat_data.get("confidence_score", 0.0),
-                geolocation=threat_data.get("geolocation", ""),
-                created_at=threat_data.get("created_at", datetime.utcnow()),
-                agency_id=threat_data.get("agency_id")
-            )
-            
-            db.add(threat)
-            db.commit()
-            db.refresh(threat)
+            errors: Dict[int, str] = {}
+            rows: Dict[int, Dict[str, Any]] = {}
+            for i, threat_data in enumerate(threat_reports):
+                try:
+                    rows[i] = self._threat_values(threat_data)
+                except (ValueError, TypeError) as e:
+                    errors[i] = f"Invalid threat report: {str(e)}"
+            table = Threat.__table__
             
-            logger.info(f"Threat report processed: {threat.threat_id}")
+            positions = list(rows)
+            for start in range(0, len(positions), THREAT_INSERT_BATCH_SIZE):
+                batch_positions = positions[start:start + THREAT_INSERT_BATCH_SIZE]
+                batch = [rows[i] for i in batch_positions]
+                try:
+                    async with db.begin_nested():
+                        inserted = (await db.execute(insert(table).values(batch))).rowcount
+                        # Drivers that cannot count the rows report -1
+                        if inserted >= 0 and inserted != len(batch):
+                            raise SQLAlchemyError(f"Inserted {inserted} of {len(batch)} threat reports")
+                except SQLAlchemyError as e:
+                    logger.error(f"Batched threat insert failed, isolating reports: {str(e)}")
+                    for i in batch_positions:
+                        try:
+                            async with db.begin_nested():
+                                await db.execute(insert(table).values(rows[i]))
+                        except SQLAlchemyError as row_error:
+                            errors[i] = f"Database error: {str(row_error)}"
             
-            return {
-                "status": "success",
-                "threat_id": str(threat.threat_id),
-                "message": "Threat report processed successfully"
-            }
+            await db.commit()
         except SQLAlchemyError as e:
-            db.rollback()
-            logger.error(f"Database error processing threat report: {str(e)}")
-            return {
-                "status": "error",
-                "message": f"Database error: {str(e)}"
-            }
+            await db.rollback()
+            logger.error(f"Database error processing threat reports: {str(e)}")
+            return self._failed_threat_reports(len(threat_reports), f"Database error: {str(e)}")
         except Exception as e:
-            logger.error(f"Error processing threat report: {str(e)}")
-            return {
-                "status": "error",
-                "message": f"Processing error: {str(e)}"
-            }
+            await db.rollback()
+            logger.error(f"Error processing threat reports: {str(e)}")
+            return self._failed_threat_reports(len(threat_reports), f"Processing error: {str(e)}")
+        
+        results = []
+        threat_ids = []
+        for i in range(len(threat_reports)):
+            if i in errors:
+                results.append({"status": "error", "message": errors[i]})
+            else:
+                threat_ids.append(str(rows[i]["threat_id"]))
+                results.append({
+                    "status": "success",
+                    "threat_id": str(rows[i]["threat_id"]),
+                    "message": "Threat report processed successfully"
+                })
+        
+        self._index_threats([rows[i] for i in rows if i not in errors])
+        
+        logger.info(f"Threat reports processed: {len(threat_ids)} created, {len(errors)} failed")
+        
+        return {
+            "status": "success" if not errors else ("partial" if threat_ids else "error"),
+            "created_count": len(threat_ids),
+            "threat_ids": threat_ids,
+            "results": results,
+            "message": f"Processed {len(threat_ids)} of {len(threat_reports)} threat reports"
+        }
     
-    async def process_sensor_data(self, sensor_data: List[Dict[str, Any]], db: Session) -> Dict[str, Any]:
+    async def process_sensor_data(self, sensor_data: List[Dict[str, Any]], db: AsyncSession) -> Dict[str, Any]:
         """
         Process sensor data and store it in the database
+        
+        Readings are written in bulk chunks (asyncpg binary COPY on
+        PostgreSQL, or executemany on other databases) without creating ORM
+        objects. The result lists each chunk's row count, status and time.
         """
         try:
-            processed_count = 0
-            errors = []
-            
-            for data_point in sensor_data:
-                try:
-                    # Create sensor data record
-                    sensor_record = SensorData(
-                        sensor_id=data_point.get("sensor_id"),
-                        timestamp=data_point.get("timestamp"),
-                        data=json.dumps(data_point.get("data", {})),
-                        processed=False
-                    )
-                    
-                    db.add(sensor_record)
-                    processed_count += 1
-                    
-                except Exception as e:
-                    errors.append(f"Error processing data point: {str(e)}")
-                    logger.error(f"Error processing sensor data point: {str(e)}")
-            
-            db.commit()
+            result = await async_bulk_insert_sensor_data(db, sensor_data)
+            processed_count = result["inserted"]
+            failed_chunks = [chunk for chunk in result["chunks"] if chunk["status"] != "success"]
+            errors = result["errors"] + [
+                f"Chunk {chunk['chunk']} ({chunk['rows']} readings): {chunk['error']}" for chunk in failed_chunks
+            ]
             
             logger.info(f"Processed {processed_count} sensor data points")
             
+            if not failed_chunks and not result["errors"]:
+                status = "success"
+            else:
+                status = "partial" if processed_count else "error"
+            
             return {
-                "status": "success",
+                "status": status,
                 "processed_count": processed_count,
                 "errors": errors,
+                "method": result["method"],
+                "chunks": result["chunks"],
                 "message": f"Processed {processed_count} sensor data points"
             }
         except SQLAlchemyError as e:
-            db.rollback()
             logger.error(f"Database error processing sensor data: {str(e)}")
             return {
                 "status": "error",
@@ -116,7 +224,7 @@ class DataIngestionService:
                 "message": f"Processing error: {str(e)}"
             }
     
-    async def process_social_media_data(self, social_data: List[Dict[str, Any]], db: Session) -> Dict[str, Any]:
+    async def process_social_media_data(self, social_data: List[Dict[str, Any]], db: AsyncSession) -> Dict[str, Any]:
         """
         Process social media data for threat analysis
         """
@@ -127,37 +235,54 @@ class DataIngestionService:
             # 3. Detecting threat keywords
             # 4. Creating threat reports for flagged content
             
-            threat_reports = []
+            flagged_reports = []
+            matcher = get_threat_matcher()
+            
+            # Single-pass threat keyword detection with the shared matcher, on every
+            # post: near-duplicates can differ in exactly the threat word
+            contents = [post.get("content", "") for post in social_data]
+            all_hits = [{hit.keyword: hit.weight for hit in matcher.find_all(content)} for content in contents]
+            
+            # Collapse near-duplicate posts (e.g. viral copies) onto their worst member
+            groups = self.near_duplicates.clusters(contents, scores=[sum(hits.values()) for hits in all_hits])
             
-            for post in social_data:
-                # Simple threat keyword detection
-                content = post.get("content", "").lower()
-                threat_keywords = ["attack", "bomb", "threat", "danger", "emergency", "violence"]
+            for representative, members in groups.items():
+                post = social_data[representative]
+                content = contents[representative].lower()
+                matched = set(all_hits[representative])
                 
-                if any(keyword in content for keyword in threat_keywords):
-                    # Create a threat report for this post
+                if matched:
+                    # Create one threat report per duplicate cluster
+                    description = f"Potential threat detected in social media post: {content[:100]}..."
+                    if len(members) > 1:
+                        description += f" ({len(members)} near-duplicate posts)"
                     threat_report = {
                         "threat_title": f"Social Media Threat: {post.get('platform', 'Unknown')}",
-                        "threat_description": f"Potential threat detected in social media post: {content[:100]}...",
+                        "threat_description": description,
                         "threat_type": "social_media",
                         "threat_source": post.get("platform", "social_media"),
-                        "severity_score": 7.0 if "bomb" in content or "attack" in content else 5.0,
+                        "severity_score": 7.0 if "bomb" in matched or "attack" in matched else 5.0,
                         "confidence_score": 8.0,
                         "geolocation": post.get("location", ""),
-                        "created_at": post.get("timestamp", datetime.utcnow()),
+                        "created_at": post.get("timestamp"),
                         "agency_id": post.get("agency_id")
                     }
                     
-                    result = await self.process_threat_report(threat_report, db)
-                    if result["status"] == "success":
-                        threat_reports.append(result["threat_id"])
+                    flagged_reports.append(threat_report)
+            
+            # Create every flagged report in one transaction
+            result = await self.process_threat_reports(flagged_reports, db)
+            threat_reports = result.get("threat_ids", [])
             
             logger.info(f"Processed social media data and created {len(threat_reports)} threat reports")
             
             return {
-                "status": "success",
+                "status": result["status"],
                 "threat_reports_created": len(threat_reports),
                 "threat_report_ids": threat_reports,
+                "errors": [entry["message"] for entry in result["results"] if entry["status"] == "error"],
+                "posts_received": len(social_data),
+                "duplicate_clusters": len(groups),
                 "message": f"Processed social media data and created {len(threat_reports)} threat reports"
             }
         except Exception as e:
@@ -167,32 +292,55 @@ class DataIngestionService:
                 "message": f"Processing error: {str(e)}"
             }
     
-    async def process_emergency_call_data(self, call_data: Dict[str, Any], db: Session) -> Dict[str, Any]:
+    def _emergency_threat_report(self, call_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Threat/incident report for one emergency call
+        """
+        return {
+            "threat_title": f"Emergency Call: {call_data.get('emergency_type', 'Unknown')}",
+            "threat_description": f"Emergency call received: {call_data.get('description', '')}",
+            "threat_type": "emergency_call",
+            "threat_source": "emergency_services",
+            "severity_score": 9.0,  # Emergency calls are typically high severity
+            "confidence_score": 10.0,  # High confidence as this is a real emergency call
+            "geolocation": call_data.get("location", ""),
+            "created_at": call_data.get("timestamp"),
+            "agency_id": call_data.get("agency_id")
+        }
+    
+    async def process_emergency_call_data(
+        self,
+        call_data: Union[Dict[str, Any], List[Dict[str, Any]]],
+        db: AsyncSession
+    ) -> Dict[str, Any]:
         """
         Process emergency call data
+        
+        ``call_data`` is one call or a list of calls; a list is stored with
+        one batched process_threat_reports call and reports the created
+        threat IDs and any per-call errors.
         """
         try:
-            # Create a threat/incident report from the emergency call
-            threat_report = {
-                "threat_title": f"Emergency Call: {call_data.get('emergency_type', 'Unknown')}",
-                "threat_description": f"Emergency call received: {call_data.get('description', '')}",
-                "threat_type": "emergency_call",
-                "threat_source": "emergency_services",
-                "severity_score": 9.0,  # Emergency calls are typically high severity
-                "confidence_score": 10.0,  # High confidence as this is a real emergency call
-                "geolocation": call_data.get("location", ""),
-                "created_at": call_data.get("timestamp", datetime.utcnow()),
-                "agency_id": call_data.get("agency_id")
-            }
-            
-            result = await self.process_threat_report(threat_report, db)
+            # Create a threat/incident report from each emergency call
+            calls = call_data if isinstance(call_data, list) else [call_data]
+            result = await self.process_threat_reports([self._emergency_threat_report(call) for call in calls], db)
             
-            logger.info("Emergency call data processed")
+            logger.info(f"Emergency call data processed: {result['created_count']} of {len(calls)} calls stored")
             
+            if not isinstance(call_data, list):
+                report_result = result["results"][0]
+                return {
+                    "status": report_result["status"],
+                    "threat_report_result": report_result,
+                    "message": "Emergency call data processed successfully" if report_result["status"] == "success" else report_result["message"]
+                }
             return {
-                "status": "success",
-                "threat_report_result": result,
-                "message": "Emergency call data processed successfully"
+                "status": result["status"],
+                "threat_reports_created": result["created_count"],
+                "threat_report_ids": result["threat_ids"],
+                "errors": [entry["message"] for entry in result["results"] if entry["status"] == "error"],
+                "calls_received": len(calls),
+                "message": f"Processed {len(calls)} emergency calls and created {result['created_count']} threat reports"
             }
         except Exception as e:
             logger.error(f"Error processing emergency call data: {str(e)}")
@@ -201,33 +349,93 @@ class DataIngestionService:
                 "message": f"Processing error: {str(e)}"
             }
     
-    async def batch_process_data(self, data_batches: Dict[str, Any], db: Session) -> Dict[str, Any]:
+    async def _process_threat_batch(self, threats: Any, db: AsyncSession) -> Dict[str, Any]:
+        if isinstance(threats, list):
+            return await self.process_threat_reports(threats, db)
+        return await self.process_threat_report(threats, db)
+    
+    async def _run_stream(
+        self,
+        name: str,
+        handler: Callable[[Any, AsyncSession], Awaitable[Dict[str, Any]]],
+        payload: Any,
+        limit: asyncio.Semaphore
+    ) -> Dict[str, Any]:
         """
-        Process multiple data batches in a single operation
+        Run one stream on its own session once a concurrency slot is free
         """
-        results = {}
-        
-        # Process threat reports
-        if "threats" in data_batches:
-            results["threats"] = await self.process_threat_report(data_batches["threats"], db)
+        queued = time.perf_counter()
+        async with limit:
+            start = time.perf_counter()
+            try:
+                async with self.session_factory() as db:
+                    result = await handler(payload, db)
+            except Exception as e:
+                logger.error(f"Error processing {name} stream: {str(e)}")
+                result = {"status": "error", "message": f"Processing error: {str(e)}"}
+            finished = time.perf_counter()
+        return {
+            "result": result,
+            "timing": {"seconds": finished - start, "queued_seconds": start - queued}
+        }
+    
+    async def batch_process_data(
+        self,
+        data_batches: Dict[str, Any],
+        max_concurrency: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Process multiple data batches in a single operation
         
-        # Process sensor data
-        if "sensor_data" in data_batches:
-            results["sensor_data"] = await self.process_sensor_data(data_batches["sensor_data"], db)
+        Each stream (threats, sensor_data, social_media, emergency_calls)
+        runs concurrently on its own session from the pool, at most
+        ``max_concurrency`` at a time (default: the service's
+        batch_concurrency). Every stream commits on its own, so a failed
+        stream does not roll back the others. Streams whose status is
+        ``error`` are listed in ``failed_streams`` and streams that stored
+        only part of their records in ``partial_streams``; the status is
+        ``completed`` when every stream succeeded, ``error`` when every
+        stream failed and ``partial`` otherwise. ``timings`` holds each
+        stream's processing and queueing seconds.
+        """
+        handlers = {
+            "threats": self._process_threat_batch,
+            "sensor_data": self.process_sensor_data,
+            "social_media": self.process_social_media_data,
+            "emergency_calls": self.process_emergency_call_data
+        }
+        streams = [name for name in handlers if name in data_batches]
+        limit = asyncio.Semaphore(max(1, max_concurrency or self.batch_concurrency))
         
-        # Process social media data
-        if "social_media" in data_batches:
-            results["social_media"] = await self.process_social_media_data(data_batches["social_media"], db)
+        start = time.perf_counter()
+        outcomes = await asyncio.gather(*[
+            self._run_stream(name, handlers[name], data_batches[name], limit) for name in streams
+        ])
+        seconds = time.perf_counter() - start
         
-        # Process emergency call data
-        if "emergency_calls" in data_batches:
-            results["emergency_calls"] = await self.process_emergency_call_data(data_batches["emergency_calls"], db)
+        results = {name: outcome["result"] for name, outcome in zip(streams, outcomes)}
+        timings = {name: outcome["timing"] for name, outcome in zip(streams, outcomes)}
+        failed_streams = [name for name, result in results.items() if result.get("status") == "error"]
+        partial_streams = [name for name, result in results.items() if result.get("status") == "partial"]
+        if all(result.get("status") == "success" for result in results.values()):
+            status = "completed"
+        elif streams and len(failed_streams) == len(streams):
+            status = "error"
+        else:
+            status = "partial"
         
-        logger.info("Batch data processing completed")
+        logger.info(
+            f"Batch data processing completed: {len(streams)} streams in {seconds:.3f}s, "
+            f"{len(failed_streams)} failed, {len(partial_streams)} partial"
+        )
         
         return {
-            "status": "completed",
+            "status": status,
             "results": results,
+            "failed_streams": failed_streams,
+            "partial_streams": partial_streams,
+            "timings": timings,
+            "seconds": seconds,
             "message": "Batch data processing completed"
         }
 
@@ -239,41 +447,40 @@ async def main():
     # Initialize service
     service = DataIngestionService()
     
-    # Get database session
-    db = next(get_db())
-    
-    # Example threat data
-    threat_data = {
-        "threat_title": "Network Intrusion Detected",
-        "threat_description": "Unauthorized access attempt detected on government network",
-        "threat_type": "cyber",
-        "threat_source": "network_monitoring",
-        "severity_score": 8.5,
-        "confidence_score": 9.0,
-        "geolocation": "192.168.1.100",
-        "agency_id": "00000000-0000-0000-0000-000000000001"
-    }
+    # Get async database session
+    async with AsyncSessionLocal() as db:
+        # Example threat data
+        threat_data = {
+            "threat_title": "Network Intrusion Detected",
+            "threat_description": "Unauthorized access attempt detected on government network",
+            "threat_type": "cyber",
+            "threat_source": "network_monitoring",
+            "severity_score": 8.5,
+            "confidence_score": 9.0,
+            "geolocation": "192.168.1.100",
+            "agency_id": "00000000-0000-0000-0000-000000000001"
+        }
     
-    # Process threat report
-    result = await service.process_threat_report(threat_data, db)
-    print(f"Threat processing result: {result}")
+        # Process threat report
+        result = await service.process_threat_report(threat_data, db)
+        print(f"Threat processing result: {result}")
     
-    # Example sensor data
-    sensor_data = [
-        {
-            "sensor_id": "00000000-0000-0000-0000-000000000002",
-            "timestamp": datetime.utcnow(),
-            "data": {
-                "temperature": 25.5,
-                "humidity": 60.2,
-                "pressure": 1013.25
+        # Example sensor data
+        sensor_data = [
+            {
+                "sensor_id": "00000000-0000-0000-0000-000000000002",
+                "timestamp": datetime.now(timezone.utc),
+                "data": {
+                    "temperature": 25.5,
+                    "humidity": 60.2,
+                    "pressure": 1013.25
+                }
             }
-        }
-    ]
+        ]
     
-    # Process sensor data
-    result = await service.process_sensor_data(sensor_data, db)
-    print(f"Sensor data processing result: {result}")
+        # Process sensor data
+        result = await service.process_sensor_data(sensor_data, db)
+        print(f"Sensor data processing result: {result}")
 
 if __name__ == "__main__":
     # Run example
@@ -0,0 +1,274 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Largest micro-batch sent to a worker (throughput knob)
+MAX_BATCH_SIZE = int(os.getenv("AI_BATCH_SIZE", 32))
+
+# Longest a request waits for its batch to fill (latency knob)
+MAX_WAIT_MS = float(os.getenv("AI_MAX_WAIT_MS", 10))
+
+# Number of worker processes, each holding its own ThreatDetector
+WORKERS = int(os.getenv("AI_MAX_PARALLEL", 1))
+
+# Pending requests accepted before callers are rejected
+MAX_QUEUE_SIZE = int(os.getenv("AI_MAX_QUEUE_SIZE", 10000))
+
+# Saved detector artifacts loaded (memory-mapped) by each worker, if set
+ARTIFACTS_PATH = os.getenv("AI_ARTIFACTS_PATH")
+
+# Number of recent request latencies kept for percentile metrics
+LATENCY_WINDOW = 10000
+
+# Detector owned by each worker process
+_worker_detector = None
+
+
+def _init_worker(model_name: Optional[str], quantize: bool) -> None:
+    """
+    Build and warm up the worker process's ThreatDetector
+    """
+    global _worker_detector
+    from ai.threat_detection import DEFAULT_MODEL_NAME, ThreatDetector
+
+    _worker_detector = ThreatDetector(model_name=model_name or DEFAULT_MODEL_NAME, quantize=quantize)
+    if ARTIFACTS_PATH and os.path.isdir(ARTIFACTS_PATH):
+        _worker_detector.load_artifacts(ARTIFACTS_PATH)
+    _worker_detector.warmup()
+
+
+def _embed_batch(texts: List[str]) -> np.ndarray:
+    """
+    Embed one micro-batch inside a worker process
+
+    Encoder errors propagate, so every request in the batch fails with
+    them instead of receiving a zero vector.
+    """
+    return _worker_detector.embed_texts(texts, batch_size=len(texts), raise_errors=True)
+
+
+class InferenceOverloadedError(Exception):
+    """Raised when the request queue is full."""
+
+
+class InferenceService:
+    def __init__(
+        self,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_wait_ms: float = MAX_WAIT_MS,
+        workers: int = WORKERS,
+        max_queue_size: int = MAX_QUEUE_SIZE,
+        model_name: Optional[str] = None,
+        quantize: bool = False
+    ):
+        """
+        Initialize the micro-batching inference service
+
+        Concurrent ``embed`` calls are queued and grouped into micro-batches
+        of at most ``max_batch_size`` texts. A batch waits at most
+        ``max_wait_ms`` after its first request before it is dispatched.
+        Batches run on a pool of ``workers`` processes, each holding one
+        ThreatDetector. At most one batch is in flight per worker.
+        """
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.workers = workers
+        self.max_queue_size = max_queue_size
+        self.model_name = model_name
+        self.quantize = quantize
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._batcher: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._dispatches: Set[asyncio.Task] = set()
+        self._in_flight = 0
+
+        self._requests = 0
+        self._rejected = 0
+        self._failed = 0
+        self._batches = 0
+        self._batched_items = 0
+        self._latencies: deque = deque(maxlen=LATENCY_WINDOW)
+        self._started_at = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._batcher is not None and not self._batcher.done()
+
+    async def start(self) -> None:
+        """
+        Start the worker processes and the batching loop
+        """
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._slots = asyncio.Semaphore(self.workers)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.model_name, self.quantize)
+        )
+        self._started_at = time.monotonic()
+        self._batcher = asyncio.create_task(self._batch_loop())
+        logger.info(
+            f"Inference service started: {self.workers} workers, "
+            f"batch size {self.max_batch_size}, max wait {self.max_wait * 1000:.1f} ms"
+        )
+
+    async def stop(self) -> None:
+        """
+        Stop batching, fail any queued requests and shut the workers down
+
+        Batches already dispatched to a worker are allowed to finish first.
+        """
+        if self._batcher is not None:
+            self._batcher.cancel()
+            try:
+                await self._batcher
+            except asyncio.CancelledError:
+                pass
+            self._batcher = None
+
+        while self._queue is not None and not self._queue.empty():
+            _, future, _ = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Inference service stopped"))
+
+        if self._dispatches:
+            await asyncio.gather(*self._dispatches, return_exceptions=True)
+
+        if self._executor is not None:
+            # Joining the worker processes blocks, so it runs off the event loop
+            executor, self._executor = self._executor, None
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown, True)
+        logger.info("Inference service stopped")
+
+    async def embed(self, text: str) -> np.ndarray:
+        """
+        Embed one text; resolves when its micro-batch has been processed
+        """
+        if not self.running:
+            raise RuntimeError("Inference service is not running")
+
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((text, future, time.monotonic()))
+        except asyncio.QueueFull:
+            self._rejected += 1
+            raise InferenceOverloadedError(f"Inference queue is full ({self.max_queue_size} pending)")
+        self._requests += 1
+        return await future
+
+    async def embed_many(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed several texts as independent requests and stack the results
+        """
+        if not texts:
+            from ai.threat_detection import EMBEDDING_DIM
+            return np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+        return np.stack(await asyncio.gather(*[self.embed(text) for text in texts]))
+
+    async def _collect_batch(self) -> List[Tuple[str, asyncio.Future, float]]:
+        """
+        Wait for a first request, then gather more until the batch is full
+        or the wait budget is spent
+        """
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        try:
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+        except asyncio.CancelledError:
+            # Requests already taken off the queue would otherwise never resolve
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(RuntimeError("Inference service stopped"))
+            raise
+        return batch
+
+    async def _batch_loop(self) -> None:
+        while True:
+            await self._slots.acquire()
+            try:
+                batch = await self._collect_batch()
+            except BaseException:
+                self._slots.release()
+                raise
+            # Keep a reference so the task is not garbage collected and stop can await it
+            task = asyncio.create_task(self._dispatch(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, batch: List[Tuple[str, asyncio.Future, float]]) -> None:
+        """
+        Run one micro-batch on the pool and resolve each request's future
+        """
+        self._in_flight += 1
+        try:
+            texts = [text for text, _, _ in batch]
+            loop = asyncio.get_running_loop()
+            embeddings = await loop.run_in_executor(self._executor, _embed_batch, texts)
+
+            finished = time.monotonic()
+            for (_, future, enqueued), embedding in zip(batch, embeddings):
+                if not future.done():
+                    future.set_result(embedding)
+                self._latencies.append(finished - enqueued)
+            self._batches += 1
+            self._batched_items += len(batch)
+        except Exception as e:
+            logger.error(f"Error running inference batch: {str(e)}")
+            self._failed += len(batch)
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._in_flight -= 1
+            self._slots.release()
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Report queue depth, batching efficiency, throughput and latency
+        """
+        latencies = np.array(self._latencies) * 1000
+        uptime = time.monotonic() - self._started_at if self._started_at else 0.0
+        return {
+            "running": self.running,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue_size": self.max_queue_size,
+            "in_flight_batches": self._in_flight,
+            "workers": self.workers,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "requests": self._requests,
+            "rejected": self._rejected,
+            "failed": self._failed,
+            "batches": self._batches,
+            "mean_batch_size": self._batched_items / self._batches if self._batches else 0.0,
+            "throughput_per_second": self._batched_items / uptime if uptime else 0.0,
+            "latency_p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+            "latency_p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else 0.0
+        }
+
+
+# Service shared by the API process
+inference_service = InferenceService()
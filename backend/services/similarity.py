@@ -0,0 +1,486 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from functools import partial
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from ai.ann_index import IVFIndex, METADATA_FILE
+from ai.compression import STORAGE_FORMATS, EmbeddingCompressor
+from ai.threat_detection import ThreatDetector
+from backend.database import get_db
+from backend.models.threat import Threat
+from backend.services.inference import inference_service
+
+try:
+    import fcntl
+except ImportError:  # Windows: saves still work, without cross-process locking
+    fcntl = None
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Directory holding the persisted threat embedding index
+THREAT_INDEX_PATH = os.getenv(
+    "THREAT_INDEX_PATH", os.path.join(os.getenv("AI_MODEL_PATH", "/app/models"), "threat_index")
+)
+
+# Write this process's incremental inserts to a delta file after this many
+SAVE_EVERY = int(os.getenv("THREAT_INDEX_SAVE_EVERY", 100))
+
+# Fold the delta files into the saved index once this many have accumulated
+COMPACT_EVERY = int(os.getenv("THREAT_INDEX_COMPACT_EVERY", 20))
+
+# Seconds between lookups' checks for delta files written by other workers
+REFRESH_SECONDS = float(os.getenv("THREAT_INDEX_REFRESH_SECONDS", 30))
+
+# Compressed storage applied after a backfill: "float16", "pq" or unset for float32
+INDEX_COMPRESSION = os.getenv("THREAT_INDEX_COMPRESSION")
+
+# Lock file in the index directory: shared to read the saved index and its
+# deltas, exclusive to rewrite the saved index and remove deltas
+LOCK_FILE = ".lock"
+
+# Delta files (``delta.<time_ns>-<uuid>.npz``) hold inserts not yet compacted into the saved index
+DELTA_PREFIX = "delta."
+DELTA_SUFFIX = ".npz"
+
+
+def threat_text(threat: Any) -> str:
+    """
+    Text embedded for a threat: its title followed by its description
+    """
+    return f"{threat.threat_title or ''} {threat.threat_description or ''}".strip()
+
+
+@contextmanager
+def _index_lock(index_path: str, exclusive: bool, blocking: bool = True) -> Iterator[bool]:
+    """
+    Hold the index directory's file lock; yields False when ``blocking`` is
+    off and another process holds it
+    """
+    os.makedirs(index_path, exist_ok=True)
+    with open(os.path.join(index_path, LOCK_FILE), "a") as lock_file:
+        if fcntl is not None:
+            mode = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+            try:
+                fcntl.flock(lock_file, mode if blocking else mode | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+        try:
+            yield True
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _embedded(ids: List[str], embeddings: np.ndarray) -> Tuple[List[str], np.ndarray]:
+    """
+    Drop all-zero embeddings, which the encoder returns for texts it failed on
+    """
+    embeddings = np.atleast_2d(embeddings)
+    valid = np.any(embeddings != 0, axis=1)
+    if not valid.all():
+        skipped = [item_id for item_id, ok in zip(ids, valid) if not ok]
+        logger.warning(f"Not indexing {len(skipped)} threats without an embedding: {', '.join(skipped[:10])}")
+    return [item_id for item_id, ok in zip(ids, valid) if ok], embeddings[valid]
+
+
+def _base_stamp(index_path: str) -> Optional[Tuple[int, int]]:
+    """
+    Identity of the saved index.json, which changes whenever it is rewritten
+    """
+    try:
+        stat = os.stat(os.path.join(index_path, METADATA_FILE))
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def _delta_files(index_path: str) -> List[str]:
+    """
+    Names of the delta files in ``index_path``, oldest first
+    """
+    try:
+        names = os.listdir(index_path)
+    except FileNotFoundError:
+        return []
+    return sorted(name for name in names if name.startswith(DELTA_PREFIX) and name.endswith(DELTA_SUFFIX))
+
+
+def _write_delta(index_path: str, inserts: Dict[str, np.ndarray]) -> str:
+    """
+    Write inserts to a new delta file, atomically; returns its name
+    """
+    name = f"{DELTA_PREFIX}{time.time_ns():020d}-{uuid.uuid4().hex}{DELTA_SUFFIX}"
+    tmp_path = os.path.join(index_path, f".{name}.tmp")
+    ids = list(inserts)
+    with open(tmp_path, "wb") as delta_file:
+        np.savez(delta_file, ids=np.array(ids), vectors=np.stack([inserts[item_id] for item_id in ids]))
+        delta_file.flush()
+        os.fsync(delta_file.fileno())
+    os.replace(tmp_path, os.path.join(index_path, name))
+    return name
+
+
+def _apply_delta(index: IVFIndex, index_path: str, name: str) -> None:
+    with np.load(os.path.join(index_path, name), allow_pickle=False) as delta:
+        ids = [str(item_id) for item_id in delta["ids"]]
+        vectors = delta["vectors"]
+    if ids:
+        index.add(ids, vectors)
+
+
+def _load_index(index_path: str) -> Tuple[IVFIndex, Optional[Tuple[int, int]], Set[str]]:
+    """
+    The saved index with every delta file applied, its stamp and the applied
+    deltas; callers hold the shared file lock
+    """
+    stamp = _base_stamp(index_path)
+    index = IVFIndex.load(index_path) if stamp is not None else IVFIndex()
+    deltas = _delta_files(index_path)
+    for name in deltas:
+        _apply_delta(index, index_path, name)
+    return index, stamp, set(deltas)
+
+
+class ThreatSimilarityService:
+    def __init__(self, index_path: str = THREAT_INDEX_PATH, detector: Optional[ThreatDetector] = None):
+        """
+        Initialize the similar-threat lookup service
+
+        Threat embeddings are kept in an IVF index loaded from ``index_path``.
+        In the API, texts are embedded on the shared inference service
+        workers; the local ``ThreatDetector`` is used when that service is
+        not running (for example in the backfill job). Threats whose text
+        could not be embedded are skipped.
+
+        Each API worker process holds its own copy of the index. Every
+        ``SAVE_EVERY`` inserts a worker appends them to a small delta file,
+        and it applies other workers' delta files on each save and at most
+        every ``REFRESH_SECONDS`` during lookups. Once ``COMPACT_EVERY``
+        deltas have accumulated, one worker folds them into the saved index
+        in a background thread. With ``THREAT_INDEX_COMPRESSION`` set, a
+        backfill converts the index to compressed storage; a compressed
+        index on disk keeps its compressor.
+        """
+        self.index_path = index_path
+        self.detector = detector or ThreatDetector()
+        with _index_lock(index_path, exclusive=False):
+            self.index, self._base, self._applied = _load_index(index_path)
+        if len(self.index):
+            logger.info(f"Loaded threat index with {len(self.index)} entries from {index_path}")
+        # Normalized embeddings inserted by this process and not yet in a delta file
+        self._pending: Dict[str, np.ndarray] = {}
+        # Guards the pending inserts, the applied deltas and swapping in a reloaded index
+        self._lock = threading.Lock()
+        self._compactor: Optional[threading.Thread] = None
+        self._refresh_future: Optional[asyncio.Future] = None
+        self._refreshed_at = time.monotonic()
+
+    def add_threats(self, threats: List[Threat]) -> int:
+        """
+        Embed and index threats with the local detector (backfill); the
+        index is written by ``backfill`` once it is complete
+        """
+        if not threats:
+            return 0
+        embeddings = self.detector.embed_texts([threat_text(threat) for threat in threats])
+        ids, embeddings = _embedded([str(threat.threat_id) for threat in threats], embeddings)
+        if ids:
+            self.index.add(ids, embeddings)
+        return len(ids)
+
+    def _add_embeddings(self, ids: List[str], embeddings: np.ndarray) -> int:
+        """
+        Index embeddings, saving them when enough inserts accumulate
+        """
+        ids, embeddings = _embedded(ids, embeddings)
+        if not ids:
+            return 0
+        embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        with self._lock:
+            self.index.add(ids, embeddings)
+            self._pending.update(zip(ids, embeddings))
+            due = len(self._pending) >= SAVE_EVERY
+        if due:
+            self.save()
+        return len(ids)
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts on the inference service, or on the local detector in a
+        thread when the service is not running
+        """
+        if inference_service.running:
+            return await inference_service.embed_many(texts)
+        return await asyncio.get_running_loop().run_in_executor(None, self.detector.embed_texts, texts)
+
+    async def add_threat(self, threat_id: str, text: str) -> None:
+        """
+        Index a newly created threat
+        """
+        await self.add_threats_async([(threat_id, text)])
+
+    async def add_threats_async(self, threats: List[Tuple[str, str]]) -> int:
+        """
+        Index newly created threats, given as ``(threat_id, text)`` pairs
+
+        The texts are embedded in one batch. Index inserts (and the IVF
+        training they may trigger) run in a thread so they do not hold the
+        event loop.
+        """
+        if not threats:
+            return 0
+        embeddings = await self.embed([text for _, text in threats])
+        ids = [threat_id for threat_id, _ in threats]
+        return await asyncio.get_running_loop().run_in_executor(None, self._add_embeddings, ids, embeddings)
+
+    async def similar(self, threat: Threat, k: int = 10) -> List[Tuple[str, float]]:
+        """
+        Return ``(threat_id, similarity)`` pairs for the k most similar past threats
+
+        An indexed threat is looked up by its stored vector. A threat that
+        is not indexed yet (its background task may still be running) is
+        embedded for the query.
+        """
+        loop = asyncio.get_running_loop()
+        self._schedule_refresh(loop)
+        threat_id = str(threat.threat_id)
+        neighbours = await loop.run_in_executor(None, partial(self.index.search_by_id, threat_id, k=k))
+        if neighbours is not None:
+            return neighbours
+
+        embedding = (await self.embed([threat_text(threat)]))[0]
+        if not np.any(embedding):
+            logger.warning(f"No embedding for threat {threat_id}; returning no similar threats")
+            return []
+        return await loop.run_in_executor(None, partial(self.index.search, embedding, k=k, exclude=[threat_id]))
+
+    def _schedule_refresh(self, loop: asyncio.AbstractEventLoop) -> None:
+        """
+        Pick up other workers' inserts in a thread, at most every REFRESH_SECONDS
+        """
+        if self._refresh_future is not None and not self._refresh_future.done():
+            return
+        if time.monotonic() - self._refreshed_at < REFRESH_SECONDS:
+            return
+        self._refreshed_at = time.monotonic()
+        self._refresh_future = loop.run_in_executor(None, self._refresh_logged)
+
+    def _refresh_logged(self) -> None:
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.error(f"Error refreshing threat index: {str(e)}")
+
+    def _flush(self) -> None:
+        """
+        Append the pending inserts to a new delta file
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            name = _write_delta(self.index_path, pending)
+        except Exception:
+            with self._lock:
+                # Keep them for the next save; newer inserts of the same ID win
+                for item_id, vector in pending.items():
+                    self._pending.setdefault(item_id, vector)
+            raise
+        with self._lock:
+            self._applied.add(name)
+
+    def save(self) -> None:
+        """
+        Append this process's unsaved inserts to a delta file and apply
+        other workers' deltas; starts a background compaction once enough
+        deltas have accumulated
+
+        Each save writes only its own inserts, so its cost does not grow
+        with the index.
+        """
+        self._flush()
+        self.refresh()
+        if len(_delta_files(self.index_path)) >= COMPACT_EVERY:
+            self._start_compaction()
+
+    def refresh(self) -> None:
+        """
+        Apply delta files this process has not seen yet
+
+        When another worker has rewritten the saved index since this one
+        loaded it, the deltas it folded in are gone, so the index is
+        reloaded; that happens in the calling thread, and the reloaded
+        index is swapped in under the service lock together with any
+        inserts made meanwhile.
+        """
+        with _index_lock(self.index_path, exclusive=False):
+            if _base_stamp(self.index_path) != self._base:
+                index, base, applied = _load_index(self.index_path)
+                with self._lock:
+                    for name in _delta_files(self.index_path):
+                        if name not in applied:
+                            _apply_delta(index, self.index_path, name)
+                            applied.add(name)
+                    if self._pending:
+                        ids = list(self._pending)
+                        index.add(ids, np.stack([self._pending[item_id] for item_id in ids]))
+                    self.index, self._base, self._applied = index, base, applied
+                logger.info(f"Reloaded threat index with {len(index)} entries from {self.index_path}")
+            else:
+                for name in _delta_files(self.index_path):
+                    with self._lock:
+                        if name not in self._applied:
+                            _apply_delta(self.index, self.index_path, name)
+                            self._applied.add(name)
+        self._refreshed_at = time.monotonic()
+
+    def _start_compaction(self) -> None:
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            self._compactor = threading.Thread(target=self.compact, name="threat-index-compaction", daemon=True)
+            self._compactor.start()
+
+    def compact(self) -> None:
+        """
+        Fold the delta files into the saved index
+
+        Only one worker compacts at a time: one that finds the exclusive
+        lock taken skips this round. This worker's index already holds every
+        delta, so it is written as the new saved index without reloading it.
+        """
+        try:
+            with _index_lock(self.index_path, exclusive=True, blocking=False) as acquired:
+                if not acquired or _base_stamp(self.index_path) != self._base:
+                    # Busy, or this copy is stale until the next refresh reloads it
+                    return
+                deltas = _delta_files(self.index_path)
+                with self._lock:
+                    for name in deltas:
+                        if name not in self._applied:
+                            _apply_delta(self.index, self.index_path, name)
+                            self._applied.add(name)
+                self.index.save(self.index_path)
+                with self._lock:
+                    self._base = _base_stamp(self.index_path)
+                    self._applied.difference_update(deltas)
+                for name in deltas:
+                    os.remove(os.path.join(self.index_path, name))
+            logger.info(f"Compacted {len(deltas)} delta files into the threat index")
+        except Exception as e:
+            logger.error(f"Error compacting threat index: {str(e)}")
+
+    def close(self) -> None:
+        """
+        Save unsaved inserts, wait for a running compaction and release the
+        local detector's worker pool
+        """
+        self._flush()
+        if self._compactor is not None:
+            self._compactor.join()
+        self.detector.close()
+
+    def backfill(self, db: Session, batch_size: int = 256) -> int:
+        """
+        Index every existing threat row, streaming them in batches
+
+        The threats table is the source of truth, so the finished index
+        replaces the saved one; delta files written while the backfill ran
+        are applied to it first.
+        """
+        indexed = 0
+        batch: List[Threat] = []
+        rows: Iterable[Threat] = db.query(Threat).order_by(Threat.created_at).yield_per(batch_size)
+        for threat in rows:
+            batch.append(threat)
+            if len(batch) == batch_size:
+                indexed += self.add_threats(batch)
+                batch = []
+                logger.info(f"Backfilled {indexed} threats into the similarity index")
+        indexed += self.add_threats(batch)
+        if INDEX_COMPRESSION in STORAGE_FORMATS and self.index.compressor is None:
+            try:
+                self.index = self.index.compress(EmbeddingCompressor(storage=INDEX_COMPRESSION))
+            except ValueError as e:
+                logger.error(f"Threat index left uncompressed: {str(e)}")
+        with _index_lock(self.index_path, exclusive=True), self._lock:
+            deltas = _delta_files(self.index_path)
+            for name in deltas:
+                _apply_delta(self.index, self.index_path, name)
+            self.index.save(self.index_path)
+            for name in deltas:
+                os.remove(os.path.join(self.index_path, name))
+            self._base = _base_stamp(self.index_path)
+            self._applied = set()
+        logger.info(f"Backfill complete: {indexed} threats indexed")
+        return indexed
+
+
+_similarity_service: Optional[ThreatSimilarityService] = None
+_similarity_service_lock = threading.Lock()
+
+
+def get_similarity_service() -> ThreatSimilarityService:
+    """
+    Get the process-wide similar-threat service, creating it on first use
+    """
+    global _similarity_service
+    if _similarity_service is None:
+        with _similarity_service_lock:
+            if _similarity_service is None:
+                _similarity_service = ThreatSimilarityService()
+    return _similarity_service
+
+
+async def index_new_threat(threat_id: str, text: str) -> None:
+    """
+    Background task indexing a threat after its creation has been returned;
+    indexing failures are logged and never reach the client
+    """
+    await index_new_threats([(threat_id, text)])
+
+
+async def index_new_threats(threats: List[Tuple[str, str]]) -> None:
+    """
+    Background task indexing committed threats, given as ``(threat_id, text)``
+    pairs; indexing failures are logged and never reach the caller
+    """
+    try:
+        # First use loads the index from disk, which must not hold the event loop either
+        service = await asyncio.get_running_loop().run_in_executor(None, get_similarity_service)
+        await service.add_threats_async(threats)
+    except Exception as e:
+        logger.error(f"Error indexing {len(threats)} threats: {str(e)}")
+
+
+async def close_similarity_service() -> None:
+    """
+    Save the service's unsaved inserts at shutdown, if it was ever created
+    """
+    if _similarity_service is not None:
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, _similarity_service.close)
+        except Exception as e:
+            logger.error(f"Error saving threat index: {str(e)}")
+
+
+# Backfill job
+if __name__ == "__main__":
+    service = get_similarity_service()
+    db = next(get_db())
+    try:
+        service.backfill(db)
+    finally:
+        db.close()
@@ -5,11 +5,10 @@ import websockets
 from typing import Dict, Any, Callable
 from datetime import datetime
 import uuid
-from sqlalchemy.orm import Session
 
 # Import data ingestion service
 from backend.services.data_ingestion import DataIngestionService
-from backend.database import get_db
+from backend.database import AsyncSessionLocal
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -22,7 +21,6 @@ class StreamingService:
         """
         self.data_ingestion_service = DataIngestionService()
         self.connected_clients = set()
-        self.db = next(get_db())
         logger.info("Streaming service initialized")
     
     async def register_client(self, websocket):
@@ -52,25 +50,26 @@ class StreamingService:
                     data = json.loads(message)
                     data_type = data.get("type")
                     
-                    # Process based on data type
-                    if data_type == "threat_report":
-                        result = await self.data_ingestion_service.process_threat_report(
-                            data.get("payload", {}), self.db
-                        )
-                    elif data_type == "sensor_data":
-                        result = await self.data_ingestion_service.process_sensor_data(
-                            data.get("payload", []), self.db
-                        )
-                    elif data_type == "social_media":
-                        result = await self.data_ingestion_service.process_social_media_data(
-                            data.get("payload", []), self.db
-                        )
-                    elif data_type == "emergency_call":
-                        result = await self.data_ingestion_service.process_emergency_call_data(
-                            data.get("payload", {}), self.db
-                        )
-                    else:
-                        result = {"status": "error", "message": f"Unknown data type: {data_type}"}
+                    # Process based on data type, with a pooled async session per message
+                    async with AsyncSessionLocal() as db:
+                        if data_type == "threat_report":
+                            result = await self.data_ingestion_service.process_threat_report(
+                                data.get("payload", {}), db
+                            )
+                        elif data_type == "sensor_data":
+                            result = await self.data_ingestion_service.process_sensor_data(
+                                data.get("payload", []), db
+                            )
+                        elif data_type == "social_media":
+                            result = await self.data_ingestion_service.process_social_media_data(
+                                data.get("payload", []), db
+                            )
+                        elif data_type == "emergency_call":
+                            result = await self.data_ingestion_service.process_emergency_call_data(
+                                data.get("payload", {}), db
+                            )
+                        else:
+                            result = {"status": "error", "message": f"Unknown data type: {data_type}"}
                     
                     # Send response back to client
                     await websocket.send(json.dumps(result))
@@ -140,17 +139,15 @@ class StreamingService:
                     "data": data
                 }]
                 
-                result = await self.data_ingestion_service.process_sensor_data(
-                    sensor_data, self.db
-                )
+                async with AsyncSessionLocal() as db:
+                    result = await self.data_ingestion_service.process_sensor_data(sensor_data, db)
                 
                 logger.info(f"Processed MQTT sensor data: {result}")
                 
             elif topic.startswith("threats/"):
                 # Threat report
-                result = await self.data_ingestion_service.process_threat_report(
-                    data, self.db
-                )
+                async with AsyncSessionLocal() as db:
+                    result = await self.data_ingestion_service.process_threat_report(data, db)
                 
                 logger.info(f"Processed MQTT threat report: {result}")
                 
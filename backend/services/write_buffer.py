@@ -0,0 +1,237 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from backend.database import AsyncSessionLocal
+from backend.services.bulk_insert import async_bulk_insert_sensor_data, sensor_row
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Largest batch of buffered readings written in one transaction (throughput knob)
+MAX_BATCH_SIZE = int(os.getenv("SENSOR_WRITE_BATCH_SIZE", 500))
+
+# Longest a reading waits in the buffer before its batch is written (latency knob)
+MAX_DELAY_MS = float(os.getenv("SENSOR_WRITE_MAX_DELAY_MS", 50))
+
+# Buffered readings accepted before callers are rejected
+MAX_PENDING = int(os.getenv("SENSOR_WRITE_MAX_PENDING", 10000))
+
+# Number of recent acknowledgement latencies kept for percentile metrics
+LATENCY_WINDOW = 10000
+
+
+class WriteBufferFullError(Exception):
+    """Raised when the buffer already holds its maximum number of readings."""
+
+
+class WriteBufferUnavailableError(Exception):
+    """Raised when the buffer is not accepting readings (stopped or shutting down)."""
+
+
+class SensorWriteBuffer:
+    def __init__(
+        self,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_delay_ms: float = MAX_DELAY_MS,
+        max_pending: int = MAX_PENDING,
+        session_factory=None
+    ):
+        """
+        Initialize the write-behind buffer for single sensor readings
+
+        ``submit`` validates a reading, queues it and waits. A background
+        loop collects queued readings into batches of at most
+        ``max_batch_size``; a batch is written at most ``max_delay_ms``
+        after its first reading, with one bulk insert and one commit. Each
+        caller's future resolves once the commit that contains its reading
+        has finished, so an acknowledged reading is durable. At most
+        ``max_pending`` readings are buffered; beyond that ``submit``
+        raises WriteBufferFullError instead of growing the queue.
+        """
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay_ms / 1000
+        self.max_pending = max_pending
+        self.session_factory = session_factory or AsyncSessionLocal
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._accepting = False
+
+        self._requests = 0
+        self._rejected = 0
+        self._failed = 0
+        self._flushes = 0
+        self._flushed_items = 0
+        self._isolated_flushes = 0
+        self._latencies: deque = deque(maxlen=LATENCY_WINDOW)
+        self._started_at = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._flusher is not None and not self._flusher.done()
+
+    async def start(self) -> None:
+        """
+        Start the flush loop
+        """
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._started_at = time.monotonic()
+        self._accepting = True
+        self._flusher = asyncio.create_task(self._flush_loop())
+        logger.info(
+            f"Sensor write buffer started: batch size {self.max_batch_size}, "
+            f"max delay {self.max_delay * 1000:.1f} ms, max pending {self.max_pending}"
+        )
+
+    async def stop(self) -> None:
+        """
+        Stop accepting readings and write everything already buffered
+        """
+        self._accepting = False
+        if self.running:
+            # Buffered readings were promised a write: the loop drains up to this marker, then exits
+            await self._queue.put(None)
+            await self._flusher
+        self._flusher = None
+
+        while self._queue is not None and not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None and not item[1].done():
+                item[1].set_exception(WriteBufferUnavailableError("Sensor write buffer stopped"))
+        logger.info("Sensor write buffer stopped")
+
+    async def submit(self, reading: Dict[str, Any]) -> None:
+        """
+        Buffer one reading; resolves once it has been committed
+
+        Raises ValueError for an invalid reading, WriteBufferFullError when
+        the buffer is full and WriteBufferUnavailableError when it is not
+        running. Database errors from the reading's write are re-raised.
+        """
+        if not self._accepting or not self.running:
+            raise WriteBufferUnavailableError("Sensor write buffer is not accepting readings")
+
+        # Reject malformed readings now, so they cannot fail a whole batch later
+        try:
+            sensor_row(reading)
+        except (TypeError, AttributeError) as e:
+            raise ValueError(str(e))
+
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((reading, future, time.monotonic()))
+        except asyncio.QueueFull:
+            self._rejected += 1
+            raise WriteBufferFullError(f"Sensor write buffer is full ({self.max_pending} pending)")
+        self._requests += 1
+        await future
+
+    async def _collect_batch(self) -> Tuple[List[Tuple[Dict[str, Any], asyncio.Future, float]], bool]:
+        """
+        Wait for a first reading, then gather more until the batch is full
+        or the delay budget is spent; also report whether stop was requested
+        """
+        first = await self._queue.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _flush_loop(self) -> None:
+        while True:
+            batch, stopping = await self._collect_batch()
+            if batch:
+                await self._flush(batch)
+            if stopping:
+                return
+
+    async def _write(self, readings: List[Dict[str, Any]], chunk_size: int) -> List[Optional[str]]:
+        """
+        Write readings in one transaction; the error of each reading's chunk, or None
+        """
+        async with self.session_factory() as db:
+            result = await async_bulk_insert_sensor_data(db, readings, chunk_size=chunk_size)
+        errors = []
+        for chunk in result["chunks"]:
+            errors.extend([chunk.get("error")] * chunk["rows"])
+        return errors
+
+    async def _flush(self, batch: List[Tuple[Dict[str, Any], asyncio.Future, float]]) -> None:
+        """
+        Write one batch and resolve each reading's future
+
+        The batch is written as a single chunk. If that chunk fails (for
+        example, one reading duplicates an existing key), the batch is
+        written again with one savepoint per reading, so only the bad
+        readings fail.
+        """
+        readings = [reading for reading, _, _ in batch]
+        try:
+            errors = await self._write(readings, chunk_size=len(readings))
+            if any(errors):
+                self._isolated_flushes += 1
+                errors = await self._write(readings, chunk_size=1)
+        except Exception as e:
+            logger.error(f"Error flushing sensor write buffer: {str(e)}")
+            errors = [str(e)] * len(batch)
+
+        finished = time.monotonic()
+        for (_, future, enqueued), error in zip(batch, errors):
+            if future.done():
+                continue
+            if error is None:
+                future.set_result(None)
+                self._latencies.append(finished - enqueued)
+            else:
+                self._failed += 1
+                future.set_exception(RuntimeError(f"Database error: {error}"))
+        self._flushes += 1
+        self._flushed_items += len(batch)
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Report buffer depth, batching efficiency and acknowledgement latency
+        """
+        latencies = np.array(self._latencies) * 1000
+        uptime = time.monotonic() - self._started_at if self._started_at else 0.0
+        return {
+            "running": self.running,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "max_pending": self.max_pending,
+            "max_batch_size": self.max_batch_size,
+            "max_delay_ms": self.max_delay * 1000,
+            "requests": self._requests,
+            "rejected": self._rejected,
+            "failed": self._failed,
+            "flushes": self._flushes,
+            "isolated_flushes": self._isolated_flushes,
+            "mean_batch_size": self._flushed_items / self._flushes if self._flushes else 0.0,
+            "throughput_per_second": self._flushed_items / uptime if uptime else 0.0,
+            "ack_latency_p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+            "ack_latency_p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else 0.0
+        }
+
+
+# Buffer shared by the API process
+sensor_write_buffer = SensorWriteBuffer()
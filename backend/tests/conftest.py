@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+# Tests run from backend/ (CI, `make test-backend`); modules import as ``backend.*`` and ``ai.*``
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+# The API engines are built at import time; tests use their own databases
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from backend.database import Base  # noqa: E402
+from backend.models.sensor import Sensor, SensorData  # noqa: E402
+from backend.models.threat import Threat  # noqa: E402
+from backend.models.user import Agency, Role, User  # noqa: E402
+
+# Tables the ingestion paths write to, with the tables they reference
+INGESTION_TABLES = [Agency.__table__, Role.__table__, User.__table__, Threat.__table__, Sensor.__table__, SensorData.__table__]
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """
+    Async session factory on a fresh SQLite database with the ingestion tables
+    """
+    path = tmp_path / "ingestion.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine, tables=INGESTION_TABLES)
+    engine.dispose()
+    # No pooling: each test drives its own event loop, so connections must not outlive it
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+    return async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
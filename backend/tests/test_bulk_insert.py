@@ -0,0 +1,67 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select
+
+from backend.models.sensor import SensorData
+from backend.services.bulk_insert import async_bulk_insert_sensor_data, sensor_row
+
+
+def _readings(count, sensor_id=None):
+    sensor_id = sensor_id or uuid.uuid4()
+    start = datetime(2021, 8, 1, tzinfo=timezone.utc)
+    return [
+        {"sensor_id": str(sensor_id), "timestamp": (start + timedelta(seconds=i)).isoformat(), "data": {"value": i}}
+        for i in range(count)
+    ]
+
+
+def _insert(session_factory, readings, chunk_size):
+    async def run():
+        async with session_factory() as db:
+            result = await async_bulk_insert_sensor_data(db, readings, chunk_size=chunk_size)
+            stored = await db.scalar(select(func.count()).select_from(SensorData))
+            return result, stored
+    return asyncio.run(run())
+
+
+def test_sensor_row_parses_ids_timestamps_and_payload():
+    sensor_id = uuid.uuid4()
+
+    row = sensor_row({"sensor_id": str(sensor_id), "timestamp": "2021-08-01T12:30:00Z", "data": {"a": 1}})
+
+    assert row == (sensor_id, datetime(2021, 8, 1, 12, 30, tzinfo=timezone.utc), '{"a": 1}', False)
+
+
+def test_readings_are_written_in_chunks(session_factory):
+    result, stored = _insert(session_factory, _readings(25), chunk_size=10)
+
+    assert result["method"] == "executemany"
+    assert result["inserted"] == stored == 25
+    assert [chunk["rows"] for chunk in result["chunks"]] == [10, 10, 5]
+    assert all(chunk["status"] == "success" for chunk in result["chunks"])
+    assert result["errors"] == []
+
+
+def test_invalid_readings_are_skipped_and_reported(session_factory):
+    readings = _readings(3)
+    readings[1]["timestamp"] = "not a time"
+    readings.append({"timestamp": "2021-08-01T12:30:00"})
+
+    result, stored = _insert(session_factory, readings, chunk_size=10)
+
+    assert result["inserted"] == stored == 2
+    assert [error.split(":")[0] for error in result["errors"]] == ["Reading 1", "Reading 3"]
+
+
+def test_a_failing_chunk_is_rolled_back_alone(session_factory):
+    readings = _readings(6)
+    # The second chunk repeats a reading's primary key
+    readings[4] = dict(readings[3])
+
+    result, stored = _insert(session_factory, readings, chunk_size=3)
+
+    assert [chunk["status"] for chunk in result["chunks"]] == ["success", "error"]
+    assert "error" in result["chunks"][1]
+    assert result["inserted"] == stored == 3
@@ -0,0 +1,139 @@
+import asyncio
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+
+from backend.models.threat import Threat
+from backend.services.data_ingestion import DataIngestionService
+
+
+def _threats(session_factory):
+    async def fetch():
+        async with session_factory() as db:
+            return (await db.scalars(select(Threat))).all()
+    return asyncio.run(fetch())
+
+
+def test_social_post_with_string_timestamp_is_stored(session_factory):
+    service = DataIngestionService(session_factory=session_factory, threat_indexer=None)
+    posts = [{"platform": "twitter", "content": "there is a bomb downtown", "timestamp": "2021-08-01T12:30:00Z"}]
+
+    async def run():
+        async with session_factory() as db:
+            return await service.process_social_media_data(posts, db)
+
+    result = asyncio.run(run())
+
+    assert result["status"] == "success"
+    assert result["threat_reports_created"] == 1
+    [threat] = _threats(session_factory)
+    assert str(threat.threat_id) == result["threat_report_ids"][0]
+    created_at = threat.created_at if threat.created_at.tzinfo else threat.created_at.replace(tzinfo=timezone.utc)
+    assert created_at == datetime(2021, 8, 1, 12, 30, tzinfo=timezone.utc)
+
+
+def test_invalid_created_at_fails_only_its_report(session_factory):
+    service = DataIngestionService(session_factory=session_factory, threat_indexer=None)
+    reports = [
+        {"threat_title": "valid", "created_at": "2021-08-01T12:30:00"},
+        {"threat_title": "invalid", "created_at": "yesterday"}
+    ]
+
+    async def run():
+        async with session_factory() as db:
+            return await service.process_threat_reports(reports, db)
+
+    result = asyncio.run(run())
+
+    assert result["status"] == "partial"
+    assert [entry["status"] for entry in result["results"]] == ["success", "error"]
+    assert [threat.threat_title for threat in _threats(session_factory)] == ["valid"]
+
+
+def test_batch_reports_the_stream_whose_inserts_failed(session_factory):
+    service = DataIngestionService(session_factory=session_factory, threat_indexer=None)
+    reading = {"sensor_id": uuid.uuid4(), "timestamp": "2021-08-01T12:30:00", "data": {"temperature": 21.5}}
+    batches = {
+        "threats": [{"threat_title": "Network intrusion", "threat_type": "cyber"}],
+        # Both readings have the same primary key, so their chunk is rolled back
+        "sensor_data": [reading, dict(reading)],
+        "social_media": [{"platform": "twitter", "content": "attack planned tonight", "timestamp": "not a time"}]
+    }
+
+    result = asyncio.run(service.batch_process_data(batches))
+
+    assert result["status"] == "partial"
+    assert result["results"]["threats"]["status"] == "success"
+    assert sorted(result["failed_streams"]) == ["sensor_data", "social_media"]
+    assert result["partial_streams"] == []
+    assert result["results"]["social_media"]["threat_reports_created"] == 0
+    assert result["results"]["social_media"]["errors"]
+    assert [threat.threat_title for threat in _threats(session_factory)] == ["Network intrusion"]
+
+
+def test_batch_is_completed_when_every_stream_succeeds(session_factory):
+    service = DataIngestionService(session_factory=session_factory, threat_indexer=None)
+    batches = {
+        "threats": [{"threat_title": "Network intrusion"}],
+        "sensor_data": [{"sensor_id": uuid.uuid4(), "timestamp": "2021-08-01T12:30:00", "data": {}}],
+        "emergency_calls": {"emergency_type": "fire", "timestamp": "2021-08-01T12:31:00"}
+    }
+
+    result = asyncio.run(service.batch_process_data(batches))
+
+    assert result["status"] == "completed"
+    assert result["failed_streams"] == [] and result["partial_streams"] == []
+
+
+def test_committed_threat_reports_are_indexed(session_factory):
+    indexed = []
+
+    async def indexer(threats):
+        indexed.extend(threats)
+
+    service = DataIngestionService(session_factory=session_factory, threat_indexer=indexer)
+    reports = [
+        {"threat_title": "Network intrusion", "threat_description": "on the VPN gateway"},
+        {"threat_title": "invalid", "created_at": "yesterday"}
+    ]
+
+    async def run():
+        async with session_factory() as db:
+            result = await service.process_threat_reports(reports, db)
+        await asyncio.gather(*service._indexing_tasks)
+        return result
+
+    result = asyncio.run(run())
+
+    assert indexed == [(result["threat_ids"][0], "Network intrusion on the VPN gateway")]
+
+
+def test_emergency_calls_are_created_in_one_batch(session_factory):
+    service = DataIngestionService(session_factory=session_factory, threat_indexer=None)
+    calls = [
+        {"emergency_type": "fire", "timestamp": "2021-08-01T12:31:00"},
+        {"emergency_type": "flood", "timestamp": "not a time"},
+        {"emergency_type": "medical"}
+    ]
+    batches = []
+    process_threat_reports = service.process_threat_reports
+
+    async def recording(reports, db):
+        batches.append(len(reports))
+        return await process_threat_reports(reports, db)
+
+    service.process_threat_reports = recording
+
+    async def run():
+        async with session_factory() as db:
+            return await service.process_emergency_call_data(calls, db)
+
+    result = asyncio.run(run())
+
+    assert batches == [3]
+    assert result["status"] == "partial"
+    assert result["threat_reports_created"] == 2 and len(result["errors"]) == 1
+    assert sorted(threat.threat_title for threat in _threats(session_factory)) == [
+        "Emergency Call: fire", "Emergency Call: medical"
+    ]
@@ -0,0 +1,58 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from ai.threat_detection import EMBEDDING_DIM, ThreatDetector
+from backend.services import inference
+from backend.services.inference import InferenceService
+
+
+class EncoderError(Exception):
+    pass
+
+
+@pytest.fixture
+def failing_worker(monkeypatch):
+    detector = ThreatDetector()
+
+    def fail(texts, batch_size):
+        raise EncoderError("encoder unavailable")
+
+    monkeypatch.setattr(detector, "_encode_texts", fail)
+    monkeypatch.setattr(inference, "_worker_detector", detector)
+    return detector
+
+
+def test_worker_batches_raise_encoder_errors(failing_worker):
+    assert not failing_worker.embed_texts(["text"]).any()
+    with pytest.raises(EncoderError):
+        inference._embed_batch(["text"])
+
+
+def test_a_failed_batch_fails_every_request(failing_worker):
+    service = InferenceService(workers=1)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        service._slots = asyncio.Semaphore(0)
+        service._executor = ThreadPoolExecutor(max_workers=1)
+        batch = [(text, loop.create_future(), time.monotonic()) for text in ("a", "b")]
+        try:
+            await service._dispatch(batch)
+        finally:
+            service._executor.shutdown()
+        return [future.exception() for _, future, _ in batch]
+
+    errors = asyncio.run(run())
+
+    assert all(isinstance(error, EncoderError) for error in errors)
+    assert service.metrics()["failed"] == 2
+
+
+def test_embedding_nothing_uses_the_detector_dimension():
+    embeddings = asyncio.run(InferenceService().embed_many([]))
+
+    assert embeddings.shape == (0, EMBEDDING_DIM)
@@ -0,0 +1,115 @@
+import asyncio
+import os
+import zlib
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from ai.ann_index import METADATA_FILE, IVFIndex
+from backend.services import similarity
+from backend.services.similarity import ThreatSimilarityService
+
+
+class FakeDetector:
+    """Deterministic embeddings per text; "unreadable" embeds as zeros like an encoder error."""
+
+    def embed_texts(self, texts):
+        vectors = [np.random.default_rng(zlib.crc32(text.encode())).standard_normal(768) for text in texts]
+        embeddings = np.stack(vectors).astype(np.float32)
+        embeddings[[i for i, text in enumerate(texts) if text == "unreadable"]] = 0
+        return embeddings
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def index_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(similarity, "SAVE_EVERY", 2)
+    monkeypatch.setattr(similarity, "COMPACT_EVERY", 100)
+    return str(tmp_path / "threat_index")
+
+
+def _service(index_path):
+    return ThreatSimilarityService(index_path=index_path, detector=FakeDetector())
+
+
+def _add(service, *threat_ids):
+    async def run():
+        for threat_id in threat_ids:
+            await service.add_threat(threat_id, f"threat {threat_id}")
+    asyncio.run(run())
+
+
+def _threat(threat_id, text=None):
+    return SimpleNamespace(threat_id=threat_id, threat_title=text or f"threat {threat_id}", threat_description=None)
+
+
+def test_workers_share_inserts_through_delta_files(index_path):
+    first, second = _service(index_path), _service(index_path)
+    _add(first, "a1", "a2")
+    _add(second, "b1", "b2")
+
+    # Saves append deltas; nothing rewrote the saved index
+    assert not os.path.exists(os.path.join(index_path, METADATA_FILE))
+    assert len(similarity._delta_files(index_path)) == 2
+    first.refresh()
+    assert sorted(first.index.ids) == ["a1", "a2", "b1", "b2"]
+    assert sorted(_service(index_path).index.ids) == ["a1", "a2", "b1", "b2"]
+
+
+def test_close_saves_pending_inserts(index_path):
+    service = _service(index_path)
+    _add(service, "a1")
+    assert similarity._delta_files(index_path) == []
+
+    service.close()
+
+    assert _service(index_path).index.ids == ["a1"]
+
+
+def test_compaction_folds_deltas_and_stale_workers_reload(index_path):
+    first, second = _service(index_path), _service(index_path)
+    _add(first, "a1", "a2", "a3", "a4")
+    _add(second, "b1", "b2")
+
+    first.compact()
+
+    assert similarity._delta_files(index_path) == []
+    assert sorted(IVFIndex.load(index_path).ids) == ["a1", "a2", "a3", "a4", "b1", "b2"]
+    # The second worker never saw a3/a4 before their deltas were compacted away
+    _add(second, "b3")
+    second.refresh()
+    assert sorted(second.index.ids) == ["a1", "a2", "a3", "a4", "b1", "b2", "b3"]
+
+
+def test_save_starts_a_background_compaction(index_path, monkeypatch):
+    monkeypatch.setattr(similarity, "COMPACT_EVERY", 2)
+    service = _service(index_path)
+    _add(service, "a1", "a2", "a3", "a4")
+    service._compactor.join()
+
+    assert similarity._delta_files(index_path) == []
+    assert sorted(IVFIndex.load(index_path).ids) == ["a1", "a2", "a3", "a4"]
+
+
+def test_zero_embeddings_are_not_indexed(index_path):
+    service = _service(index_path)
+    asyncio.run(service.add_threat("broken", "unreadable"))
+
+    assert len(service.index) == 0
+    assert asyncio.run(service.similar(_threat("other", "unreadable"))) == []
+
+
+def test_similar_uses_the_stored_vector(index_path):
+    service = _service(index_path)
+    _add(service, "a1", "a2", "a3")
+    query = FakeDetector().embed_texts(["threat a1"])[0]
+
+    # The title changed after indexing; the lookup still uses the indexed vector
+    neighbours = asyncio.run(service.similar(_threat("a1", "edited title"), k=2))
+
+    expected = service.index.search(query, k=2, exclude=["a1"])
+    assert [threat_id for threat_id, _ in neighbours] == [threat_id for threat_id, _ in expected]
+    assert [score for _, score in neighbours] == pytest.approx([score for _, score in expected], abs=1e-6)
@@ -0,0 +1,118 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from backend.models.sensor import SensorData
+from backend.services.write_buffer import SensorWriteBuffer, WriteBufferFullError, WriteBufferUnavailableError
+
+
+def _readings(count):
+    sensor_id = uuid.uuid4()
+    start = datetime(2021, 8, 1)
+    return [{"sensor_id": sensor_id, "timestamp": start + timedelta(seconds=i), "data": {"i": i}} for i in range(count)]
+
+
+async def _stored(session_factory):
+    async with session_factory() as db:
+        return await db.scalar(select(func.count()).select_from(SensorData))
+
+
+def test_concurrent_readings_are_written_in_batches(session_factory):
+    buffer = SensorWriteBuffer(max_batch_size=4, max_delay_ms=50, session_factory=session_factory)
+
+    async def run():
+        await buffer.start()
+        await asyncio.gather(*[buffer.submit(reading) for reading in _readings(10)])
+        await buffer.stop()
+        return await _stored(session_factory)
+
+    assert asyncio.run(run()) == 10
+    metrics = buffer.metrics()
+    assert metrics["flushes"] == 3 and metrics["failed"] == 0
+
+
+def test_a_full_buffer_pushes_back(session_factory):
+    buffer = SensorWriteBuffer(max_batch_size=1, max_delay_ms=0, max_pending=2, session_factory=session_factory)
+    write = buffer._write
+
+    async def run():
+        gate = asyncio.Event()
+
+        async def held_write(readings, chunk_size):
+            print('held', len(readings), flush=True)
+            await gate.wait()
+            print('released', flush=True)
+            return await write(readings, chunk_size)
+
+        buffer._write = held_write
+        await buffer.start()
+        readings = _readings(4)
+        # The first reading is taken by the held flush; the next two fill the queue
+        accepted = [asyncio.ensure_future(buffer.submit(readings[0]))]
+        await asyncio.sleep(0.05)
+        accepted += [asyncio.ensure_future(buffer.submit(reading)) for reading in readings[1:3]]
+        await asyncio.sleep(0)
+        with pytest.raises(WriteBufferFullError):
+            await buffer.submit(readings[3])
+        print('raised ok', flush=True)
+        gate.set()
+        print('gate set', flush=True)
+        await asyncio.gather(*accepted)
+        print('gathered', flush=True)
+        await buffer.stop()
+        return await _stored(session_factory)
+
+    assert asyncio.run(run()) == 3
+    assert buffer.metrics()["rejected"] == 1
+
+
+def test_a_stopped_buffer_is_unavailable(session_factory):
+    buffer = SensorWriteBuffer(session_factory=session_factory)
+    [reading] = _readings(1)
+
+    async def run():
+        with pytest.raises(WriteBufferUnavailableError):
+            await buffer.submit(reading)
+        await buffer.start()
+        await buffer.stop()
+        with pytest.raises(WriteBufferUnavailableError):
+            await buffer.submit(reading)
+
+    asyncio.run(run())
+
+
+def test_a_duplicate_fails_only_its_own_reading(session_factory):
+    buffer = SensorWriteBuffer(max_batch_size=10, max_delay_ms=50, session_factory=session_factory)
+    readings = _readings(3)
+    readings.append(dict(readings[1]))
+
+    async def run():
+        await buffer.start()
+        outcomes = await asyncio.gather(*[buffer.submit(reading) for reading in readings], return_exceptions=True)
+        await buffer.stop()
+        return outcomes, await _stored(session_factory)
+
+    outcomes, stored = asyncio.run(run())
+
+    assert outcomes[:3] == [None, None, None]
+    assert isinstance(outcomes[3], RuntimeError)
+    assert stored == 3
+    assert buffer.metrics()["isolated_flushes"] == 1
+
+
+def test_invalid_readings_are_rejected_before_buffering(session_factory):
+    buffer = SensorWriteBuffer(session_factory=session_factory)
+
+    async def run():
+        await buffer.start()
+        try:
+            with pytest.raises(ValueError):
+                await buffer.submit({"sensor_id": "not-a-uuid", "timestamp": "2021-08-01T00:00:00"})
+        finally:
+            await buffer.stop()
+
+    asyncio.run(run())
+    assert buffer.metrics()["requests"] == 0